@@ -1,8 +1,25 @@
-from fastapi import FastAPI
+import asyncio
+import contextlib
+import json
+import threading
+
+from fastapi import FastAPI, HTTPException, Query, Request, WebSocket, WebSocketDisconnect, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
 
+from app.backend.core.admission import AdmissionMiddleware, admission
+from app.backend.core.body_limit import BodyLimitMiddleware
+from app.backend.core.compression import CompressionMiddleware
 from app.backend.core.config import settings
-from app.backend.routers import posts
+from app.backend.core.firestore import firestore_service
+from app.backend.core.metrics import MetricsMiddleware, metrics
+from app.backend.core.profiler import ProfilerMiddleware
+from app.backend.core.security import verify_token
+from app.backend.routers import admin, alerts, ingest, posts
+from app.backend.services.alert_service import alert_service
+from app.backend.services.event_bus import Subscription, event_bus, parse_filters
+from app.backend.services.post_processor import post_processor
+from app.backend.services.storage_service import storage_service
 
 app = FastAPI(
 	title=settings.PROJECT_NAME,
@@ -10,6 +27,16 @@ app = FastAPI(
 	description="A-Live-Grid Social Media Platform API",
 )
 
+# Admission for routes with large bodies, before the body is received (smaller routes use admit())
+app.add_middleware(
+	AdmissionMiddleware,
+	paths={f"{settings.API_V1_STR}/posts/create-post": "create_post", f"{settings.API_V1_STR}/posts:batch": "ingest"},
+)
+
+# Refuse oversized uploads before FastAPI parses (and spools) the multipart form; added after
+# admission so an oversized upload never takes a slot, and before CORS so the 413 carries CORS headers
+app.add_middleware(BodyLimitMiddleware, limits={f"{settings.API_V1_STR}/posts/create-post": settings.MAX_UPLOAD_BODY_SIZE})
+
 # CORS middleware
 app.add_middleware(
 	CORSMiddleware,
@@ -19,8 +46,45 @@ app.add_middleware(
 	allow_headers=["*"],
 )
 
+# Compress responses (feeds with inline images are large); added after CORS so it wraps it and compresses its responses too
+app.add_middleware(
+	CompressionMiddleware,
+	minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+	gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+	brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+)
+
+# Picks out requests for an armed admin trace (one attribute check otherwise)
+app.add_middleware(ProfilerMiddleware)
+
+# Request metrics; added last so it wraps everything and sees the bytes actually sent
+app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(posts.router, prefix=f"{settings.API_V1_STR}/posts", tags=["posts"])
+app.include_router(alerts.router, prefix=f"{settings.API_V1_STR}/alerts", tags=["alerts"])
+app.include_router(ingest.router, prefix=settings.API_V1_STR, tags=["ingest"])
+app.include_router(admin.router, prefix=f"{settings.API_V1_STR}/admin", tags=["admin"])
+
+
+@app.on_event("startup")
+def warmup_on_startup():
+	# Connect in the background so startup (and the first response) is not blocked on credentials
+	if settings.FIRESTORE_WARMUP_ON_STARTUP:
+		threading.Thread(target=firestore_service.warmup, name="firestore-warmup", daemon=True).start()
+
+
+@app.on_event("startup")
+async def start_event_bus():
+	# DataService publishes from threadpool threads too; events are delivered on this loop
+	event_bus.bind(asyncio.get_running_loop())
+
+
+@app.on_event("shutdown")
+async def stop_workers():
+	# Pending posts first: their tasks are waiting on the image workers
+	await post_processor.shutdown()
+	storage_service.image_pool.shutdown()
 
 
 @app.get("/")
@@ -36,3 +100,132 @@ async def root():
 @app.get("/health")
 async def health_check():
 	return {"status": "healthy", "service": "a-live-grid-api"}
+
+
+# Service counters exported on /metrics alongside the request metrics
+metrics.register_stats("admission", admission.stats, {"endpoints": "endpoint"})
+metrics.register_stats("storage", storage_service.get_stats)
+metrics.register_stats("event_bus", event_bus.get_stats)
+metrics.register_stats("post_processor", post_processor.get_stats)
+metrics.register_stats("alerts", alert_service.get_stats)
+metrics.register_stats("user_cache", firestore_service.user_cache.stats)
+metrics.register_stats("post_cache", firestore_service.post_cache.stats)
+
+
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+	"""Prometheus scrape endpoint"""
+	return Response(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/_ah/warmup", include_in_schema=False)
+def warmup():
+	"""App Engine warmup request: initialize clients before the instance receives traffic"""
+	return {"firestore": firestore_service.warmup()}
+
+
+def subscribe(bbox: str | None, category: str | None, token: str | None) -> Subscription:
+	"""Register a live client with its filters (and, for a valid access token, its user's alerts), or raise 400/401/503"""
+	user_id = None
+	if token is not None:
+		# Alerts reveal a user's saved areas; a bare user_id would let anyone receive them
+		user_id = verify_token(token)
+		if user_id is None:
+			raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired access token")
+
+	try:
+		subscription = event_bus.subscribe(*parse_filters(bbox, category), user_id=user_id)
+	except ValueError as e:
+		raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)) from e
+
+	if subscription is None:
+		raise HTTPException(
+			status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+			detail="Too many live connections, please retry shortly",
+			headers={"Retry-After": str(settings.ADMISSION_RETRY_AFTER_SECONDS)},
+		)
+	return subscription
+
+
+@app.get(f"{settings.API_V1_STR}/live/events")
+async def live_events(
+	request: Request,
+	bbox: str | None = Query(None, description="Only posts inside min_lat,min_lng,max_lat,max_lng"),
+	category: str | None = Query(None, description="Only posts in one of these comma-separated categories"),
+	token: str | None = Query(None, description="Access token; also receive its user's alerts"),
+):
+	"""
+	Server-Sent Events stream of post-created, post-updated, post-deleted and vote-delta events,
+	plus alert events for the user of token (EventSource cannot send an Authorization header)
+	A "resync" event means events were dropped: refetch /short-post
+	"""
+	subscription = subscribe(bbox, category, token)
+
+	async def stream():
+		try:
+			yield "retry: 3000\n\n"
+			while True:
+				try:
+					event = await asyncio.wait_for(subscription.queue.get(), settings.LIVE_KEEPALIVE_SECONDS)
+				except TimeoutError:
+					if await request.is_disconnected():
+						break
+					yield ": keepalive\n\n"
+					continue
+
+				event_id = f"id: {event['id']}\n" if "id" in event else ""
+				yield f"{event_id}event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+		finally:
+			event_bus.unsubscribe(subscription)
+
+	return StreamingResponse(
+		stream(),
+		media_type="text/event-stream",
+		# No proxy buffering: events must reach the client as they happen
+		headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+	)
+
+
+@app.websocket(f"{settings.API_V1_STR}/live/ws")
+async def live_socket(websocket: WebSocket, bbox: str | None = None, category: str | None = None, token: str | None = None):
+	"""
+	WebSocket stream of the same events as /live/events
+	Clients can change their filters by sending {"bbox": "...", "category": "..."}
+	"""
+	try:
+		subscription = subscribe(bbox, category, token)
+	except HTTPException as e:
+		# 1008: policy violation (bad filters or token), 1013: try again later
+		await websocket.close(code=1013 if e.status_code == status.HTTP_503_SERVICE_UNAVAILABLE else 1008, reason=e.detail)
+		return
+
+	await websocket.accept()
+
+	async def send_events():
+		while True:
+			try:
+				event = await asyncio.wait_for(subscription.queue.get(), settings.LIVE_KEEPALIVE_SECONDS)
+			except TimeoutError:
+				event = {"type": "ping"}
+			await websocket.send_json(event)
+
+	async def receive_filters():
+		while True:
+			message = await websocket.receive_text()
+			try:
+				message = json.loads(message)
+				subscription.bbox, subscription.categories = parse_filters(message.get("bbox"), message.get("category"))
+			except (ValueError, AttributeError) as e:
+				await websocket.send_json({"type": "error", "detail": str(e)})
+
+	tasks = [asyncio.create_task(send_events()), asyncio.create_task(receive_filters())]
+	try:
+		# Whichever side ends first (usually the client disconnecting) ends the connection
+		done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+		for task in done:
+			with contextlib.suppress(WebSocketDisconnect, RuntimeError):
+				task.result()
+	finally:
+		for task in tasks:
+			task.cancel()
+		event_bus.unsubscribe(subscription)
@@ -0,0 +1,179 @@
+"""
+Per-endpoint admission control and priority-based load shedding.
+
+Each controlled endpoint gets a concurrency limit and a bounded wait queue. Requests
+past the queue are rejected at once with 429, requests that wait too long get a 503,
+both with Retry-After. When the server as a whole is loaded (in-flight plus queued
+requests over total capacity), endpoints below "high" priority are shed before they
+queue, so a burst of uploads cannot starve feed reads and votes.
+
+Routes with small bodies take their slot as a dependency (admit). Upload and ingest
+routes take it in AdmissionMiddleware instead: FastAPI reads and parses the request body
+before it solves dependencies, so a rejected upload would otherwise be received in full.
+"""
+
+import asyncio
+import contextlib
+from collections.abc import AsyncIterator
+
+from fastapi import Depends, HTTPException, status
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.backend.core.config import settings
+
+
+class AdmissionController:
+	"""Concurrency limit plus bounded FIFO wait queue for one endpoint"""
+
+	def __init__(self, name: str, max_concurrent: int, max_queue: int, queue_timeout: float, priority: str = "normal"):
+		self.name = name
+		self.max_concurrent = max_concurrent
+		self.max_queue = max_queue
+		self.queue_timeout = queue_timeout
+		self.priority = priority
+		self.in_flight = 0
+		self.waiting = 0
+		self.admitted = 0
+		self.rejected = 0
+		self.timed_out = 0
+		self.shed = 0
+		self._semaphore = asyncio.Semaphore(max_concurrent)
+
+	@contextlib.asynccontextmanager
+	async def slot(self) -> AsyncIterator[None]:
+		"""Hold one of the endpoint's slots for the duration of the block, or raise 429/503"""
+		if admission.load() >= admission.shed_load(self.priority):
+			self.shed += 1
+			raise self._reject(status.HTTP_503_SERVICE_UNAVAILABLE, "Server is busy, please retry shortly")
+
+		# Only queue when every slot is taken; locked() means acquire would block
+		if self._semaphore.locked():
+			if self.waiting >= self.max_queue:
+				self.rejected += 1
+				raise self._reject(status.HTTP_429_TOO_MANY_REQUESTS, "Too many concurrent requests, please retry shortly")
+
+			self.waiting += 1
+			try:
+				await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+			except TimeoutError:
+				self.timed_out += 1
+				raise self._reject(status.HTTP_503_SERVICE_UNAVAILABLE, "Timed out waiting for capacity, please retry shortly") from None
+			finally:
+				self.waiting -= 1
+		else:
+			await self._semaphore.acquire()
+
+		self.in_flight += 1
+		self.admitted += 1
+		try:
+			yield
+		finally:
+			self.in_flight -= 1
+			self._semaphore.release()
+
+	def _reject(self, status_code: int, detail: str) -> HTTPException:
+		return HTTPException(
+			status_code=status_code,
+			detail=detail,
+			headers={"Retry-After": str(settings.ADMISSION_RETRY_AFTER_SECONDS)},
+		)
+
+	def stats(self) -> dict:
+		"""Current occupancy and rejection counters"""
+		return {
+			"priority": self.priority,
+			"in_flight": self.in_flight,
+			"waiting": self.waiting,
+			"max_concurrent": self.max_concurrent,
+			"max_queue": self.max_queue,
+			"admitted": self.admitted,
+			"rejected": self.rejected,
+			"timed_out": self.timed_out,
+			"shed": self.shed,
+		}
+
+
+class AdmissionRegistry:
+	"""All admission controllers of this process, and the global load they add up to"""
+
+	def __init__(self):
+		self.controllers: dict[str, AdmissionController] = {}
+
+	def controller(self, name: str) -> AdmissionController:
+		"""Get (creating on first use) the controller for an endpoint, configured from settings"""
+		if name not in self.controllers:
+			limits = settings.ADMISSION_LIMITS.get(name, {})
+			self.controllers[name] = AdmissionController(
+				name,
+				max_concurrent=int(limits.get("concurrency", settings.ADMISSION_DEFAULT_CONCURRENCY)),
+				max_queue=int(limits.get("queue", settings.ADMISSION_DEFAULT_QUEUE)),
+				queue_timeout=limits.get("timeout", settings.ADMISSION_QUEUE_TIMEOUT_SECONDS),
+				priority=settings.ADMISSION_PRIORITIES.get(name, "normal"),
+			)
+		return self.controllers[name]
+
+	def load(self) -> float:
+		"""In-flight plus queued requests over total concurrency, across every endpoint"""
+		capacity = sum(controller.max_concurrent for controller in self.controllers.values())
+		if not capacity:
+			return 0.0
+		return sum(controller.in_flight + controller.waiting for controller in self.controllers.values()) / capacity
+
+	def shed_load(self, priority: str) -> float:
+		"""Load at which requests of this priority start being shed (never, for priorities not in ADMISSION_SHED_LOAD)"""
+		return settings.ADMISSION_SHED_LOAD.get(priority, float("inf"))
+
+	def stats(self) -> dict:
+		"""Global load and per-endpoint counters"""
+		return {
+			"load": round(self.load(), 3),
+			"endpoints": {name: controller.stats() for name, controller in self.controllers.items()},
+		}
+
+
+def admit(name: str):
+	"""
+	Route dependency holding an admission slot of the named endpoint while the request runs:
+
+		@router.post("/{post_id}/vote", dependencies=[admit("vote")])
+	"""
+	controller = admission.controller(name)
+
+	async def admission_slot():
+		async with controller.slot():
+			yield
+
+	return Depends(admission_slot)
+
+
+class AdmissionMiddleware:
+	"""
+	Hold an admission slot for requests to the given paths ({path: endpoint name}) before
+	the route reads the request body, answering 429/503 without receiving it
+	"""
+
+	def __init__(self, app: ASGIApp, paths: dict[str, str]):
+		self.app = app
+		self.controllers = {path: admission.controller(name) for path, name in paths.items()}
+
+	async def __call__(self, scope: Scope, receive: Receive, send: Send):
+		controller = self.controllers.get(scope["path"]) if scope["type"] == "http" else None
+		if controller is None:
+			await self.app(scope, receive, send)
+			return
+
+		admitted = False
+		try:
+			async with controller.slot():
+				admitted = True
+				await self.app(scope, receive, send)
+		except HTTPException as e:
+			# Only the slot's own rejections; the app turns its HTTPExceptions into responses
+			if admitted:
+				raise
+			await JSONResponse({"detail": e.detail}, status_code=e.status_code, headers=e.headers)(scope, receive, send)
+
+
+# Global admission registry
+admission = AdmissionRegistry()
@@ -0,0 +1,62 @@
+"""
+Request body size limits for upload routes, enforced before the route reads the body.
+
+FastAPI parses a multipart form (spooling every part) before the route handler runs, so a
+size check in the handler only fires once the whole upload has been received. This ASGI
+middleware refuses a body whose Content-Length is over the limit without reading any of it,
+and counts the bytes of bodies without one (or that lie about it) as they stream in, failing
+the read with a 413 as soon as they pass the limit.
+"""
+
+from fastapi import HTTPException, status
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.backend.core.metrics import metrics
+
+BODY_BYTES = metrics.counter(f"{metrics.prefix}_limited_body_bytes_total", "Request body bytes received on size-limited routes", ("path",))
+BODY_REJECTIONS = metrics.counter(f"{metrics.prefix}_body_limit_rejections_total", "Requests refused for an oversized body, by how it was detected", ("path", "reason"))
+
+
+class BodyLimitMiddleware:
+	"""Cap the request body of the given paths: {path: max_bytes}"""
+
+	def __init__(self, app: ASGIApp, limits: dict[str, int]):
+		self.app = app
+		self.limits = limits
+
+	async def __call__(self, scope: Scope, receive: Receive, send: Send):
+		max_bytes = self.limits.get(scope["path"]) if scope["type"] == "http" else None
+		if max_bytes is None:
+			await self.app(scope, receive, send)
+			return
+
+		path = scope["path"]
+		content_length = dict(scope["headers"]).get(b"content-length")
+		if content_length is not None and content_length.isdigit() and int(content_length) > max_bytes:
+			BODY_REJECTIONS.inc(path, "content_length")
+			await self._too_large(max_bytes)(scope, receive, send)
+			return
+
+		received = 0
+
+		async def limited_receive() -> Message:
+			nonlocal received
+			message = await receive()
+			if message["type"] == "http.request":
+				chunk_size = len(message.get("body", b""))
+				received += chunk_size
+				BODY_BYTES.inc(path, amount=chunk_size)
+				if received > max_bytes:
+					BODY_REJECTIONS.inc(path, "streamed")
+					# Raised inside the route's body read; FastAPI re-raises HTTPExceptions from body parsing
+					raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=self._detail(max_bytes))
+			return message
+
+		await self.app(scope, limited_receive, send)
+
+	def _too_large(self, max_bytes: int) -> JSONResponse:
+		return JSONResponse({"detail": self._detail(max_bytes)}, status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, headers={"Connection": "close"})
+
+	def _detail(self, max_bytes: int) -> str:
+		return f"Request body exceeds the maximum size of {max_bytes} bytes"
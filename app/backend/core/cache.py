@@ -0,0 +1,93 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+
+class LRUCache:
+	"""Bounded, thread-safe LRU cache with per-entry TTL"""
+
+	def __init__(self, max_entries: int = 1024, ttl_seconds: float = 60.0):
+		self.max_entries = max_entries
+		self.ttl_seconds = ttl_seconds
+		self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+		self._lock = threading.Lock()
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+		self.invalidations = 0
+
+	def get(self, key: str) -> Any | None:
+		"""Return a copy of the cached value, or None on miss/expiry"""
+		with self._lock:
+			entry = self._entries.get(key)
+			if entry is None:
+				self.misses += 1
+				return None
+
+			expires_at, value = entry
+			if expires_at < time.monotonic():
+				del self._entries[key]
+				self.misses += 1
+				return None
+
+			self._entries.move_to_end(key)
+			self.hits += 1
+
+		# Callers mutate the dicts they get back (e.g. vote counters), so never hand out the cached object
+		return copy.deepcopy(value)
+
+	def set(self, key: str, value: Any):
+		"""Store a copy of value, evicting the least recently used entry when full"""
+		if self.max_entries <= 0:
+			return
+
+		value = copy.deepcopy(value)
+		with self._lock:
+			self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+			self._entries.move_to_end(key)
+			while len(self._entries) > self.max_entries:
+				self._entries.popitem(last=False)
+				self.evictions += 1
+
+	def replace(self, key: str, value: Any):
+		"""Overwrite an entry only if it is already cached (used by change listeners)"""
+		with self._lock:
+			if key not in self._entries:
+				return
+			self._entries[key] = (time.monotonic() + self.ttl_seconds, copy.deepcopy(value))
+
+	def merge(self, key: str, fields: dict[str, Any]):
+		"""Apply a partial update to a cached dict so a write does not force a re-read"""
+		with self._lock:
+			entry = self._entries.get(key)
+			if entry is None:
+				return
+			value = copy.deepcopy(entry[1])
+			value.update(copy.deepcopy(fields))
+			self._entries[key] = (entry[0], value)
+
+	def invalidate(self, key: str):
+		"""Drop a single entry"""
+		with self._lock:
+			if self._entries.pop(key, None) is not None:
+				self.invalidations += 1
+
+	def clear(self):
+		"""Drop every entry"""
+		with self._lock:
+			self.invalidations += len(self._entries)
+			self._entries.clear()
+
+	def stats(self) -> dict[str, int]:
+		"""Hit/miss/eviction counters"""
+		with self._lock:
+			return {
+				"size": len(self._entries),
+				"max_entries": self.max_entries,
+				"hits": self.hits,
+				"misses": self.misses,
+				"evictions": self.evictions,
+				"invalidations": self.invalidations,
+			}
@@ -0,0 +1,132 @@
+"""
+Negotiated gzip/brotli response compression as a pure ASGI middleware.
+
+Bodies under minimum_size are sent as-is. Streaming responses (NDJSON exports) are
+compressed chunk by chunk with a flush after each one, so clients still receive data
+as it is produced; Server-Sent Events and already-encoded responses are left alone.
+"""
+
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+	import brotli
+except ImportError:  # Optional dependency: pip install brotli (or the "fast" extra)
+	brotli = None
+
+# Content types never compressed: event streams must not be buffered, images are already compressed
+EXCLUDED_CONTENT_TYPES = ("text/event-stream", "image/")
+
+
+class GzipEncoder:
+	def __init__(self, level: int):
+		self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+	def compress(self, data: bytes) -> bytes:
+		return self._compressor.compress(data)
+
+	def flush(self) -> bytes:
+		return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+	def finish(self) -> bytes:
+		return self._compressor.flush(zlib.Z_FINISH)
+
+
+class BrotliEncoder:
+	def __init__(self, quality: int):
+		self._compressor = brotli.Compressor(quality=quality)
+
+	def compress(self, data: bytes) -> bytes:
+		return self._compressor.process(data)
+
+	def flush(self) -> bytes:
+		return self._compressor.flush()
+
+	def finish(self) -> bytes:
+		return self._compressor.finish()
+
+
+class CompressionMiddleware:
+	"""Compress HTTP responses with the best encoding the client accepts (br, then gzip)"""
+
+	def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+		self.app = app
+		self.minimum_size = minimum_size
+		self.gzip_level = gzip_level
+		self.brotli_quality = brotli_quality
+
+	def _negotiate(self, accept_encoding: str) -> str | None:
+		"""Pick an encoding from Accept-Encoding (q=0 entries excluded)"""
+		accepted = set()
+		for part in accept_encoding.lower().split(","):
+			coding, _, params = part.strip().partition(";")
+			if params.strip().replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+				accepted.add(coding.strip())
+		if brotli is not None and "br" in accepted:
+			return "br"
+		if "gzip" in accepted:
+			return "gzip"
+		return None
+
+	def _encoder(self, encoding: str) -> GzipEncoder | BrotliEncoder:
+		return BrotliEncoder(self.brotli_quality) if encoding == "br" else GzipEncoder(self.gzip_level)
+
+	async def __call__(self, scope: Scope, receive: Receive, send: Send):
+		if scope["type"] != "http":
+			await self.app(scope, receive, send)
+			return
+
+		encoding = self._negotiate(Headers(scope=scope).get("accept-encoding", ""))
+		if encoding is None:
+			await self.app(scope, receive, send)
+			return
+
+		start_message: Message | None = None
+		encoder = None
+		passthrough = False
+
+		async def send_compressed(message: Message):
+			nonlocal start_message, encoder, passthrough
+
+			if message["type"] == "http.response.start":
+				# Hold the headers until the first body chunk shows whether compression applies
+				start_message = message
+				return
+			if message["type"] != "http.response.body":
+				await send(message)
+				return
+
+			body = message.get("body", b"")
+			more_body = message.get("more_body", False)
+
+			if start_message is not None:
+				headers = MutableHeaders(raw=start_message["headers"])
+				content_type = headers.get("content-type", "")
+				passthrough = "content-encoding" in headers or any(content_type.startswith(excluded) for excluded in EXCLUDED_CONTENT_TYPES) or (not more_body and len(body) < self.minimum_size)
+				if not passthrough:
+					encoder = self._encoder(encoding)
+					headers["Content-Encoding"] = encoding
+					headers.add_vary_header("Accept-Encoding")
+					if more_body:
+						del headers["Content-Length"]
+					else:
+						body = encoder.compress(body) + encoder.finish()
+						headers["Content-Length"] = str(len(body))
+						await send(start_message)
+						start_message = None
+						await send({"type": "http.response.body", "body": body})
+						return
+				await send(start_message)
+				start_message = None
+
+			if passthrough:
+				await send(message)
+				return
+
+			# Streaming: flush every chunk so the client is not kept waiting on the compressor's buffer
+			chunk = encoder.compress(body) + (encoder.flush() if more_body else encoder.finish())
+			await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+		await self.app(scope, receive, send_compressed)
@@ -1,5 +1,3 @@
-import os
-
 from pydantic_settings import BaseSettings
 
 
@@ -15,12 +13,86 @@ class Settings(BaseSettings):
 	# File Upload Settings
 	UPLOAD_DIR: str = "uploads"
 	MAX_FILE_SIZE: int = 10 * 1024 * 1024  # 10MB
+	UPLOAD_CHUNK_SIZE: int = 64 * 1024  # Uploads are read and spooled to disk in chunks of this size
+	# Whole request body of an upload: a MAX_FILE_SIZE image sent base64-encoded (x4/3) plus the form fields.
+	# Larger bodies are refused before they are read (see BodyLimitMiddleware)
+	MAX_UPLOAD_BODY_SIZE: int = 14 * 1024 * 1024
+
+	# Response compression (gzip, or brotli when installed)
+	COMPRESSION_MINIMUM_SIZE: int = 1024  # Smaller bodies are sent uncompressed
+	COMPRESSION_GZIP_LEVEL: int = 1  # Inline base64 images compress about the same at every level; 1 is the cheapest
+	COMPRESSION_BROTLI_QUALITY: int = 4  # 0-11; above ~5 costs far more CPU per feed for little gain
+
+	# Streaming NDJSON export
+	EXPORT_CHUNK_BYTES: int = 64 * 1024  # Export lines are buffered up to this size per write
+
+	# Batch endpoints
+	VOTE_BATCH_MAX_SIZE: int = 500  # Votes per POST /posts/votes:batch request
+	INGEST_BATCH_MAX_SIZE: int = 500  # Extracted events per POST /posts:batch request
+
+	# Image Processing
+	# Process pool size per gunicorn worker (~90 MB per image worker); 1 fits app.yaml's 1 CPU / 0.5 GB
+	# instance. Raise it (env IMAGE_WORKERS) on bigger instances; 0 uses one worker per CPU
+	IMAGE_WORKERS: int = 1
+	IMAGE_QUEUE_LIMIT: int = 16  # Images queued or in flight per server process before uploads get a 503
+	IMAGE_RETRY_AFTER_SECONDS: int = 2
+	IMAGE_WEBP_RENDITIONS: bool = True  # Store a WebP variant of the card/thumbnail renditions for clients that accept it
+	IMAGE_REUSE_MAX_BYTES: int = 1024 * 1024  # Uploads up to this size already within a rendition's policy are stored without re-encoding
+	IMAGE_DEDUP_MAX_ENTRIES: int = 512  # Processed uploads remembered for exact (sha256) and near (dHash) duplicate detection
+	IMAGE_DEDUP_TTL_SECONDS: float = 24 * 60 * 60
+	IMAGE_NEAR_DUPLICATE_DISTANCE: int = 6  # Max differing dHash bits (of 64) to flag a near-duplicate
+
+	# Async post creation (?async=true): background processing of pending posts
+	POST_PROCESSING_CONCURRENCY: int = 4  # Posts processed at once; keep below IMAGE_QUEUE_LIMIT
+	POST_PROCESSING_BACKLOG: int = 64  # Pending posts per server process before async creates get a 503
+
+	# Live event stream (SSE / WebSocket)
+	LIVE_QUEUE_SIZE: int = 256  # Events buffered per client before its backlog is dropped for a "resync"
+	LIVE_MAX_SUBSCRIBERS: int = 1000  # Connected clients per server process
+	LIVE_KEEPALIVE_SECONDS: float = 15.0  # Idle interval between SSE keepalive comments / WebSocket pings
+
+	# Geo alerts for high-severity posts
+	ALERT_SEVERITIES: list[str] = ["high"]  # Post severities that trigger alerts
+	ALERT_CATEGORIES: list[str] = ["flood", "accident", "road_closure"]  # Categories that always trigger alerts
+	ALERT_GRID_DEGREES: float = 0.05  # Subscription index cell size (~5.5 km of latitude)
+	ALERT_MAX_CELLS_PER_SUBSCRIPTION: int = 2500  # Rejects areas larger than roughly 275 x 275 km
+	ALERT_OUTBOX_SIZE: int = 1000  # Webhook stand-in deliveries kept for inspection
+
+	# Admission control (per endpoint: concurrency limit, wait queue, shedding by priority)
+	ADMISSION_DEFAULT_CONCURRENCY: int = 64
+	ADMISSION_DEFAULT_QUEUE: int = 128
+	ADMISSION_QUEUE_TIMEOUT_SECONDS: float = 5.0  # Queued requests get a 503 after waiting this long
+	ADMISSION_RETRY_AFTER_SECONDS: int = 2
+	ADMISSION_LIMITS: dict[str, dict[str, float]] = {"create_post": {"concurrency": 8, "queue": 16, "timeout": 10.0}}
+	ADMISSION_PRIORITIES: dict[str, str] = {"feed": "high", "vote": "normal", "create_post": "low", "ingest": "low"}
+	ADMISSION_SHED_LOAD: dict[str, float] = {"low": 0.7, "normal": 0.9}  # Global load at which each priority is shed
+
+	# Admin API (profiling); disabled while ADMIN_TOKEN is unset
+	ADMIN_TOKEN: str | None = None
+	PROFILER_MAX_SECONDS: float = 60.0  # Longest sampling session or trace wait
+	PROFILER_INTERVAL_MS: float = 5.0  # Default time between stack samples
+	PROFILER_MAX_TRACE_REQUESTS: int = 100
+
+	# Firebase
+	GOOGLE_APPLICATION_CREDENTIALS: str | None = None  # Service account file; default credentials when unset
+	FIRESTORE_WARMUP_ON_STARTUP: bool = False  # Connect in the background at startup instead of on first use
 
 	# Firestore Collections
 	USERS_COLLECTION: str = "users"
+	USER_EMAILS_COLLECTION: str = "user_emails"  # Email uniqueness index: sha256(normalized email) -> user_id
 	POSTS_COLLECTION: str = "posts"
+	POST_SUMMARIES_COLLECTION: str = "post_summaries"  # Slim per-post projection for feed/map reads
 	VOTES_COLLECTION: str = "votes"
 
+	# Firestore read-through cache
+	FIRESTORE_CACHE_MAX_ENTRIES: int = 2048
+	FIRESTORE_CACHE_TTL_SECONDS: float = 30.0
+	FIRESTORE_CACHE_LISTENERS: bool = False  # Keep cached users/posts fresh with on_snapshot listeners
+
+	# Firestore bulk writes
+	FIRESTORE_BULK_MAX_OPS_PER_SECOND: int = 500
+	FIRESTORE_BULK_MAX_ATTEMPTS: int = 10
+
 	# Agent Configuration
 	OPENAI_API_KEY: str | None = None
 	OPENAI_MODEL_NAME: str = "gpt-4.1"  # Default to gpt-4.1
@@ -39,6 +111,3 @@ class Settings(BaseSettings):
 
 
 settings = Settings()
-
-# Create upload directory if it doesn't exist
-os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
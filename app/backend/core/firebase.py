@@ -0,0 +1,59 @@
+"""
+Lazily initialized Firebase Admin app and Firestore client shared by all modules.
+
+Importing firebase_admin/google.cloud and loading credentials costs hundreds of
+milliseconds, so nothing here runs at import time: the first caller pays for it,
+or the App Engine warmup request does (see FirestoreService.warmup()).
+"""
+
+import threading
+from typing import Any
+
+from app.backend.core.config import settings
+
+_lock = threading.Lock()
+_firebase_app = None
+_firestore_client = None
+
+
+def get_firebase_app() -> Any:
+	"""Return the default Firebase Admin app, initializing it on first use"""
+	global _firebase_app  # noqa: PLW0603
+
+	if _firebase_app is not None:
+		return _firebase_app
+
+	with _lock:
+		if _firebase_app is None:
+			import firebase_admin
+			from firebase_admin import credentials
+
+			if firebase_admin._apps:
+				_firebase_app = firebase_admin.get_app()
+			elif settings.GOOGLE_APPLICATION_CREDENTIALS:
+				# Use service account credentials if provided
+				cred = credentials.Certificate(settings.GOOGLE_APPLICATION_CREDENTIALS)
+				_firebase_app = firebase_admin.initialize_app(cred)
+			else:
+				# Use default credentials (for local development)
+				_firebase_app = firebase_admin.initialize_app()
+			print("✅ Firebase Admin SDK initialized successfully")
+
+	return _firebase_app
+
+
+def get_firestore_client() -> Any:
+	"""Return the shared Firestore client, creating it on first use"""
+	global _firestore_client  # noqa: PLW0603
+
+	if _firestore_client is not None:
+		return _firestore_client
+
+	app = get_firebase_app()
+	with _lock:
+		if _firestore_client is None:
+			from firebase_admin import firestore
+
+			_firestore_client = firestore.client(app)
+
+	return _firestore_client
@@ -1,25 +1,11 @@
 from typing import Any
 
-import firebase_admin
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from firebase_admin import auth, credentials
-
-from app.core.config import settings
-
-# Initialize Firebase Admin SDK
-try:
-	if not firebase_admin._apps:
-		# Use service account credentials if provided
-		if settings.GOOGLE_APPLICATION_CREDENTIALS:
-			cred = credentials.Certificate(settings.GOOGLE_APPLICATION_CREDENTIALS)
-			firebase_admin.initialize_app(cred)
-		else:
-			# Use default credentials (for local development)
-			firebase_admin.initialize_app()
-	print("✅ Firebase Admin SDK initialized successfully")
-except Exception as e:
-	print(f"❌ Error initializing Firebase Admin SDK: {e}")
+
+from app.backend.core.firebase import get_firebase_app
+
+# firebase_admin is imported, and the Admin SDK initialized by get_firebase_app(), on the first auth call
 
 # Security scheme for JWT tokens
 security = HTTPBearer()
@@ -33,9 +19,11 @@ class FirebaseAuth:
 		"""
 		Verify Firebase ID token and return user info
 		"""
+		from firebase_admin import auth
+
 		try:
 			# Verify the Firebase ID token
-			decoded_token = auth.verify_id_token(token)
+			decoded_token = auth.verify_id_token(token, app=get_firebase_app())
 
 			# Extract user information
 			user_info = {
@@ -84,8 +72,10 @@ class FirebaseAuth:
 		"""
 		Get user information from Firebase by UID
 		"""
+		from firebase_admin import auth
+
 		try:
-			user_record = auth.get_user(uid)
+			user_record = auth.get_user(uid, app=get_firebase_app())
 			return {
 				"uid": user_record.uid,
 				"email": user_record.email,
@@ -107,8 +97,10 @@ class FirebaseAuth:
 		"""
 		Create a custom token for a user
 		"""
+		from firebase_admin import auth
+
 		try:
-			custom_token = auth.create_custom_token(uid, additional_claims)
+			custom_token = auth.create_custom_token(uid, additional_claims, app=get_firebase_app())
 			return custom_token.decode("utf-8")
 		except Exception as e:
 			print(f"Error creating custom token: {e}")
@@ -1,44 +1,150 @@
+import hashlib
+import threading
 import uuid
+from collections.abc import Callable, Iterable
 from datetime import datetime
 from typing import Any
 
-import firebase_admin
-from firebase_admin import credentials, firestore
-from google.cloud import firestore as google_firestore
-
+from app.backend.core.cache import LRUCache
 from app.backend.core.config import settings
+from app.backend.core.firebase import get_firestore_client
+
+# google.cloud.firestore is imported inside the methods that need it so that
+# importing this module (and the routers that use it) stays cheap on cold start
+
+
+# gRPC status codes worth retrying in bulk writes: DEADLINE_EXCEEDED, RESOURCE_EXHAUSTED, ABORTED, INTERNAL, UNAVAILABLE
+RETRYABLE_BULK_CODES = {4, 8, 10, 13, 14}
+
+
+# Fields copied into the slim post_summaries projection read by feed and map queries
+POST_SUMMARY_FIELDS = (
+	"id",
+	"title",
+	"username",
+	"user_id",
+	"upvote_count",
+	"downvote_count",
+	"karma",
+	"created_at",
+	"Geolocation",
+	"category",
+	"image_placeholder",
+)
+
+
+def post_summary(post_data: dict[str, Any]) -> dict[str, Any]:
+	"""Project a post (or a partial post update) onto the summary fields"""
+	return {field: post_data[field] for field in POST_SUMMARY_FIELDS if field in post_data}
+
+
+class EmailAlreadyRegisteredError(Exception):
+	"""Raised when an email is already claimed by another user"""
+
+
+def normalize_email(email: str) -> str:
+	"""Canonical form used for uniqueness checks"""
+	return email.strip().lower()
+
+
+def email_key(email: str) -> str:
+	"""Document id in the email index (hashed, since emails may contain characters Firestore ids reject)"""
+	return hashlib.sha256(normalize_email(email).encode("utf-8")).hexdigest()
 
 
 class FirestoreService:
 	def __init__(self):
-		self.db = None
-		self._initialize_firestore()
+		self._db = None
+		self._initialized = False
+		self._init_lock = threading.Lock()
+		self.user_cache = LRUCache(settings.FIRESTORE_CACHE_MAX_ENTRIES, settings.FIRESTORE_CACHE_TTL_SECONDS)
+		self.post_cache = LRUCache(settings.FIRESTORE_CACHE_MAX_ENTRIES, settings.FIRESTORE_CACHE_TTL_SECONDS)
+		self._watches = {}
+
+	@property
+	def db(self):
+		"""Firestore client, connected lazily on first use"""
+		if not self._initialized:
+			with self._init_lock:
+				if not self._initialized:
+					self._initialize_firestore()
+					self._initialized = True
+
+					if self._db is not None and settings.FIRESTORE_CACHE_LISTENERS:
+						self.watch_collection(settings.USERS_COLLECTION)
+						self.watch_collection(settings.POSTS_COLLECTION)
+		return self._db
+
+	@db.setter
+	def db(self, client):
+		self._db = client
+		self._initialized = True
 
 	def _initialize_firestore(self):
 		"""Initialize Firestore connection"""
 		try:
-			# Check if Firebase Admin is already initialized
-			if not firebase_admin._apps:
-				# Use service account credentials if provided
-				if settings.GOOGLE_APPLICATION_CREDENTIALS:
-					cred = credentials.Certificate(settings.GOOGLE_APPLICATION_CREDENTIALS)
-					firebase_admin.initialize_app(cred)
-				else:
-					# Use default credentials (for local development)
-					firebase_admin.initialize_app()
-
-			self.db = firestore.client()
+			self._db = get_firestore_client()
 			print("✅ Firestore initialized successfully")
 
 		except Exception as e:
 			print(f"❌ Error initializing Firestore: {e}")
 			# Fallback to local JSON for development
-			self.db = None
+			self._db = None
 
 	def is_connected(self) -> bool:
 		"""Check if Firestore is connected"""
 		return self.db is not None
 
+	def warmup(self) -> bool:
+		"""Connect ahead of the first real request (App Engine warmup / startup hook)"""
+		return self.is_connected()
+
+	# Cache Operations
+	def _cache_for(self, collection_name: str) -> LRUCache | None:
+		"""Return the read-through cache backing a collection, if any"""
+		if collection_name == settings.USERS_COLLECTION:
+			return self.user_cache
+		if collection_name == settings.POSTS_COLLECTION:
+			return self.post_cache
+		return None
+
+	def watch_collection(self, collection_name: str) -> bool:
+		"""
+		Keep cached documents of a hot collection fresh with an on_snapshot listener.
+		Only entries that are already cached are refreshed, so the initial snapshot
+		does not flood the cache with the whole collection.
+		"""
+		cache = self._cache_for(collection_name)
+		if not self.is_connected() or cache is None or collection_name in self._watches:
+			return False
+
+		def on_snapshot(_col_snapshot, changes, _read_time):
+			for change in changes:
+				if change.type.name == "REMOVED":
+					cache.invalidate(change.document.id)
+				else:
+					cache.replace(change.document.id, change.document.to_dict())
+
+		try:
+			self._watches[collection_name] = self.db.collection(collection_name).on_snapshot(on_snapshot)
+			return True
+		except Exception as e:
+			print(f"Error watching collection {collection_name}: {e}")
+			return False
+
+	def stop_watching(self):
+		"""Unsubscribe all snapshot listeners"""
+		for watch in self._watches.values():
+			watch.unsubscribe()
+		self._watches.clear()
+
+	def cache_stats(self) -> dict[str, dict[str, int]]:
+		"""Hit/miss/eviction counters for the user and post caches"""
+		return {
+			"users": self.user_cache.stats(),
+			"posts": self.post_cache.stats(),
+		}
+
 	# User Operations
 	async def create_user(self, user_data: dict[str, Any]) -> str:
 		"""Create a new user"""
@@ -52,9 +158,27 @@ class FirestoreService:
 			user_data["updated_at"] = datetime.utcnow()
 
 			doc_ref = self.db.collection(settings.USERS_COLLECTION).document(user_id)
-			doc_ref.set(user_data)
+			email_ref = self.db.collection(settings.USER_EMAILS_COLLECTION).document(email_key(user_data["email"]))
+
+			if self._find_unindexed_user(user_data["email"]):
+				raise EmailAlreadyRegisteredError(user_data["email"])
+
+			# Claim the email and create the user atomically so concurrent registrations cannot both succeed
+			from google.cloud import firestore as google_firestore
+
+			@google_firestore.transactional
+			def create_in_transaction(transaction):
+				if email_ref.get(transaction=transaction).exists:
+					raise EmailAlreadyRegisteredError(user_data["email"])
+				transaction.set(email_ref, {"user_id": user_id, "email": normalize_email(user_data["email"])})
+				transaction.set(doc_ref, user_data)
+
+			create_in_transaction(self.db.transaction())
+			self.user_cache.set(user_id, user_data)
 
 			return user_id
+		except EmailAlreadyRegisteredError:
+			raise
 		except Exception as e:
 			print(f"Error creating user: {e}")
 			return None
@@ -64,17 +188,51 @@ class FirestoreService:
 		if not self.is_connected():
 			return None
 
+		cached = self.user_cache.get(user_id)
+		if cached is not None:
+			return cached
+
 		try:
 			doc_ref = self.db.collection(settings.USERS_COLLECTION).document(user_id)
 			doc = doc_ref.get()
 
 			if doc.exists:
-				return doc.to_dict()
+				user = doc.to_dict()
+				self.user_cache.set(user_id, user)
+				return user
 			return None
 		except Exception as e:
 			print(f"Error getting user: {e}")
 			return None
 
+	async def get_user_by_email(self, email: str) -> dict[str, Any] | None:
+		"""Get user by email via the email index (no collection scan)"""
+		if not self.is_connected():
+			return None
+
+		try:
+			email_doc = self.db.collection(settings.USER_EMAILS_COLLECTION).document(email_key(email)).get()
+			if not email_doc.exists:
+				return self._find_unindexed_user(email)
+			return await self.get_user(email_doc.to_dict()["user_id"])
+		except Exception as e:
+			print(f"Error getting user by email: {e}")
+			return None
+
+	def _find_unindexed_user(self, email: str) -> dict[str, Any] | None:
+		"""
+		Find a user by their email field and write the missing index entry.
+		Users created before the email index existed have no entry until they are looked up here
+		"""
+		candidates = sorted({email, normalize_email(email)})
+		for doc in self.db.collection(settings.USERS_COLLECTION).where("email", "in", candidates).limit(1).stream():
+			user = doc.to_dict()
+			user["id"] = doc.id
+			self.db.collection(settings.USER_EMAILS_COLLECTION).document(email_key(email)).set({"user_id": doc.id, "email": normalize_email(email)})
+			self.user_cache.set(doc.id, user)
+			return user
+		return None
+
 	async def update_user(self, user_id: str, user_data: dict[str, Any]) -> bool:
 		"""Update user data"""
 		if not self.is_connected():
@@ -83,20 +241,60 @@ class FirestoreService:
 		try:
 			user_data["updated_at"] = datetime.utcnow()
 			doc_ref = self.db.collection(settings.USERS_COLLECTION).document(user_id)
-			doc_ref.update(user_data)
+
+			if user_data.get("email"):
+				self._update_user_with_email(doc_ref, user_data)
+			else:
+				doc_ref.update(user_data)
+
+			self.user_cache.merge(user_id, user_data)
 			return True
+		except EmailAlreadyRegisteredError:
+			raise
 		except Exception as e:
 			print(f"Error updating user: {e}")
 			return False
 
+	def _update_user_with_email(self, doc_ref, user_data: dict[str, Any]):
+		"""Update a user and move their email index entry in one transaction"""
+		emails = self.db.collection(settings.USER_EMAILS_COLLECTION)
+		new_email_ref = emails.document(email_key(user_data["email"]))
+
+		unindexed = self._find_unindexed_user(user_data["email"]) if not new_email_ref.get().exists else None
+		if unindexed and unindexed["id"] != doc_ref.id:
+			raise EmailAlreadyRegisteredError(user_data["email"])
+
+		from google.cloud import firestore as google_firestore
+
+		@google_firestore.transactional
+		def update_in_transaction(transaction):
+			user_doc = doc_ref.get(transaction=transaction)
+			new_email_doc = new_email_ref.get(transaction=transaction)
+			if new_email_doc.exists and new_email_doc.to_dict()["user_id"] != doc_ref.id:
+				raise EmailAlreadyRegisteredError(user_data["email"])
+
+			old_email = (user_doc.to_dict() or {}).get("email")
+			if old_email and email_key(old_email) != new_email_ref.id:
+				transaction.delete(emails.document(email_key(old_email)))
+			transaction.set(new_email_ref, {"user_id": doc_ref.id, "email": normalize_email(user_data["email"])})
+			transaction.update(doc_ref, user_data)
+
+		update_in_transaction(self.db.transaction())
+
 	async def delete_user(self, user_id: str) -> bool:
 		"""Delete user"""
 		if not self.is_connected():
 			return False
 
 		try:
+			user = await self.get_user(user_id)
 			doc_ref = self.db.collection(settings.USERS_COLLECTION).document(user_id)
-			doc_ref.delete()
+			batch = self.db.batch()
+			batch.delete(doc_ref)
+			if user and user.get("email"):
+				batch.delete(self.db.collection(settings.USER_EMAILS_COLLECTION).document(email_key(user["email"])))
+			batch.commit()
+			self.user_cache.invalidate(user_id)
 			return True
 		except Exception as e:
 			print(f"Error deleting user: {e}")
@@ -117,8 +315,11 @@ class FirestoreService:
 			post_data["downvote_count"] = 0
 			post_data["karma"] = 0.0
 
-			doc_ref = self.db.collection(settings.POSTS_COLLECTION).document(post_id)
-			doc_ref.set(post_data)
+			batch = self.db.batch()
+			batch.set(self.db.collection(settings.POSTS_COLLECTION).document(post_id), post_data)
+			batch.set(self.db.collection(settings.POST_SUMMARIES_COLLECTION).document(post_id), post_summary(post_data))
+			batch.commit()
+			self.post_cache.set(post_id, post_data)
 
 			return post_id
 		except Exception as e:
@@ -130,25 +331,41 @@ class FirestoreService:
 		if not self.is_connected():
 			return None
 
+		cached = self.post_cache.get(post_id)
+		if cached is not None:
+			return cached
+
 		try:
 			doc_ref = self.db.collection(settings.POSTS_COLLECTION).document(post_id)
 			doc = doc_ref.get()
 
 			if doc.exists:
-				return doc.to_dict()
+				post = doc.to_dict()
+				self.post_cache.set(post_id, post)
+				return post
 			return None
 		except Exception as e:
 			print(f"Error getting post: {e}")
 			return None
 
-	async def get_posts(self, limit: int = 50, offset: int = 0) -> list[dict[str, Any]]:
-		"""Get posts with pagination"""
+	async def get_posts(self, limit: int = 50, offset: int = 0, fields: Iterable[str] | None = None) -> list[dict[str, Any]]:
+		"""
+		Get posts with pagination.
+		With fields, only those are read (a field mask); if they are all summary fields the
+		slim post_summaries collection is queried instead.
+		"""
 		if not self.is_connected():
 			return []
 
+		fields = list(fields) if fields else None
+		if fields and set(fields) <= set(POST_SUMMARY_FIELDS):
+			return await self.get_post_summaries(limit, offset, fields)
+
 		try:
 			posts_ref = self.db.collection(settings.POSTS_COLLECTION)
-			posts_ref = posts_ref.order_by("created_at", direction=firestore.Query.DESCENDING)
+			if fields:
+				posts_ref = posts_ref.select(fields)
+			posts_ref = posts_ref.order_by("created_at", direction="DESCENDING")
 			posts_ref = posts_ref.limit(limit).offset(offset)
 
 			docs = posts_ref.stream()
@@ -163,6 +380,23 @@ class FirestoreService:
 			print(f"Error getting posts: {e}")
 			return []
 
+	async def get_post_summaries(self, limit: int = 50, offset: int = 0, fields: Iterable[str] | None = None) -> list[dict[str, Any]]:
+		"""Get slim post projections (no image or description) with pagination, optionally only some fields"""
+		if not self.is_connected():
+			return []
+
+		try:
+			summaries_ref = self.db.collection(settings.POST_SUMMARIES_COLLECTION)
+			if fields:
+				summaries_ref = summaries_ref.select(list(fields))
+			summaries_ref = summaries_ref.order_by("created_at", direction="DESCENDING")
+			summaries_ref = summaries_ref.limit(limit).offset(offset)
+
+			return [doc.to_dict() for doc in summaries_ref.stream()]
+		except Exception as e:
+			print(f"Error getting post summaries: {e}")
+			return []
+
 	async def update_post(self, post_id: str, post_data: dict[str, Any]) -> bool:
 		"""Update post data"""
 		if not self.is_connected():
@@ -170,8 +404,14 @@ class FirestoreService:
 
 		try:
 			post_data["updated_at"] = datetime.utcnow()
-			doc_ref = self.db.collection(settings.POSTS_COLLECTION).document(post_id)
-			doc_ref.update(post_data)
+			batch = self.db.batch()
+			batch.update(self.db.collection(settings.POSTS_COLLECTION).document(post_id), post_data)
+			summary = post_summary(post_data)
+			if summary:
+				# Merged rather than updated: posts created before post_summaries existed have no summary yet
+				batch.set(self.db.collection(settings.POST_SUMMARIES_COLLECTION).document(post_id), summary, merge=True)
+			batch.commit()
+			self.post_cache.merge(post_id, post_data)
 			return True
 		except Exception as e:
 			print(f"Error updating post: {e}")
@@ -183,36 +423,202 @@ class FirestoreService:
 			return False
 
 		try:
-			doc_ref = self.db.collection(settings.POSTS_COLLECTION).document(post_id)
-			doc_ref.delete()
+			batch = self.db.batch()
+			batch.delete(self.db.collection(settings.POSTS_COLLECTION).document(post_id))
+			batch.delete(self.db.collection(settings.POST_SUMMARIES_COLLECTION).document(post_id))
+			batch.commit()
+			self.post_cache.invalidate(post_id)
 			return True
 		except Exception as e:
 			print(f"Error deleting post: {e}")
 			return False
 
+	# Bulk Operations
+	async def bulk_write(
+		self,
+		collection_name: str,
+		operations: Iterable[tuple[str, str, dict[str, Any] | None]],
+		progress: Callable[[int, int], None] | None = None,
+		max_ops_per_second: int | None = None,
+		max_attempts: int | None = None,
+	) -> dict[str, Any]:
+		"""
+		Apply many (op, doc_id, data) writes with a BulkWriter.
+		op is one of "set", "update" or "delete". Writes are sent in parallel batches,
+		ramped up to max_ops_per_second, and retried on contention/unavailability.
+		progress(done, total) is called as writes complete.
+		Writes to the posts collection are mirrored into post_summaries; only the
+		primary writes are counted in the result and progress.
+		"""
+		if not self.is_connected():
+			return {"written": 0, "failed": []}
+
+		from google.cloud.firestore_v1.bulk_writer import BulkRetry, BulkWriterOptions
+
+		operations = list(operations)
+		total = len(operations)
+		max_attempts = max_attempts or settings.FIRESTORE_BULK_MAX_ATTEMPTS
+		max_ops_per_second = max_ops_per_second or settings.FIRESTORE_BULK_MAX_OPS_PER_SECOND
+		lock = threading.Lock()
+		result = {"written": 0, "failed": []}
+		completed = [0]
+
+		def on_result(reference, _write_result, _bulk_writer):
+			if reference.parent.id != collection_name:
+				return
+			with lock:
+				result["written"] += 1
+				completed[0] += 1
+				done = completed[0]
+			if progress:
+				progress(done, total)
+
+		def on_error(error, _bulk_writer) -> bool:
+			if error.code in RETRYABLE_BULK_CODES and error.attempts < max_attempts:
+				return True
+			reference = error.operation.reference
+			with lock:
+				result["failed"].append({"id": reference.id, "collection": reference.parent.id, "code": error.code, "message": error.message})
+				if reference.parent.id != collection_name:
+					return False
+				completed[0] += 1
+				done = completed[0]
+			if progress:
+				progress(done, total)
+			return False
+
+		options = BulkWriterOptions(
+			initial_ops_per_second=min(500, max_ops_per_second),
+			max_ops_per_second=max_ops_per_second,
+			retry=BulkRetry.exponential,
+		)
+		cache = self._cache_for(collection_name)
+		collection = self.db.collection(collection_name)
+		summaries = self.db.collection(settings.POST_SUMMARIES_COLLECTION) if collection_name == settings.POSTS_COLLECTION else None
+
+		try:
+			bulk_writer = self.db.bulk_writer(options=options)
+			bulk_writer.on_write_result(on_result)
+			bulk_writer.on_write_error(on_error)
+
+			for op, doc_id, data in operations:
+				if op not in ("set", "update", "delete"):
+					raise ValueError(f"Unknown bulk operation: {op}")
+
+				self._add_bulk_operation(bulk_writer, op, collection.document(doc_id), data)
+				if summaries is not None:
+					summary = post_summary(data) if data else None
+					if op == "delete" or summary:
+						# Summaries are merged on update, since older posts may not have one yet
+						self._add_bulk_operation(bulk_writer, "merge" if op == "update" else op, summaries.document(doc_id), summary)
+
+				# Cached copies are dropped rather than updated, since a write may still fail
+				if cache is not None:
+					cache.invalidate(doc_id)
+
+			bulk_writer.close()
+		except Exception as e:
+			print(f"Error during bulk write to {collection_name}: {e}")
+
+		return result
+
+	def _add_bulk_operation(self, bulk_writer, op: str, doc_ref, data: dict[str, Any] | None):
+		"""Queue a single set/merge/update/delete on a BulkWriter"""
+		if op == "set":
+			bulk_writer.set(doc_ref, data)
+		elif op == "merge":
+			bulk_writer.set(doc_ref, data, merge=True)
+		elif op == "update":
+			bulk_writer.update(doc_ref, data)
+		else:
+			bulk_writer.delete(doc_ref)
+
+	async def bulk_create_posts(
+		self,
+		posts: Iterable[dict[str, Any]],
+		progress: Callable[[int, int], None] | None = None,
+		max_ops_per_second: int | None = None,
+	) -> dict[str, Any]:
+		"""
+		Create many posts at once.
+		Existing ids and vote counters are kept so that imported posts round-trip.
+		"""
+		operations = []
+		for post in posts:
+			post_data = dict(post)
+			post_id = str(post_data.get("id") or uuid.uuid4())
+			now = datetime.utcnow()
+			post_data["id"] = post_id
+			post_data.setdefault("created_at", now)
+			post_data["updated_at"] = now
+			post_data.setdefault("upvote_count", 0)
+			post_data.setdefault("downvote_count", 0)
+			post_data.setdefault("karma", self._calculate_karma(post_data["upvote_count"]))
+			operations.append(("set", post_id, post_data))
+
+		result = await self.bulk_write(settings.POSTS_COLLECTION, operations, progress, max_ops_per_second)
+		result["ids"] = [post_id for _, post_id, _ in operations]
+		return result
+
+	async def bulk_update_posts(
+		self,
+		updates: dict[str, dict[str, Any]],
+		progress: Callable[[int, int], None] | None = None,
+		max_ops_per_second: int | None = None,
+	) -> dict[str, Any]:
+		"""Apply partial updates to many posts, keyed by post id"""
+		now = datetime.utcnow()
+		operations = [("update", post_id, {**post_data, "updated_at": now}) for post_id, post_data in updates.items()]
+		return await self.bulk_write(settings.POSTS_COLLECTION, operations, progress, max_ops_per_second)
+
+	async def bulk_delete_posts(
+		self,
+		post_ids: Iterable[str],
+		progress: Callable[[int, int], None] | None = None,
+		max_ops_per_second: int | None = None,
+	) -> dict[str, Any]:
+		"""Delete many posts by id"""
+		operations = [("delete", post_id, None) for post_id in post_ids]
+		return await self.bulk_write(settings.POSTS_COLLECTION, operations, progress, max_ops_per_second)
+
+	async def backfill_post_summaries(
+		self,
+		progress: Callable[[int, int], None] | None = None,
+		max_ops_per_second: int | None = None,
+	) -> dict[str, Any]:
+		"""(Re)write the post_summaries projection of every post, reading only the summary fields"""
+		if not self.is_connected():
+			return {"written": 0, "failed": []}
+
+		try:
+			docs = self.db.collection(settings.POSTS_COLLECTION).select(list(POST_SUMMARY_FIELDS)).stream()
+			operations = [("set", doc.id, post_summary(doc.to_dict())) for doc in docs]
+		except Exception as e:
+			print(f"Error reading posts for the summary backfill: {e}")
+			return {"written": 0, "failed": []}
+		return await self.bulk_write(settings.POST_SUMMARIES_COLLECTION, operations, progress, max_ops_per_second)
+
 	# Vote Operations
 	async def vote_post(self, post_id: str, user_id: str, vote_type: str) -> bool:
-		"""Vote on a post (upvote/downvote)"""
+		"""
+		Vote on a post (upvote/downvote).
+		Counters are changed with server-side increments rather than by writing back a
+		(possibly cached, possibly stale) copy, so votes handled by different workers add up
+		"""
 		if not self.is_connected():
 			return False
 
 		try:
-			# Get current post
-			post = await self.get_post(post_id)
-			if not post:
-				return False
+			from google.api_core.exceptions import NotFound
+			from google.cloud import firestore as google_firestore
 
-			# Update vote counts
+			# Karma is 0.5 per upvote (see _calculate_karma), so it can be incremented alongside the count
 			if vote_type == "upvote":
-				post["upvote_count"] += 1
+				counters = {"upvote_count": google_firestore.Increment(1), "karma": google_firestore.Increment(0.5)}
 			elif vote_type == "downvote":
-				post["downvote_count"] += 1
-
-			# Recalculate karma
-			post["karma"] = self._calculate_karma(post["upvote_count"])
-
-			# Update post
-			await self.update_post(post_id, post)
+				counters = {"downvote_count": google_firestore.Increment(1)}
+			else:
+				counters = {}
 
 			# Store vote record
 			vote_data = {
@@ -222,10 +628,22 @@ class FirestoreService:
 				"created_at": datetime.utcnow(),
 			}
 
-			vote_id = f"{post_id}_{user_id}"
-			doc_ref = self.db.collection(settings.VOTES_COLLECTION).document(vote_id)
-			doc_ref.set(vote_data)
-
+			# update() fails with NOT_FOUND for a missing post, which aborts the whole batch
+			batch = self.db.batch()
+			batch.update(self.db.collection(settings.POSTS_COLLECTION).document(post_id), {**counters, "updated_at": datetime.utcnow()})
+			batch.set(self.db.collection(settings.VOTES_COLLECTION).document(f"{post_id}_{user_id}"), vote_data)
+			batch.commit()
+
+			# Mirror the counters onto the summary only if it exists: a merge set would create a partial
+			# summary (counts without title/location) for posts backfill_post_summaries has not reached yet
+			if counters:
+				try:
+					self.db.collection(settings.POST_SUMMARIES_COLLECTION).document(post_id).update(counters)
+				except NotFound:
+					pass
+
+			# The new totals are only known to Firestore; the next read fetches them
+			self.post_cache.invalidate(post_id)
 			return True
 		except Exception as e:
 			print(f"Error voting on post: {e}")
@@ -247,7 +665,8 @@ class FirestoreService:
 			# Note: Firestore doesn't support native geospatial queries
 			# This is a simplified implementation
 			# For production, consider using GeoFirestore or similar
-			posts = await self.get_posts(limit=100)
+			# Only coordinates are needed, so read the slim projection instead of full posts
+			posts = await self.get_post_summaries(limit=100)
 
 			# Filter by distance
 			filtered_posts = []
@@ -0,0 +1,266 @@
+"""
+In-process metrics exposed at /metrics in the Prometheus text format.
+
+Counters, gauges and fixed-bucket histograms keyed by label values, each guarded by
+its own lock (an observation is a dict lookup, a bisect and two additions).
+MetricsMiddleware times every HTTP request by route template, span() times internal
+steps (data file saves, image processing, reranking, LLM calls), and the stats() dicts
+the services already keep are read at scrape time through register_stats().
+"""
+
+import bisect
+import math
+import re
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Seconds; from cache hits to image processing and LLM calls
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Bytes; from vote bodies to feeds with inline images
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+# Requests that matched no route share one label, so scanners cannot blow up the series count
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+def _escape(value: str) -> str:
+	return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+	pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values, strict=True)]
+	if extra:
+		pairs.append(extra)
+	return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+	if value == math.inf:
+		return "+Inf"
+	return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+	"""Monotonic count per label values"""
+
+	kind = "counter"
+
+	def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()):
+		self.name = name
+		self.documentation = documentation
+		self.labels = labels
+		self._values: dict[tuple, float] = {}
+		self._lock = threading.Lock()
+
+	def inc(self, *label_values, amount: float = 1):
+		with self._lock:
+			self._values[label_values] = self._values.get(label_values, 0) + amount
+
+	def samples(self) -> Iterator[str]:
+		with self._lock:
+			values = list(self._values.items())
+		for label_values, value in values:
+			yield f"{self.name}{_format_labels(self.labels, label_values)} {_format_value(value)}"
+
+
+class Gauge(Counter):
+	"""Value that goes up and down (e.g. requests in flight)"""
+
+	kind = "gauge"
+
+	def dec(self, *label_values, amount: float = 1):
+		self.inc(*label_values, amount=-amount)
+
+	def set(self, *label_values, value: float):
+		with self._lock:
+			self._values[label_values] = value
+
+
+class Histogram:
+	"""Observations counted into fixed buckets, plus their sum and count, per label values"""
+
+	kind = "histogram"
+
+	def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = (), buckets: tuple[float, ...] = LATENCY_BUCKETS):
+		self.name = name
+		self.documentation = documentation
+		self.labels = labels
+		self.buckets = tuple(sorted(buckets))
+		# label values -> [count per bucket (last is +Inf), sum]
+		self._values: dict[tuple, list] = {}
+		self._lock = threading.Lock()
+
+	def observe(self, value: float, *label_values):
+		index = bisect.bisect_left(self.buckets, value)
+		with self._lock:
+			series = self._values.get(label_values)
+			if series is None:
+				series = self._values[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+			series[0][index] += 1
+			series[1] += value
+
+	def samples(self) -> Iterator[str]:
+		with self._lock:
+			values = [(label_values, list(counts), total) for label_values, (counts, total) in self._values.items()]
+		for label_values, counts, total in values:
+			cumulative = 0
+			for bound, count in zip((*self.buckets, math.inf), counts, strict=True):
+				cumulative += count
+				yield f"{self.name}_bucket{_format_labels(self.labels, label_values, f'le="{_format_value(bound)}"')} {cumulative}"
+			yield f"{self.name}_sum{_format_labels(self.labels, label_values)} {_format_value(total)}"
+			yield f"{self.name}_count{_format_labels(self.labels, label_values)} {cumulative}"
+
+
+class MetricsRegistry:
+	"""The application's metrics and stats callbacks, rendered together on scrape"""
+
+	def __init__(self, prefix: str = "livegrid"):
+		self.prefix = prefix
+		self._metrics: list[Counter | Histogram] = []
+		self._stats: list[tuple[str, Callable[[], dict], dict[str, str]]] = []
+
+	def _add(self, metric):
+		self._metrics.append(metric)
+		return metric
+
+	def counter(self, name: str, documentation: str, labels: tuple[str, ...] = ()) -> Counter:
+		return self._add(Counter(name, documentation, labels))
+
+	def gauge(self, name: str, documentation: str, labels: tuple[str, ...] = ()) -> Gauge:
+		return self._add(Gauge(name, documentation, labels))
+
+	def histogram(self, name: str, documentation: str, labels: tuple[str, ...] = (), buckets: tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+		return self._add(Histogram(name, documentation, labels, buckets))
+
+	def register_stats(self, component: str, callback: Callable[[], dict], labels: dict[str, str] | None = None):
+		"""
+		Export the numbers in callback()'s dict as gauges named <prefix>_<component>_<key>.
+		Nested dicts extend the name, except keys listed in labels, whose children become
+		label values: {"endpoints": "endpoint"} turns {"endpoints": {"feed": {"in_flight": 2}}}
+		into <prefix>_<component>_in_flight{endpoint="feed"} 2.
+		"""
+		self._stats.append((component, callback, labels or {}))
+
+	def _stats_samples(self) -> Iterator[tuple[str, str, float]]:
+		"""(metric name, label string, value) for every registered stats dict"""
+		for component, callback, labels in self._stats:
+			try:
+				stats = callback()
+			except Exception as e:
+				print(f"❌ Error collecting {component} stats: {e}")
+				continue
+			yield from self._flatten(f"{self.prefix}_{component}", stats, labels, ())
+
+	def _flatten(self, name: str, stats: dict, labels: dict[str, str], label_pairs: tuple) -> Iterator[tuple[str, str, float]]:
+		for key, value in stats.items():
+			if isinstance(value, dict):
+				if key in labels:
+					for label_value, child in value.items():
+						if isinstance(child, dict):
+							yield from self._flatten(name, child, labels, (*label_pairs, (labels[key], label_value)))
+					continue
+				yield from self._flatten(f"{name}_{key}", value, labels, label_pairs)
+			elif isinstance(value, int | float) and not isinstance(value, bool):
+				metric_name = re.sub(r"[^a-zA-Z0-9_]", "_", f"{name}_{key}")
+				yield metric_name, _format_labels(tuple(pair[0] for pair in label_pairs), tuple(pair[1] for pair in label_pairs)), value
+
+	def render(self) -> str:
+		"""Everything in the Prometheus text exposition format (version 0.0.4)"""
+		lines = []
+		for metric in self._metrics:
+			lines.append(f"# HELP {metric.name} {metric.documentation}")
+			lines.append(f"# TYPE {metric.name} {metric.kind}")
+			lines.extend(metric.samples())
+
+		seen = set()
+		for name, labels, value in sorted(self._stats_samples(), key=lambda sample: sample[0]):
+			if name not in seen:
+				seen.add(name)
+				lines.append(f"# TYPE {name} gauge")
+			lines.append(f"{name}{labels} {_format_value(value)}")
+		return "\n".join(lines) + "\n"
+
+	@contextmanager
+	def span(self, name: str) -> Iterator[None]:
+		"""Time a block of internal work (works around awaits too) into the span duration histogram"""
+		started = time.perf_counter()
+		try:
+			yield
+		finally:
+			SPAN_DURATION.observe(time.perf_counter() - started, name)
+
+
+# Global metrics registry
+metrics = MetricsRegistry()
+
+REQUESTS = metrics.counter("http_requests_total", "HTTP requests by method, route template and status code", ("method", "route", "status"))
+REQUEST_DURATION = metrics.histogram("http_request_duration_seconds", "HTTP request latency until the response is fully sent", ("method", "route"))
+REQUESTS_IN_FLIGHT = metrics.gauge("http_requests_in_flight", "HTTP requests being handled")
+REQUEST_SIZE = metrics.histogram("http_request_size_bytes", "HTTP request body size", ("method", "route"), SIZE_BUCKETS)
+RESPONSE_SIZE = metrics.histogram("http_response_size_bytes", "HTTP response body size as sent (after compression)", ("method", "route"), SIZE_BUCKETS)
+SPAN_DURATION = metrics.histogram(f"{metrics.prefix}_span_duration_seconds", "Duration of internal work: data file saves, image processing, reranking, LLM calls", ("span",))
+
+
+def route_template(scope: Scope) -> str:
+	"""The matched route's path template (e.g. /api/v1/posts/{post_id}/status), keeping label cardinality bounded"""
+	template = getattr(scope.get("route"), "path", None)
+	if not template:
+		return UNMATCHED_ROUTE
+
+	# Some FastAPI versions report an included router's routes without the router prefix;
+	# the prefix is static, so take it from the leading segments of the request path
+	path_segments = scope["path"].strip("/").split("/")
+	template_segments = [segment for segment in template.strip("/").split("/") if segment]
+	if len(path_segments) > len(template_segments) and ":path}" not in template:
+		prefix = "/".join(path_segments[: len(path_segments) - len(template_segments)])
+		if not template.startswith(f"/{prefix}"):
+			return f"/{prefix}{template}".rstrip("/") or "/"
+	return template
+
+
+class MetricsMiddleware:
+	"""Record latency, status, sizes and in-flight count of every HTTP request, by route template"""
+
+	def __init__(self, app: ASGIApp):
+		self.app = app
+
+	async def __call__(self, scope: Scope, receive: Receive, send: Send):
+		if scope["type"] != "http":
+			await self.app(scope, receive, send)
+			return
+
+		started = time.perf_counter()
+		status_code = 500  # Reported if the app fails before starting a response
+		request_size = 0
+		response_size = 0
+
+		async def counting_receive() -> Message:
+			nonlocal request_size
+			message = await receive()
+			if message["type"] == "http.request":
+				request_size += len(message.get("body", b""))
+			return message
+
+		async def counting_send(message: Message):
+			nonlocal status_code, response_size
+			if message["type"] == "http.response.start":
+				status_code = message["status"]
+			elif message["type"] == "http.response.body":
+				response_size += len(message.get("body", b""))
+			await send(message)
+
+		REQUESTS_IN_FLIGHT.inc()
+		try:
+			await self.app(scope, counting_receive, counting_send)
+		finally:
+			REQUESTS_IN_FLIGHT.dec()
+			route = route_template(scope)
+			method = scope["method"]
+			REQUESTS.inc(method, route, str(status_code))
+			REQUEST_DURATION.observe(time.perf_counter() - started, method, route)
+			REQUEST_SIZE.observe(request_size, method, route)
+			RESPONSE_SIZE.observe(response_size, method, route)
@@ -0,0 +1,185 @@
+"""
+On-demand sampling profiler for the running server, driven from the admin API.
+
+Nothing runs until a session is requested. A session starts a background thread that
+snapshots every thread's Python stack with sys._current_frames() at a fixed interval
+and counts identical stacks, either for a number of seconds or while the next N
+requests to a route are in flight (armed through ProfilerMiddleware, which otherwise
+costs one attribute check per request). The result is in the collapsed-stack format
+read by flamegraph.pl, speedscope and similar tools: "thread;outer;...;inner count".
+"""
+
+import asyncio
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+# Leaf frames of threads that are parked rather than working (event loop polling, idle pool workers)
+IDLE_FRAMES = {
+	("selectors.py", "select"),
+	("threading.py", "wait"),
+	("threading.py", "_wait_for_tstate_lock"),
+	("queue.py", "get"),
+	("thread.py", "_worker"),
+}
+
+
+class ProfilerBusyError(Exception):
+	"""Raised when a profiling session is already running"""
+
+
+def _frame_label(code) -> str:
+	"""function (dir/file.py:line) of a code object, short enough to keep flamegraphs readable"""
+	path = code.co_filename.split(os.sep)
+	return f"{code.co_name} ({'/'.join(path[-2:])}:{code.co_firstlineno})"
+
+
+def _is_idle(frame) -> bool:
+	return (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in IDLE_FRAMES
+
+
+def collapse(stacks: Counter) -> str:
+	"""Collapsed-stack text, hottest stacks first"""
+	return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+def route_pattern(route: str) -> re.Pattern:
+	"""Regex for a route template such as /api/v1/posts/{post_id}/status"""
+	parts = re.split(r"(\{[^}/]+\})", route)
+	return re.compile("".join("[^/]+" if part.startswith("{") else re.escape(part) for part in parts) + "/?")
+
+
+class Sampler(threading.Thread):
+	"""Background thread counting the stacks of all other threads every interval, while active() is true"""
+
+	def __init__(self, interval: float, include_idle: bool = False, active=lambda: True, exclude: int | None = None):
+		super().__init__(name="profiler-sampler", daemon=True)
+		self.interval = interval
+		self.exclude = exclude  # Thread waiting on the session, not worth sampling
+		self.include_idle = include_idle
+		self.active = active
+		self.stacks = Counter()
+		self.samples = 0
+		self._stopped = threading.Event()
+
+	def run(self):
+		own_id = threading.get_ident()
+		while not self._stopped.wait(self.interval):
+			if self.active():
+				self._sample(own_id)
+
+	def _sample(self, own_id: int):
+		names = {thread.ident: thread.name for thread in threading.enumerate()}
+		self.samples += 1
+		for thread_id, top in sys._current_frames().items():
+			if thread_id in (own_id, self.exclude) or (not self.include_idle and _is_idle(top)):
+				continue
+			labels = []
+			frame = top
+			while frame is not None:
+				labels.append(_frame_label(frame.f_code))
+				frame = frame.f_back
+			labels.append(names.get(thread_id, str(thread_id)))
+			self.stacks[";".join(reversed(labels))] += 1
+
+	def stop(self) -> Counter:
+		self._stopped.set()
+		self.join()
+		return self.stacks
+
+
+class RequestTrace:
+	"""An armed trace: the next `count` requests whose path matches `route`"""
+
+	def __init__(self, route: str, count: int):
+		self.route = route
+		self.pattern = route_pattern(route)
+		self.remaining = count
+		self.in_flight = 0
+		self.completed = 0
+		self.done = asyncio.Event()
+
+	def claim(self, path: str) -> bool:
+		"""Whether this request is one of the traced ones (called on the event loop)"""
+		if self.remaining <= 0 or not self.pattern.fullmatch(path):
+			return False
+		self.remaining -= 1
+		self.in_flight += 1
+		return True
+
+	def release(self):
+		self.in_flight -= 1
+		self.completed += 1
+		if self.remaining <= 0 and self.in_flight == 0:
+			self.done.set()
+
+
+class Profiler:
+	"""One profiling session at a time: timed sampling or request tracing"""
+
+	def __init__(self):
+		self._busy = threading.Lock()
+		self.trace: RequestTrace | None = None
+
+	def _start(self):
+		if not self._busy.acquire(blocking=False):
+			raise ProfilerBusyError("A profiling session is already running")
+
+	def sample(self, seconds: float, interval: float, include_idle: bool = False) -> tuple[str, int]:
+		"""Sample all threads for `seconds` (blocking; run it off the event loop). Returns (collapsed stacks, samples)"""
+		self._start()
+		try:
+			sampler = Sampler(interval, include_idle, exclude=threading.get_ident())
+			sampler.start()
+			time.sleep(seconds)
+			return collapse(sampler.stop()), sampler.samples
+		finally:
+			self._busy.release()
+
+	async def trace_requests(self, route: str, count: int, timeout: float, interval: float, include_idle: bool = False) -> tuple[str, int, int]:
+		"""
+		Sample while the next `count` requests to `route` run, or until timeout.
+		Other requests running at the same time show up too. Returns (collapsed stacks, samples, requests traced)
+		"""
+		self._start()
+		trace = RequestTrace(route, count)
+		sampler = Sampler(interval, include_idle, active=lambda: trace.in_flight > 0)
+		try:
+			sampler.start()
+			self.trace = trace
+			try:
+				await asyncio.wait_for(trace.done.wait(), timeout)
+			except TimeoutError:
+				pass
+		finally:
+			self.trace = None
+			stacks = await asyncio.to_thread(sampler.stop)
+			self._busy.release()
+		return collapse(stacks), sampler.samples, trace.completed
+
+
+class ProfilerMiddleware:
+	"""Marks requests picked by an armed trace; a no-op otherwise"""
+
+	def __init__(self, app: ASGIApp):
+		self.app = app
+
+	async def __call__(self, scope: Scope, receive: Receive, send: Send):
+		trace = profiler.trace
+		if trace is None or scope["type"] != "http" or not trace.claim(scope["path"]):
+			await self.app(scope, receive, send)
+			return
+
+		try:
+			await self.app(scope, receive, send)
+		finally:
+			trace.release()
+
+
+# Global profiler instance
+profiler = Profiler()
@@ -0,0 +1,46 @@
+"""
+Fast JSON responses for large, trusted payloads (feeds built by DataService).
+
+Returning FastJSONResponse from a route skips FastAPI's response_model validation and
+jsonable_encoder pass (the route's response_model still documents the shape), and
+serializes with orjson when it is installed, falling back to a compact json.dumps.
+ndjson_lines() feeds a StreamingResponse for exports too large to build in memory.
+"""
+
+import json
+from collections.abc import Iterable, Iterator
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+	import orjson
+except ImportError:  # Optional dependency: pip install orjson (or the "fast" extra)
+	orjson = None
+
+
+def dumps(content: Any) -> bytes:
+	"""Serialize to compact UTF-8 JSON bytes"""
+	if orjson is not None:
+		return orjson.dumps(content)
+	return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+	"""JSONResponse for content that is already JSON-compatible: no validation or re-encoding pass"""
+
+	def render(self, content: Any) -> bytes:
+		return dumps(content)
+
+
+def ndjson_lines(items: Iterable[Any], chunk_bytes: int = 64 * 1024) -> Iterator[bytes]:
+	"""Newline-delimited JSON for a StreamingResponse, batching lines into writes of about chunk_bytes"""
+	buffer = bytearray()
+	for item in items:
+		buffer += dumps(item)
+		buffer += b"\n"
+		if len(buffer) >= chunk_bytes:
+			yield bytes(buffer)
+			buffer.clear()
+	if buffer:
+		yield bytes(buffer)
@@ -1,2 +1,4 @@
 # API Routers
-from . import posts
+from . import admin, alerts, ingest, posts
+
+__all__ = ["admin", "alerts", "ingest", "posts"]
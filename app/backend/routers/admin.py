@@ -0,0 +1,88 @@
+import asyncio
+import secrets
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
+from app.backend.core.config import settings
+from app.backend.core.profiler import ProfilerBusyError, profiler
+from app.backend.services.alert_service import alert_service
+
+bearer = HTTPBearer(auto_error=False)
+
+
+def require_admin(credentials: HTTPAuthorizationCredentials | None = Depends(bearer)):
+	"""Allow only requests bearing ADMIN_TOKEN; the admin API does not exist while it is unset"""
+	if not settings.ADMIN_TOKEN:
+		raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+	if credentials is None or not secrets.compare_digest(credentials.credentials.encode("utf-8"), settings.ADMIN_TOKEN.encode("utf-8")):
+		raise HTTPException(
+			status_code=status.HTTP_401_UNAUTHORIZED,
+			detail="Invalid admin token",
+			headers={"WWW-Authenticate": "Bearer"},
+		)
+
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+
+def stacks_response(stacks: str, samples: int, **headers) -> PlainTextResponse:
+	"""Collapsed stacks as text, with sampling details in headers"""
+	return PlainTextResponse(stacks, headers={"X-Profile-Samples": str(samples), **{f"X-Profile-{name.title()}": str(value) for name, value in headers.items()}})
+
+
+def busy_error(e: ProfilerBusyError) -> HTTPException:
+	return HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+
+@router.post("/profile", response_class=PlainTextResponse)
+async def profile(
+	seconds: float = Query(10.0, gt=0, le=settings.PROFILER_MAX_SECONDS, description="How long to sample"),
+	interval_ms: float = Query(settings.PROFILER_INTERVAL_MS, ge=1, le=1000, description="Time between samples"),
+	idle: bool = Query(False, description="Also count threads parked in waits (idle pool workers, the event loop's select)"),
+):
+	"""
+	Sample the stacks of every thread for a while and return them collapsed (flamegraph.pl / speedscope input)
+	"""
+	try:
+		# Sample from a worker thread so the event loop keeps serving (and shows up in the profile)
+		stacks, samples = await asyncio.to_thread(profiler.sample, seconds, interval_ms / 1000, idle)
+	except ProfilerBusyError as e:
+		raise busy_error(e) from e
+	return stacks_response(stacks, samples)
+
+
+@router.post("/trace", response_class=PlainTextResponse)
+async def trace(
+	route: str = Query(..., description="Path or route template to trace, e.g. /api/v1/posts/{post_id}/status"),
+	requests: int = Query(1, ge=1, le=settings.PROFILER_MAX_TRACE_REQUESTS, description="How many matching requests to trace"),
+	timeout: float = Query(60.0, gt=0, le=settings.PROFILER_MAX_SECONDS, description="Give up waiting for requests after this long"),
+	interval_ms: float = Query(1.0, ge=0.5, le=1000, description="Time between samples"),
+	idle: bool = Query(False, description="Also count threads parked in waits"),
+):
+	"""
+	Sample stacks while the next matching requests run and return them collapsed
+	Requests served concurrently with the traced ones are included in the samples
+	"""
+	try:
+		stacks, samples, traced = await profiler.trace_requests(route, requests, timeout, interval_ms / 1000, idle)
+	except ProfilerBusyError as e:
+		raise busy_error(e) from e
+	return stacks_response(stacks, samples, requests=traced)
+
+
+@router.get("/alerts/subscriptions")
+def all_alert_subscriptions():
+	"""
+	Every user's alert subscriptions (areas and webhook URLs)
+	"""
+	return alert_service.get_subscriptions()
+
+
+@router.get("/alerts/deliveries")
+def all_alert_deliveries():
+	"""
+	Every queued webhook delivery
+	"""
+	return alert_service.get_deliveries()
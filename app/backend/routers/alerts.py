@@ -0,0 +1,70 @@
+from fastapi import APIRouter, HTTPException, Query, status
+
+from app.backend.schemas.alert import AlertSubscriptionCreate, AlertSubscriptionResponse, AlertSubscriptionUpdate
+from app.backend.services.alert_service import alert_service
+
+router = APIRouter()
+
+
+@router.post("/subscriptions", response_model=AlertSubscriptionResponse, status_code=status.HTTP_201_CREATED)
+def create_subscription(subscription: AlertSubscriptionCreate):
+	"""
+	Save an area (center + radius_km, or polygon) to be alerted about high-severity posts in
+	"""
+	try:
+		return alert_service.create_subscription(subscription.dict())
+	except ValueError as e:
+		raise HTTPException(
+			status_code=status.HTTP_400_BAD_REQUEST,
+			detail=str(e),
+		) from e
+
+
+@router.get("/subscriptions", response_model=list[AlertSubscriptionResponse])
+def get_subscriptions(user_id: str = Query(..., description="Owner of the subscriptions")):
+	"""
+	List one user's alert subscriptions (every user's: GET /admin/alerts/subscriptions)
+	"""
+	return alert_service.get_subscriptions(user_id)
+
+
+@router.put("/subscriptions/{subscription_id}", response_model=AlertSubscriptionResponse)
+def update_subscription(subscription_id: str, subscription: AlertSubscriptionUpdate):
+	"""
+	Change a subscription's area, categories or webhook
+	"""
+	try:
+		updated = alert_service.update_subscription(subscription_id, subscription.dict(exclude_unset=True))
+	except ValueError as e:
+		raise HTTPException(
+			status_code=status.HTTP_400_BAD_REQUEST,
+			detail=str(e),
+		) from e
+
+	if not updated:
+		raise HTTPException(
+			status_code=status.HTTP_404_NOT_FOUND,
+			detail="Subscription not found",
+		)
+	return updated
+
+
+@router.delete("/subscriptions/{subscription_id}")
+def delete_subscription(subscription_id: str):
+	"""
+	Delete an alert subscription
+	"""
+	if not alert_service.delete_subscription(subscription_id):
+		raise HTTPException(
+			status_code=status.HTTP_404_NOT_FOUND,
+			detail="Subscription not found",
+		)
+	return {"message": "Subscription deleted"}
+
+
+@router.get("/deliveries")
+def get_deliveries(user_id: str = Query(..., description="Owner of the webhooks")):
+	"""
+	Alerts queued for one user's webhooks (stand-in for outgoing HTTP calls; every user's: GET /admin/alerts/deliveries)
+	"""
+	return alert_service.get_deliveries(user_id)
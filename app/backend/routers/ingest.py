@@ -0,0 +1,105 @@
+import hashlib
+from typing import Any
+
+from fastapi import APIRouter, HTTPException, status
+from pydantic import ValidationError
+
+from app.backend.core.config import settings
+from app.backend.schemas.ingest import IngestBatchRequest, IngestBatchResponse, IngestItem, SourcePost
+from app.backend.services.data_service import data_service
+
+router = APIRouter()
+
+
+def ingest_key(source: SourcePost) -> str | None:
+	"""
+	Idempotency key of an ingested item: the sha256 of its source URL, or for items
+	without one (tweets) of the source name and text. None if there is nothing to key on
+	"""
+	if source.url and source.url.strip():
+		identity = source.url.strip()
+	elif source.text_long or source.text_short:
+		identity = f"{source.source}\n{source.text_long or source.text_short}"
+	else:
+		return None
+	return hashlib.sha256(identity.encode("utf-8")).hexdigest()
+
+
+def source_url(raw: Any) -> str | None:
+	"""The source URL of a raw item, if it has one, to identify items that failed validation"""
+	original_post = raw.get("original_post") if isinstance(raw, dict) else None
+	url = original_post.get("url") if isinstance(original_post, dict) else None
+	return url if isinstance(url, str) else None
+
+
+def validation_detail(error: ValidationError) -> str:
+	"""Validation errors as one line, e.g. original_post.source: Field required"""
+	messages = []
+	for e in error.errors():
+		location = ".".join(str(part) for part in e["loc"])
+		messages.append(f"{location}: {e['msg']}" if location else e["msg"])
+	return "; ".join(messages)
+
+
+def is_civic_event(item: IngestItem) -> bool:
+	"""Whether the extraction found an event (the ingestor sends a null type otherwise)"""
+	return bool(item.extracted_data.type and item.extracted_data.type.strip())
+
+
+def to_post(item: IngestItem) -> dict:
+	"""Post fields for an extracted civic event"""
+	signal, source = item.extracted_data, item.original_post
+	event_type = signal.type.strip()
+	return {
+		"username": source.source,
+		"user_id": f"ingestor:{source.source}",
+		"title": f"{event_type.capitalize()} at {signal.location}" if signal.location else event_type.capitalize(),
+		"description": source.text_long or source.text_short or "",
+		# e.g. "Road closure" -> "road_closure", matching ALERT_CATEGORIES
+		"category": [event_type.lower().replace(" ", "_")],
+		"severity": (signal.severity or "").lower() or None,
+		"advice": signal.advice,
+		"source": source.source,
+		"source_url": source.url,
+		"ingest_key": ingest_key(source),
+		"Geolocation": item.Geolocation,
+	}
+
+
+@router.post("/posts:batch", response_model=IngestBatchResponse)  # Admission: AdmissionMiddleware, before the body is read
+def ingest_posts(batch: IngestBatchRequest):
+	"""
+	Create posts from civic events extracted by the ingestor, saved together
+	Items are keyed by source URL, so re-sending one does not create a second post
+	Each item is validated on its own; malformed ones are reported as invalid, and events
+	without a Geolocation as unlocated (not stored: they could not be mapped, ranked or alerted on)
+	"""
+	if len(batch.items) > settings.INGEST_BATCH_MAX_SIZE:
+		raise HTTPException(
+			status_code=status.HTTP_400_BAD_REQUEST,
+			detail=f"At most {settings.INGEST_BATCH_MAX_SIZE} items per batch",
+		)
+
+	results = []
+	to_create = []  # (index in results, post fields)
+	for raw in batch.items:
+		try:
+			item = IngestItem.model_validate(raw)
+		except ValidationError as e:
+			results.append({"url": source_url(raw), "status": "invalid", "detail": validation_detail(e)})
+			continue
+
+		if not is_civic_event(item):
+			results.append({"url": item.original_post.url, "status": "skipped"})
+			continue
+		if item.Geolocation is None:
+			results.append({"url": item.original_post.url, "status": "unlocated"})
+			continue
+		to_create.append((len(results), to_post(item)))
+		results.append({"url": item.original_post.url, "status": "created"})
+
+	created = data_service.create_posts([post_data for _, post_data in to_create])
+	for (index, _), (post, is_new) in zip(to_create, created, strict=True):
+		results[index].update(status="created" if is_new else "duplicate", post_id=post["id"])
+
+	return {"results": results, "created": sum(result["status"] == "created" for result in results)}
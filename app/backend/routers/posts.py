@@ -1,37 +1,128 @@
-from fastapi import APIRouter, File, Form, HTTPException, Query, UploadFile, status
+import asyncio
+from datetime import UTC, datetime
+from typing import Literal
+
+from fastapi import APIRouter, File, Form, HTTPException, Query, Request, Response, UploadFile, status
+from fastapi.responses import StreamingResponse
 
 # Temporarily disable agent import to fix deployment
 # from app.agent import Agent
-from app.backend.schemas.post import PostResponse, PostShortResponse, VoteRequest
-from app.backend.services.data_service import data_service
-from app.backend.services.storage_service import storage_service
+from app.backend.core.admission import admit
+from app.backend.core.config import settings
+from app.backend.core.responses import FastJSONResponse, ndjson_lines
+from app.backend.schemas.post import PostResponse, PostShortResponse, PostStatusResponse, VoteBatchRequest, VoteBatchResponse, VoteRequest
+from app.backend.services.data_service import data_service, parse_fields
+from app.backend.services.event_bus import parse_filters
+from app.backend.services.post_processor import PENDING, READY, categorize, post_processor
+from app.backend.services.storage_service import PLACEHOLDER_BITMAP, storage_service
 
 router = APIRouter()
 
 # Temporarily disable agent initialization
 # agent = Agent()
 
+Rendition = Literal["thumbnail", "card", "full"]
+
+
+def accepts_webp(request: Request, webp: bool | None) -> bool:
+	"""Serve WebP renditions if asked explicitly or if the Accept header allows it"""
+	if webp is not None:
+		return webp
+	return "image/webp" in request.headers.get("accept", "")
+
 
-@router.get("/short-post", response_model=list[PostShortResponse])
-def get_posts_short():
+def requested_fields(fields: str | None) -> tuple[str, ...] | None:
+	"""Parse ?fields= into a projection, or raise 400 for unknown field names"""
+	try:
+		return parse_fields(fields)
+	except ValueError as e:
+		raise HTTPException(
+			status_code=status.HTTP_400_BAD_REQUEST,
+			detail=str(e),
+		) from e
+
+
+@router.get("/short-post", response_model=list[PostShortResponse], dependencies=[admit("feed")])
+def get_posts_short(
+	request: Request,
+	rendition: Rendition = Query("card", description="Image size to return"),
+	webp: bool | None = Query(None, description="Return WebP images (defaults to the Accept header)"),
+	fields: str | None = Query(None, description="Only these comma-separated fields (id is always included), e.g. id,Geolocation,category"),
+):
 	"""
 	Get posts with short format (username, title, image) for feed display
 	"""
-	posts = data_service.get_posts_short()
-	return posts
+	posts = data_service.get_posts_short(rendition, accepts_webp(request, webp), requested_fields(fields))
+	# Built by DataService, so already the response_model shape: skip re-validating it
+	return FastJSONResponse(posts)
 
 
-@router.get("/long-post", response_model=list[PostResponse])
-def get_posts_long():
+@router.get("/ranked-feed", response_model=list[PostShortResponse], dependencies=[admit("feed")])
+def get_ranked_feed(
+	request: Request,
+	lat: float = Query(..., ge=-90, le=90, description="User latitude"),
+	lng: float = Query(..., ge=-180, le=180, description="User longitude"),
+	limit: int = Query(50, ge=1, le=500, description="Posts to return"),
+	rendition: Rendition = Query("card", description="Image size to return"),
+	webp: bool | None = Query(None, description="Return WebP images (defaults to the Accept header)"),
+	fields: str | None = Query(None, description="Only these comma-separated fields (id is always included), e.g. id,Geolocation,category"),
+):
+	"""
+	Get the feed ordered for the user's location: nearby, upvoted and recent posts first
+	"""
+	posts = data_service.get_posts_ranked(lat, lng, limit, rendition, accepts_webp(request, webp), requested_fields(fields))
+	return FastJSONResponse(posts)
+
+
+@router.get("/long-post", response_model=list[PostResponse], dependencies=[admit("feed")])
+def get_posts_long(
+	request: Request,
+	rendition: Rendition = Query("full", description="Image size to return"),
+	webp: bool | None = Query(None, description="Return WebP images (defaults to the Accept header)"),
+	fields: str | None = Query(None, description="Only these comma-separated fields (id is always included), e.g. id,Geolocation,category"),
+):
 	"""
 	Get posts with full data for detailed view
 	"""
-	posts = data_service.get_posts_long()
-	return posts
+	posts = data_service.get_posts_long(rendition, accepts_webp(request, webp), requested_fields(fields))
+	return FastJSONResponse(posts)
+
+
+@router.get("/export")
+def export_posts(
+	request: Request,
+	since: datetime | None = Query(None, description="Only posts created at or after this time (UTC if no offset)"),
+	until: datetime | None = Query(None, description="Only posts created before this time (UTC if no offset)"),
+	bbox: str | None = Query(None, description="Only posts inside min_lat,min_lng,max_lat,max_lng"),
+	category: str | None = Query(None, description="Only posts in one of these comma-separated categories"),
+	rendition: Rendition = Query("full", description="Image size to return"),
+	webp: bool | None = Query(None, description="Return WebP images (defaults to the Accept header)"),
+	fields: str | None = Query(None, description="Only these comma-separated fields (id is always included), e.g. id,Geolocation,category"),
+):
+	"""
+	Stream matching posts as newline-delimited JSON, one full-format post per line
+	"""
+	projection = requested_fields(fields)
+	try:
+		box, categories = parse_filters(bbox, category)
+	except ValueError as e:
+		raise HTTPException(
+			status_code=status.HTTP_400_BAD_REQUEST,
+			detail=str(e),
+		) from e
 
+	since, until = (value if value is None or value.tzinfo else value.replace(tzinfo=UTC) for value in (since, until))
+	posts = data_service.iter_posts(since, until, box, categories, rendition, accepts_webp(request, webp), projection)
+	return StreamingResponse(
+		ndjson_lines(posts, settings.EXPORT_CHUNK_BYTES),
+		media_type="application/x-ndjson",
+		headers={"Content-Disposition": 'attachment; filename="posts.ndjson"'},
+	)
 
-@router.post("/create-post", response_model=PostResponse)
+
+@router.post("/create-post", response_model=PostResponse)  # Admission: AdmissionMiddleware, before the form is read
 async def create_post_with_image(
+	response: Response,
 	title: str = Form(...),
 	description: str = Form(...),
 	username: str = Form(...),
@@ -40,10 +131,13 @@ async def create_post_with_image(
 	longitude: float = Form(...),
 	category: str | None = Form(None),  # Comma-separated string
 	image: UploadFile = File(...),
+	process_async: bool = Query(False, alias="async", description="Return 202 with a pending post and process the image in the background"),
 ):
 	"""
 	Create a new post with image upload to Google Cloud Storage
 	Supports both file uploads and base64 data
+	With ?async=true the post is stored as "pending" with a placeholder image and
+	finished in the background; poll GET /{post_id}/status for the outcome
 	"""
 	try:
 		# Parse category string to list
@@ -52,27 +146,7 @@ async def create_post_with_image(
 			category_list = [cat.strip() for cat in category.split(",") if cat.strip()]
 
 		# Check if it's a base64 string or file
-		if image.content_type == "text/plain" or image.filename is None:
-			# Handle as base64 data
-			image_data = await image.read()
-			image_bitmap = image_data.decode("utf-8")
-
-			# Validate bitmap format
-			if not image_bitmap.startswith("data:image/"):
-				raise HTTPException(
-					status_code=status.HTTP_400_BAD_REQUEST,
-					detail="Invalid bitmap format. Must start with 'data:image/'",
-				)
-
-			# Upload base64 image to Google Cloud Storage
-			image_url = await storage_service.upload_base64_image(image_bitmap, folder="posts")
-		else:
-			# Handle as file upload
-			image_url = await storage_service.upload_image(image, folder="posts")
-
-		# Temporarily disable agent categorization
-		# location, condition = agent.categorize(description)
-		location, condition = "general", "information"
+		is_base64 = image.content_type == "text/plain" or image.filename is None
 
 		# Create post data
 		post_data = {
@@ -80,13 +154,27 @@ async def create_post_with_image(
 			"description": description,
 			"username": username,
 			"user_id": user_id,
-			"image_bitmap": image_url,  # Store the public URL
 			"Geolocation": [latitude, longitude],
-			"category": [location, condition],
 		}
 
-		return data_service.create_post(post_data)
+		if process_async:
+			return await create_pending_post(response, post_data, image, is_base64)
+
+		if is_base64:
+			# Handle as base64 data: validated (must start with 'data:image/') and decoded while streaming
+			image_fields = await storage_service.upload_base64_stream(image, folder="posts")
+		else:
+			# Handle as file upload
+			image_fields = await storage_service.upload_image(image, folder="posts")
 
+		post_data["category"] = categorize()
+		post_data.update(image_fields)  # image_bitmap (full size) and image_renditions
+
+		# Saving writes the whole data file; keep it off the event loop
+		return await asyncio.to_thread(data_service.create_post, post_data)
+
+	except HTTPException:
+		raise
 	except Exception as e:
 		raise HTTPException(
 			status_code=status.HTTP_400_BAD_REQUEST,
@@ -94,8 +182,44 @@ async def create_post_with_image(
 		) from e
 
 
-@router.post("/{post_id}/vote")
-async def vote_post(post_id: int, vote: VoteRequest):
+async def create_pending_post(response: Response, post_data: dict, image: UploadFile, is_base64: bool) -> dict:
+	"""Spool the upload, store the post as pending and hand it to the post processor"""
+	post_processor.check_capacity()
+
+	spooled = await (storage_service.spool_base64_stream(image) if is_base64 else storage_service.spool_image(image))
+	try:
+		post = await asyncio.to_thread(data_service.create_post, {**post_data, "image_bitmap": PLACEHOLDER_BITMAP, "status": PENDING})
+	except BaseException:
+		storage_service.remove_spooled(spooled[0])
+		raise
+
+	post_processor.submit(post["id"], spooled)
+	response.status_code = status.HTTP_202_ACCEPTED
+	return post
+
+
+@router.get("/{post_id}/status", response_model=PostStatusResponse)
+def get_post_status(post_id: int):
+	"""
+	Processing status of a post created with ?async=true
+	"""
+	post = data_service.get_post_by_id(post_id)
+	if not post:
+		raise HTTPException(
+			status_code=status.HTTP_404_NOT_FOUND,
+			detail="Post not found",
+		)
+
+	return {
+		"id": post["id"],
+		"status": post.get("status", READY),
+		"status_detail": post.get("status_detail"),
+		"image_placeholder": post.get("image_placeholder"),
+	}
+
+
+@router.post("/{post_id}/vote", dependencies=[admit("vote")])
+def vote_post(post_id: int, vote: VoteRequest):
 	"""
 	Vote on a post (upvote or downvote)
 	"""
@@ -109,6 +233,22 @@ async def vote_post(post_id: int, vote: VoteRequest):
 	return {"message": f"Successfully {vote.vote_type}d post"}
 
 
+@router.post("/votes:batch", response_model=VoteBatchResponse, dependencies=[admit("vote")])
+def vote_posts_batch(batch: VoteBatchRequest):
+	"""
+	Apply many votes at once (e.g. votes queued offline), saved together
+	Each vote gets its own result; re-sending an already applied vote is a no-op
+	"""
+	if len(batch.votes) > settings.VOTE_BATCH_MAX_SIZE:
+		raise HTTPException(
+			status_code=status.HTTP_400_BAD_REQUEST,
+			detail=f"At most {settings.VOTE_BATCH_MAX_SIZE} votes per batch",
+		)
+
+	results = data_service.vote_posts([vote.dict() for vote in batch.votes])
+	return {"results": results, "applied": sum(result["status"] == "applied" for result in results)}
+
+
 # Temporarily disable chat endpoint
 # @router.post("/chat")
 # async def chat(user_input: str, session_id: str = Query(...)):
@@ -4,7 +4,7 @@ from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
 
 from app.backend.core.config import settings
-from app.backend.core.firestore import firestore_service
+from app.backend.core.firestore import EmailAlreadyRegisteredError, firestore_service
 from app.backend.core.security import create_access_token, get_password_hash, verify_password
 from app.backend.schemas.user import UserCreate, UserLogin, UserResponse, UserToken, UserUpdate
 
@@ -19,21 +19,13 @@ async def get_current_user_id():
 	return "current_user_id"
 
 
-async def get_user_by_email(email: str):
-	"""Get user by email"""
-	# This would be implemented in the FirestoreService
-	# For now, return None
-	return
-
-
 @router.post("/register", response_model=UserResponse)
 async def register_user(user: UserCreate):
 	"""
 	Register a new user
 	"""
 	try:
-		# Check if user already exists
-		# Note: In a real app, you'd check by email
+		# Fast-fail on a known email; create_user enforces uniqueness transactionally
 		existing_user = await firestore_service.get_user_by_email(user.email)
 		if existing_user:
 			raise HTTPException(
@@ -63,6 +55,13 @@ async def register_user(user: UserCreate):
 		created_user = await firestore_service.get_user(user_id)
 		return UserResponse(**created_user)
 
+	except EmailAlreadyRegisteredError:
+		raise HTTPException(
+			status_code=status.HTTP_400_BAD_REQUEST,
+			detail="User with this email already exists",
+		)
+	except HTTPException:
+		raise
 	except Exception as e:
 		raise HTTPException(
 			status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -163,6 +162,13 @@ async def update_current_user(
 		updated_user = await firestore_service.get_user(current_user_id)
 		return UserResponse(**updated_user)
 
+	except EmailAlreadyRegisteredError:
+		raise HTTPException(
+			status_code=status.HTTP_400_BAD_REQUEST,
+			detail="User with this email already exists",
+		)
+	except HTTPException:
+		raise
 	except Exception as e:
 		raise HTTPException(
 			status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -0,0 +1,27 @@
+from pydantic import BaseModel
+
+
+class AlertSubscriptionBase(BaseModel):
+	name: str | None = None
+	# Either a point with a radius...
+	center: list[float] | None = None  # [lat, lng]
+	radius_km: float | None = None
+	# ...or a polygon of [lat, lng] points, e.g. a buffered commute route
+	polygon: list[list[float]] | None = None
+	categories: list[str] | None = None  # Only alert for posts in these categories
+	webhook_url: str | None = None
+
+
+class AlertSubscriptionCreate(AlertSubscriptionBase):
+	user_id: str
+
+
+class AlertSubscriptionUpdate(AlertSubscriptionBase):
+	pass
+
+
+class AlertSubscriptionResponse(AlertSubscriptionBase):
+	id: str
+	user_id: str
+	created_at: str
+	updated_at: str
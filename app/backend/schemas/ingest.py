@@ -0,0 +1,53 @@
+from typing import Any
+
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+
+
+class SourcePost(BaseModel):
+	"""A fetched item as produced by the ingestor sources (reddit, newsapi, serpapi, ...)"""
+
+	model_config = ConfigDict(extra="allow")
+
+	source: str
+	url: str | None = None  # Tweets have none
+	text_short: str | None = None
+	text_long: str | None = None
+
+
+class ExtractedSignal(BaseModel):
+	"""What the extraction model found in a source post; type is null when it is not a civic event"""
+
+	type: str | None = None
+	location: str | None = None
+	severity: str | None = None  # "low", "moderate" or "high"
+	advice: str | None = None
+
+
+class IngestItem(BaseModel):
+	original_post: SourcePost
+	extracted_data: ExtractedSignal
+	Geolocation: list[float] | None = Field(None, min_length=2, max_length=2)  # [lat, lng], when the location could be geocoded
+
+	@field_validator("Geolocation")
+	@classmethod
+	def check_coordinates(cls, value: list[float] | None) -> list[float] | None:
+		if value is not None and not (-90 <= value[0] <= 90 and -180 <= value[1] <= 180):
+			raise ValueError("Geolocation must be [latitude, longitude]")
+		return value
+
+
+class IngestBatchRequest(BaseModel):
+	# Validated one by one as IngestItem, so a malformed item is reported instead of failing the batch
+	items: list[Any]
+
+
+class IngestResult(BaseModel):
+	url: str | None = None
+	status: str  # "created", "duplicate" (already ingested), "skipped" (no civic event), "unlocated" (no Geolocation) or "invalid"
+	post_id: int | None = None
+	detail: str | None = None  # Why an item is invalid
+
+
+class IngestBatchResponse(BaseModel):
+	results: list[IngestResult]
+	created: int
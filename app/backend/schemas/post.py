@@ -19,6 +19,7 @@ class PostShortResponse(BaseModel):
 	username: str
 	title: str
 	image_bitmap: str | None
+	image_placeholder: str | None = None  # BlurHash to render until image_bitmap loads
 	upvote_count: int
 	downvote_count: int
 	karma: float
@@ -31,6 +32,7 @@ class PostResponse(PostBase):
 	id: int
 	username: str
 	image_bitmap: str | None
+	image_placeholder: str | None = None
 	upvote_count: int
 	downvote_count: int
 	karma: float
@@ -38,8 +40,38 @@ class PostResponse(PostBase):
 	Geolocation: list[float]
 	user_id: str
 	category: list[str] | None = None
+	status: str = "ready"  # "pending" while an async create is processed, then "ready" or "failed"
+
+
+class PostStatusResponse(BaseModel):
+	id: int
+	status: str
+	status_detail: str | None = None
+	image_placeholder: str | None = None
 
 
 class VoteRequest(BaseModel):
 	vote_type: str  # "upvote" or "downvote"
 	user_id: str
+
+
+class VoteBatchItem(VoteRequest):
+	post_id: int
+
+
+class VoteBatchRequest(BaseModel):
+	votes: list[VoteBatchItem]
+
+
+class VoteBatchResult(BaseModel):
+	post_id: int
+	user_id: str
+	status: str  # "applied", "unchanged" (already cast), "not_found" or "invalid" (unknown vote_type)
+	upvote_count: int | None = None
+	downvote_count: int | None = None
+	karma: float | None = None
+
+
+class VoteBatchResponse(BaseModel):
+	results: list[VoteBatchResult]
+	applied: int
@@ -0,0 +1,106 @@
+"""
+Migrate the DataService JSON store into Firestore.
+
+Usage:
+	python -m app.backend.scripts.migrate_posts [--data-file PATH] [--max-ops-per-second N] [--dry-run]
+	python -m app.backend.scripts.migrate_posts --backfill-summaries [--max-ops-per-second N]
+
+--backfill-summaries writes the post_summaries projection for posts already in
+Firestore (run it once for posts created before summaries were maintained).
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import datetime
+
+from app.backend.core.firestore import firestore_service
+from app.backend.services.data_service import DataService
+
+
+def to_firestore_post(post: dict) -> dict:
+	"""Normalize a JSON-store post into the Firestore document shape"""
+	post_data = dict(post)
+	post_data["id"] = str(post["id"])
+	post_data["description"] = post.get("description") or post.get("long_description") or post.get("short_description", "")
+
+	# Firestore orders feeds by created_at, so store real timestamps rather than ISO strings
+	created_at = post.get("created_at")
+	if isinstance(created_at, str):
+		post_data["created_at"] = datetime.fromisoformat(created_at.replace("Z", "+00:00"))
+
+	return post_data
+
+
+def print_progress(started_at: float):
+	"""Build a progress callback that reports every 500 writes"""
+
+	def progress(done: int, total: int):
+		if done % 500 == 0 or done == total:
+			elapsed = time.perf_counter() - started_at
+			print(f"   {done}/{total} posts written ({done / elapsed:.0f} writes/s)")
+
+	return progress
+
+
+async def migrate(data_file: str | None, max_ops_per_second: int, dry_run: bool) -> int:
+	"""Copy every post from the JSON store into Firestore, returning the number of failures"""
+	data_service = DataService()
+	if data_file:
+		data_service.data_file = data_file
+		data_service.posts = data_service._load_data()
+
+	# Firestore posts carry their own images, so duplicates get a copy of the ones they reference
+	posts = [to_firestore_post(data_service.with_images(post)) for post in data_service.get_all_posts()]
+	print(f"📦 Loaded {len(posts)} posts from {data_service.data_file}")
+
+	if dry_run:
+		return 0
+
+	if not firestore_service.is_connected():
+		print("❌ Firestore is not connected")
+		return len(posts)
+
+	started_at = time.perf_counter()
+	result = await firestore_service.bulk_create_posts(posts, progress=print_progress(started_at), max_ops_per_second=max_ops_per_second)
+	elapsed = time.perf_counter() - started_at
+
+	print(f"✅ Migrated {result['written']} posts in {elapsed:.2f}s")
+	for failure in result["failed"]:
+		print(f"❌ Post {failure['id']} failed ({failure['code']}): {failure['message']}")
+
+	return len(result["failed"])
+
+
+async def backfill_summaries(max_ops_per_second: int) -> int:
+	"""Write post_summaries for every Firestore post, returning the number of failures"""
+	if not firestore_service.is_connected():
+		print("❌ Firestore is not connected")
+		return 1
+
+	started_at = time.perf_counter()
+	result = await firestore_service.backfill_post_summaries(progress=print_progress(started_at), max_ops_per_second=max_ops_per_second)
+	elapsed = time.perf_counter() - started_at
+
+	print(f"✅ Backfilled {result['written']} post summaries in {elapsed:.2f}s")
+	for failure in result["failed"]:
+		print(f"❌ Summary {failure['id']} failed ({failure['code']}): {failure['message']}")
+
+	return len(result["failed"])
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Migrate the JSON post store into Firestore")
+	parser.add_argument("--data-file", help="Path to the JSON store (defaults to DataService's data file)")
+	parser.add_argument("--max-ops-per-second", type=int, default=10000, help="Upper bound for the BulkWriter ramp-up")
+	parser.add_argument("--dry-run", action="store_true", help="Load and normalize posts without writing")
+	parser.add_argument("--backfill-summaries", action="store_true", help="Instead of migrating, write post_summaries for the posts already in Firestore")
+	args = parser.parse_args()
+
+	job = backfill_summaries(args.max_ops_per_second) if args.backfill_summaries else migrate(args.data_file, args.max_ops_per_second, args.dry_run)
+	failures = asyncio.run(job)
+	raise SystemExit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+	main()
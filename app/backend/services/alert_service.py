@@ -0,0 +1,166 @@
+import json
+import os
+import threading
+import uuid
+from collections import Counter, OrderedDict, deque
+from datetime import datetime
+
+from app.backend.core.config import settings
+from app.backend.services.event_bus import ALERT, POST_CREATED, POST_UPDATED, event_bus
+from app.backend.services.geo_index import GeoIndex, GeoShape
+
+# Fields of a subscription that define its area
+SHAPE_FIELDS = ("center", "radius_km", "polygon")
+
+
+class AlertService:
+	"""
+	Alert subscriptions (saved areas and commute routes) and fan-out of high-severity
+	posts to the users whose areas cover them, via the live stream and/or a webhook
+	"""
+
+	def __init__(self):
+		self.data_file = os.path.join(os.path.dirname(__file__), "..", "..", "data", "alert_subscriptions.json")
+		self.index = GeoIndex(settings.ALERT_GRID_DEGREES, settings.ALERT_MAX_CELLS_PER_SUBSCRIPTION)
+		self.subscriptions = self._load_data()
+		# Webhook stand-in: deliveries that would be POSTed to subscribers' webhook_url
+		self.outbox = deque(maxlen=settings.ALERT_OUTBOX_SIZE)
+		# Post ids already alerted, so a post going pending -> ready is not alerted twice
+		self._alerted: OrderedDict[int, None] = OrderedDict()
+		self._lock = threading.RLock()
+		self.stats = Counter()
+		event_bus.add_listener(self.handle_event)
+
+	def _load_data(self) -> dict[str, dict]:
+		"""Load subscriptions from JSON file and index them"""
+		subscriptions = {}
+		try:
+			if os.path.exists(self.data_file):
+				with open(self.data_file, encoding="utf-8") as f:
+					for subscription in json.load(f).get("subscriptions", []):
+						self.index.add(subscription["id"], self._shape(subscription))
+						subscriptions[subscription["id"]] = subscription
+		except Exception as e:
+			print(f"Error loading alert subscriptions: {e}")
+		return subscriptions
+
+	def _save_data(self):
+		"""Save subscriptions to JSON file"""
+		try:
+			os.makedirs(os.path.dirname(self.data_file), exist_ok=True)
+			with self._lock, open(self.data_file, "w", encoding="utf-8") as f:
+				json.dump({"subscriptions": list(self.subscriptions.values())}, f, indent=2, ensure_ascii=False)
+		except Exception as e:
+			print(f"Error saving alert subscriptions: {e}")
+
+	def _shape(self, subscription: dict) -> GeoShape:
+		return GeoShape(subscription.get("center"), subscription.get("radius_km"), subscription.get("polygon"))
+
+	def get_subscriptions(self, user_id: str | None = None) -> list[dict]:
+		"""Get one user's subscriptions, or every user's (admin API only) when user_id is None"""
+		return [subscription for subscription in self.subscriptions.values() if user_id is None or subscription["user_id"] == user_id]
+
+	def get_subscription(self, subscription_id: str) -> dict | None:
+		"""Get subscription by ID"""
+		return self.subscriptions.get(subscription_id)
+
+	def create_subscription(self, subscription_data: dict) -> dict:
+		"""Create a subscription; raises ValueError for an invalid or oversized area"""
+		now = datetime.utcnow().isoformat() + "Z"
+		subscription = {**subscription_data, "id": uuid.uuid4().hex, "created_at": now, "updated_at": now}
+		with self._lock:
+			self.index.add(subscription["id"], self._shape(subscription))
+			self.subscriptions[subscription["id"]] = subscription
+			self._save_data()
+		return subscription
+
+	def update_subscription(self, subscription_id: str, fields: dict) -> dict | None:
+		"""Update a subscription, re-indexing it if its area changed"""
+		with self._lock:
+			subscription = self.subscriptions.get(subscription_id)
+			if not subscription:
+				return None
+
+			updated = {**subscription, **fields, "updated_at": datetime.utcnow().isoformat() + "Z"}
+			if any(field in fields for field in SHAPE_FIELDS):
+				# A new polygon replaces a circle and vice versa
+				if fields.get("polygon") is not None:
+					updated["center"] = updated["radius_km"] = None
+				elif fields.get("center") is not None:
+					updated["polygon"] = None
+				self.index.add(subscription_id, self._shape(updated))
+
+			self.subscriptions[subscription_id] = updated
+			self._save_data()
+		return updated
+
+	def delete_subscription(self, subscription_id: str) -> bool:
+		"""Delete a subscription"""
+		with self._lock:
+			if self.subscriptions.pop(subscription_id, None) is None:
+				return False
+			self.index.remove(subscription_id)
+			self._save_data()
+		return True
+
+	def is_high_severity(self, post: dict) -> bool:
+		"""Posts worth an alert: high severity, or in an always-alert category (flood, accident, ...)"""
+		if str(post.get("severity") or "").lower() in settings.ALERT_SEVERITIES:
+			return True
+		return any(str(category).lower() in settings.ALERT_CATEGORIES for category in post.get("category") or [])
+
+	def handle_event(self, event: dict):
+		"""Event bus listener: alert subscribers covering a new high-severity post, once it is ready"""
+		post = event.get("post") or {}
+		if event["type"] not in (POST_CREATED, POST_UPDATED) or post.get("status", "ready") != "ready":
+			return
+		location = post.get("Geolocation") or []
+		if len(location) < 2 or not self.is_high_severity(post):
+			return
+
+		with self._lock:
+			if post["id"] in self._alerted:
+				return
+			self._alerted[post["id"]] = None
+			while len(self._alerted) > settings.ALERT_OUTBOX_SIZE:
+				self._alerted.popitem(last=False)
+
+		for subscription_id in self.index.query(location[0], location[1]):
+			subscription = self.subscriptions.get(subscription_id)
+			if subscription is None:
+				continue
+			wanted = {category.lower() for category in subscription.get("categories") or []}
+			if wanted and not wanted.intersection(str(category).lower() for category in post.get("category") or []):
+				continue
+			self._deliver(subscription, post)
+
+	def _deliver(self, subscription: dict, post: dict):
+		"""Push the alert to the user's live connections and, if set, their webhook"""
+		self.stats["alerts"] += 1
+		event_bus.publish(ALERT, post, user_id=subscription["user_id"], subscription_id=subscription["id"])
+
+		if subscription.get("webhook_url"):
+			# Stand-in for an HTTP POST: queue the payload where it can be inspected
+			self.outbox.append(
+				{
+					"webhook_url": subscription["webhook_url"],
+					"user_id": subscription["user_id"],
+					"subscription_id": subscription["id"],
+					"post": post,
+					"queued_at": datetime.utcnow().isoformat() + "Z",
+				},
+			)
+			self.stats["webhooks"] += 1
+			print(f"📣 Alert for post {post['id']} queued for webhook {subscription['webhook_url']}")
+
+	def get_deliveries(self, user_id: str | None = None) -> list[dict]:
+		"""Queued webhook deliveries of one user, or every user's (admin API only) when user_id is None, newest last"""
+		return [delivery for delivery in self.outbox if user_id is None or delivery["user_id"] == user_id]
+
+	def get_stats(self) -> dict:
+		"""Index size and delivery counters"""
+		return {**self.index.stats(), **self.stats}
+
+
+# Global alert service instance
+alert_service = AlertService()
@@ -1,6 +1,53 @@
 import json
 import os
-from datetime import datetime
+import threading
+from collections.abc import Iterator
+from datetime import UTC, datetime
+
+from app.backend.core.metrics import metrics
+from app.backend.services.event_bus import POST_CREATED, POST_DELETED, POST_UPDATED, VOTE_DELTA, event_bus, in_bbox
+from app.backend.services.ranking import reranking_service
+from app.backend.services.storage_service import PLACEHOLDER_BITMAP, select_rendition, storage_service
+
+# Image metadata produced by the storage service, kept on posts only when present
+OPTIONAL_IMAGE_FIELDS = ("image_renditions", "image_placeholder", "image_sha256", "image_phash", "near_duplicate_of", "image_of")
+# What a post storing an upload's images holds; a duplicate upload only gets image_of (that upload's sha256)
+IMAGE_FIELDS = ("image_bitmap", "image_renditions", "image_placeholder", "image_sha256", "image_phash", "near_duplicate_of")
+# Other fields kept only when present: processing state, and provenance of ingested posts
+OPTIONAL_POST_FIELDS = ("status", "severity", "advice", "source", "source_url", "ingest_key")
+
+# Response shapes (PostShortResponse / PostResponse); either can be narrowed with ?fields=
+SHORT_POST_FIELDS = (
+	"id",
+	"username",
+	"title",
+	"image_bitmap",
+	"image_placeholder",
+	"upvote_count",
+	"downvote_count",
+	"karma",
+	"created_at",
+	"Geolocation",
+	"user_id",
+)
+LONG_POST_FIELDS = (*SHORT_POST_FIELDS[:3], "description", *SHORT_POST_FIELDS[3:], "category", "status")
+
+# Defaults for fields older posts may lack
+POST_FIELD_DEFAULTS = {"image_placeholder": None, "category": [], "status": "ready"}
+
+
+def parse_fields(fields: str | None) -> tuple[str, ...] | None:
+	"""
+	Parse a comma-separated ?fields= value into a projection (always including id), or None for the full shape.
+	Raises ValueError for unknown field names.
+	"""
+	if not fields:
+		return None
+	requested = [field.strip() for field in fields.split(",") if field.strip()]
+	unknown = [field for field in requested if field not in LONG_POST_FIELDS]
+	if unknown:
+		raise ValueError(f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(LONG_POST_FIELDS)}")
+	return tuple(field for field in LONG_POST_FIELDS if field == "id" or field in requested)
 
 
 class DataService:
@@ -8,6 +55,10 @@ class DataService:
 		self.data_file = os.path.join(os.path.dirname(__file__), "..", "..", "data", "sample_data.json")
 		self.posts = self._load_data()
 		self.votes = {}  # Store votes in memory: {post_id: {user_id: vote_type}}
+		self._ingested = None  # {ingest_key: post} for bulk ingestion, see _ingest_keys()
+		self._image_posts = None  # {image_sha256: post storing those images}, see _image_holders()
+		# Sync routes run in the threadpool and background post processing on the event loop; writes go through this lock
+		self._lock = threading.RLock()
 
 	def _load_data(self) -> list[dict]:
 		"""Load data from JSON file"""
@@ -37,9 +88,10 @@ class DataService:
 		try:
 			os.makedirs(os.path.dirname(self.data_file), exist_ok=True)
 			# Save in the format {"posts": [...]} to match existing structure
-			save_data = {"posts": data or self.posts}
-			with open(self.data_file, "w", encoding="utf-8") as f:
-				json.dump(save_data, f, indent=2, ensure_ascii=False)
+			with self._lock, metrics.span("data_save"):
+				save_data = {"posts": data or self.posts}
+				with open(self.data_file, "w", encoding="utf-8") as f:
+					json.dump(save_data, f, indent=2, ensure_ascii=False)
 		except Exception as e:
 			print(f"Error saving data: {e}")
 
@@ -201,10 +253,118 @@ class DataService:
 
 	def create_post(self, post_data: dict) -> dict:
 		"""Create a new post"""
-		# Generate new ID
-		new_id = max([post.get("id", 0) for post in self.posts]) + 1
+		with self._lock:
+			# Generate new ID
+			new_id = max([post.get("id", 0) for post in self.posts]) + 1
+			new_post = self._new_post(new_id, post_data)
+
+			# Add to posts list
+			self.posts.append(new_post)
+			self._track_image(new_post)
+
+			# Save to file
+			self._save_data()
+			event_bus.publish(POST_CREATED, self._event_post(new_post))
+
+		return new_post
+
+	def create_posts(self, posts_data: list[dict]) -> list[tuple[dict, bool]]:
+		"""
+		Create many posts with a single save (bulk ingestion).
+		Posts carrying an ingest_key that is already stored, or repeated within the batch,
+		are not created again. Returns (post, created) per input, in order.
+		"""
+		results = []
+		with self._lock:
+			ingest_keys = self._ingest_keys()
+			next_id = max([post.get("id", 0) for post in self.posts], default=0) + 1
+			created = []
+			for post_data in posts_data:
+				existing = ingest_keys.get(post_data.get("ingest_key"))
+				if existing is not None:
+					results.append((existing, False))
+					continue
+
+				new_post = self._new_post(next_id, post_data)
+				next_id += 1
+				self.posts.append(new_post)
+				self._track_image(new_post)
+				if new_post.get("ingest_key"):
+					ingest_keys[new_post["ingest_key"]] = new_post
+				created.append(new_post)
+				results.append((new_post, True))
+
+			if created:
+				self._save_data()
+			for new_post in created:
+				event_bus.publish(POST_CREATED, self._event_post(new_post))
+
+		return results
+
+	def _ingest_keys(self) -> dict[str, dict]:
+		"""Index of ingested posts by idempotency key, built on first use (call with the lock held)"""
+		if self._ingested is None:
+			self._ingested = {post["ingest_key"]: post for post in self.posts if post.get("ingest_key")}
+		return self._ingested
+
+	def _image_holders(self) -> dict[str, dict]:
+		"""Index of the posts storing each upload's images by sha256, built on first use (call with the lock held)"""
+		if self._image_posts is None:
+			self._image_posts = {}
+			for post in self.posts:
+				if post.get("image_sha256"):
+					self._image_posts.setdefault(post["image_sha256"], post)
+		return self._image_posts
+
+	def _track_image(self, post: dict):
+		"""Index a post that stores processed images, so later duplicates can reference them (call with the lock held)"""
+		holders = self._image_holders()
+		digest = post.get("image_sha256")
+		if digest:
+			holders.setdefault(digest, post)
+			storage_service.remember_image(digest)
+		elif post.get("image_of") and post["image_of"] not in holders:
+			# The post storing the images was deleted while this duplicate was being uploaded
+			print(f"⚠️ Post {post['id']} references images that are no longer stored")
+			del post["image_of"]
+			post["image_bitmap"] = PLACEHOLDER_BITMAP
+
+	def _release_image(self, post: dict):
+		"""Hand a deleted post's images to a post that still uses them, or forget them (call with the lock held)"""
+		holders = self._image_holders()
+		digest = post.get("image_sha256")
+		if not digest or holders.get(digest) is not post:
+			return
+
+		heir = next((other for other in self.posts if other.get("image_sha256") == digest), None)
+		if heir is None:
+			heir = next((other for other in self.posts if other.get("image_of") == digest), None)
+			if heir is None:
+				del holders[digest]
+				storage_service.forget_image(digest)
+				return
+			del heir["image_of"]
+			heir.update({field: post[field] for field in IMAGE_FIELDS if field in post})
+		holders[digest] = heir
 
-		# Create post with default values
+	def _image_source(self, post: dict) -> dict:
+		"""The post whose image fields to serve for post: itself, or the post storing the upload it duplicates"""
+		if not post.get("image_of"):
+			return post
+		with self._lock:
+			return self._image_holders().get(post["image_of"], post)
+
+	def with_images(self, post: dict) -> dict:
+		"""post carrying its own copy of the image fields it references, for exports to other stores"""
+		source = self._image_source(post)
+		if source is post:
+			return post
+		resolved = {field: value for field, value in post.items() if field != "image_of"}
+		resolved.update({field: source[field] for field in IMAGE_FIELDS if field in source})
+		return resolved
+
+	def _new_post(self, new_id: int, post_data: dict) -> dict:
+		"""A post with default values for the fields post_data leaves out (every post needs a Geolocation)"""
 		new_post = {
 			"id": new_id,
 			"username": post_data.get("username", "Anonymous"),
@@ -215,40 +375,95 @@ class DataService:
 			"downvote_count": 0,
 			"karma": 0.0,
 			"created_at": datetime.utcnow().isoformat() + "Z",
-			"Geolocation": post_data.get("Geolocation", [0.0, 0.0]),
+			"Geolocation": post_data["Geolocation"],
 			"user_id": post_data.get("user_id", "unknown"),
 			"category": post_data.get("category", []),
 		}
+		for field in (*OPTIONAL_IMAGE_FIELDS, *OPTIONAL_POST_FIELDS):
+			if post_data.get(field):
+				new_post[field] = post_data[field]
+		return new_post
 
-		# Add to posts list
-		self.posts.append(new_post)
+	def update_post(self, post_id: int, fields: dict) -> dict | None:
+		"""Update fields of a post (e.g. when background processing finishes)"""
+		with self._lock:
+			post = self.get_post_by_id(post_id)
+			if not post:
+				return None
 
-		# Save to file
-		self._save_data()
+			post.update(fields)
+			self._track_image(post)
+			self._save_data()
+			event_bus.publish(POST_UPDATED, self._event_post(post))
 
-		return new_post
+		return post
 
 	def vote_post(self, post_id: int, user_id: str, vote_type: str) -> bool:
 		"""Vote on a post"""
-		post = self.get_post_by_id(post_id)
-		if not post:
-			return False
+		with self._lock:
+			post = self.get_post_by_id(post_id)
+			if not post:
+				return False
+			upvotes, downvotes = post["upvote_count"], post["downvote_count"]
+
+			# Repeating the same vote changes nothing, so there is nothing to save or broadcast
+			if self._apply_vote(post, user_id, vote_type):
+				self._save_data()
+				self._publish_vote(post, upvotes, downvotes)
 
-		# Check if user already voted
-		if post_id not in self.votes:
-			self.votes[post_id] = {}
+		return True
 
-		if user_id in self.votes[post_id]:
-			# User already voted, remove previous vote
-			previous_vote = self.votes[post_id][user_id]
-			if previous_vote == "upvote":
-				post["upvote_count"] -= 1
-			elif previous_vote == "downvote":
-				post["downvote_count"] -= 1
+	def vote_posts(self, votes: list[dict]) -> list[dict]:
+		"""
+		Apply many {post_id, user_id, vote_type} votes with a single save.
+		Each vote is applied whole or not at all, and re-sending a vote a user already cast
+		is a no-op, so a batch can be retried safely. Returns one result per vote, in order.
+		"""
+		results = []
+		with self._lock:
+			before = {}  # post_id -> (post, upvotes, downvotes) ahead of the batch, for vote events
+			for vote in votes:
+				result = {"post_id": vote["post_id"], "user_id": vote["user_id"]}
+				post = self.get_post_by_id(vote["post_id"])
+				if vote["vote_type"] not in ("upvote", "downvote"):
+					result["status"] = "invalid"
+				elif not post:
+					result["status"] = "not_found"
+				else:
+					before.setdefault(post["id"], (post, post["upvote_count"], post["downvote_count"]))
+					changed = self._apply_vote(post, vote["user_id"], vote["vote_type"])
+					result.update(
+						status="applied" if changed else "unchanged",
+						upvote_count=post["upvote_count"],
+						downvote_count=post["downvote_count"],
+						karma=post["karma"],
+					)
+				results.append(result)
 
-		# Add new vote
-		self.votes[post_id][user_id] = vote_type
+			if any(result["status"] == "applied" for result in results):
+				self._save_data()
+			# One event per post with its net change over the batch
+			for post, upvotes, downvotes in before.values():
+				if (post["upvote_count"], post["downvote_count"]) != (upvotes, downvotes):
+					self._publish_vote(post, upvotes, downvotes)
+
+		return results
+
+	def _apply_vote(self, post: dict, user_id: str, vote_type: str) -> bool:
+		"""Record a user's vote on a post in memory, replacing their previous one; False if it was already cast"""
+		post_votes = self.votes.setdefault(post["id"], {})
+		previous_vote = post_votes.get(user_id)
+		if previous_vote == vote_type:
+			return False
+
+		# User already voted, remove previous vote
+		if previous_vote == "upvote":
+			post["upvote_count"] -= 1
+		elif previous_vote == "downvote":
+			post["downvote_count"] -= 1
 
+		# Add new vote
+		post_votes[user_id] = vote_type
 		if vote_type == "upvote":
 			post["upvote_count"] += 1
 		elif vote_type == "downvote":
@@ -256,63 +471,131 @@ class DataService:
 
 		# Recalculate karma
 		post["karma"] = self._calculate_karma(post["upvote_count"])
-
-		# Save to file
-		self._save_data()
-
 		return True
 
+	def _publish_vote(self, post: dict, upvotes: int, downvotes: int):
+		"""Broadcast a post's vote counts and their change since upvotes/downvotes"""
+		event_bus.publish(
+			VOTE_DELTA,
+			self._event_post(post, full=False),
+			upvote_delta=post["upvote_count"] - upvotes,
+			downvote_delta=post["downvote_count"] - downvotes,
+			upvote_count=post["upvote_count"],
+			downvote_count=post["downvote_count"],
+			karma=post["karma"],
+		)
+
 	def _calculate_karma(self, upvotes: int) -> float:
 		"""Calculate karma based on upvotes"""
 		if upvotes <= 0:
 			return 0.0
 		return round(upvotes * 0.5, 2)
 
-	def get_posts_short(self) -> list[dict]:
-		"""Get posts in short format"""
-		return [
-			{
-				"id": post["id"],
-				"username": post["username"],
-				"title": post["title"],
-				"image_bitmap": post.get("image_bitmap"),
-				"upvote_count": post["upvote_count"],
-				"downvote_count": post["downvote_count"],
-				"karma": post["karma"],
-				"created_at": post["created_at"],
-				"Geolocation": post["Geolocation"],
-				"user_id": post["user_id"],
-			}
-			for post in self.posts
-		]
+	def get_posts_short(self, rendition: str = "card", accept_webp: bool = False, fields: tuple[str, ...] | None = None) -> list[dict]:
+		"""Get posts in short format (or just the given fields), with the given image rendition"""
+		fields = fields or SHORT_POST_FIELDS
+		return [self._project(post, fields, rendition, accept_webp) for post in self.posts if post.get("status") != "failed"]
 
-	def get_posts_long(self) -> list[dict]:
-		"""Get posts in full format"""
-		return [
-			{
-				"id": post["id"],
-				"username": post["username"],
-				"title": post["title"],
-				"description": post.get("description") or post.get("long_description") or post.get("short_description", ""),
-				"image_bitmap": post.get("image_bitmap"),
-				"upvote_count": post["upvote_count"],
-				"downvote_count": post["downvote_count"],
-				"karma": post["karma"],
-				"created_at": post["created_at"],
-				"Geolocation": post["Geolocation"],
-				"user_id": post["user_id"],
-				"category": post.get("category", []),
-			}
-			for post in self.posts
-		]
+	def get_posts_ranked(
+		self,
+		user_lat: float,
+		user_lng: float,
+		limit: int = 50,
+		rendition: str = "card",
+		accept_webp: bool = False,
+		fields: tuple[str, ...] | None = None,
+	) -> list[dict]:
+		"""The best `limit` posts for a user's location (proximity, upvotes, recency), in short format or just the given fields"""
+		posts = [post for post in self.posts if post.get("status") != "failed"]
+		ranked = reranking_service.rerank_posts_json(posts, user_lat, user_lng)[:limit]
+		return [self._project(post, fields or SHORT_POST_FIELDS, rendition, accept_webp) for post in ranked]
+
+	def _short_post(self, post: dict, rendition: str = "card", accept_webp: bool = False) -> dict:
+		"""Short format of a single post (feed card)"""
+		return self._project(post, SHORT_POST_FIELDS, rendition, accept_webp)
+
+	def _project(self, post: dict, fields: tuple[str, ...], rendition: str, accept_webp: bool) -> dict:
+		"""Only the given response fields of a post; the image rendition is looked up only if image_bitmap is one of them"""
+		projected = {}
+		for field in fields:
+			if field == "image_bitmap":
+				projected[field] = select_rendition(self._image_source(post), rendition, accept_webp)
+			elif field == "image_placeholder":
+				projected[field] = self._image_source(post).get(field)
+			elif field == "description":
+				projected[field] = post.get("description") or post.get("long_description") or post.get("short_description", "")
+			elif field in POST_FIELD_DEFAULTS:
+				projected[field] = post.get(field, POST_FIELD_DEFAULTS[field])
+			else:
+				projected[field] = post[field]
+		return projected
+
+	def _event_post(self, post: dict, full: bool = True) -> dict:
+		"""Snapshot of a post for live events: the feed card (if full) plus what subscribers filter on"""
+		fields = self._short_post(post) if full else {"id": post["id"], "Geolocation": post["Geolocation"]}
+		return {**fields, "category": list(post.get("category", [])), "status": post.get("status", "ready"), "severity": post.get("severity")}
+
+	def get_posts_long(self, rendition: str = "full", accept_webp: bool = False, fields: tuple[str, ...] | None = None) -> list[dict]:
+		"""Get posts in full format (or just the given fields), with the given image rendition"""
+		fields = fields or LONG_POST_FIELDS
+		return [self._project(post, fields, rendition, accept_webp) for post in self.posts if post.get("status") != "failed"]
+
+	def iter_posts(
+		self,
+		since: datetime | None = None,
+		until: datetime | None = None,
+		bbox: tuple[float, float, float, float] | None = None,
+		categories: set[str] | None = None,
+		rendition: str = "full",
+		accept_webp: bool = False,
+		fields: tuple[str, ...] | None = None,
+	) -> Iterator[dict]:
+		"""
+		Yield matching posts in full format (or just the given fields) one at a time, for exports.
+		Walks the list by index without copying it, so posts created meanwhile are included
+		and a concurrent delete can at most skip one post.
+		"""
+		fields = fields or LONG_POST_FIELDS
+		index = 0
+		while index < len(self.posts):
+			try:
+				post = self.posts[index]
+			except IndexError:
+				break
+			index += 1
+
+			if post.get("status") == "failed":
+				continue
+			if bbox is not None and not in_bbox(post.get("Geolocation"), bbox):
+				continue
+			if categories and not categories.intersection(post.get("category") or []):
+				continue
+			if since is not None or until is not None:
+				created_at = self._created_at(post)
+				if created_at is None or (since is not None and created_at < since) or (until is not None and created_at >= until):
+					continue
+			yield self._project(post, fields, rendition, accept_webp)
+
+	def _created_at(self, post: dict) -> datetime | None:
+		"""A post's created_at as an aware datetime (stored as ISO 8601, naive values taken as UTC)"""
+		try:
+			created_at = datetime.fromisoformat(post["created_at"])
+		except (KeyError, TypeError, ValueError):
+			return None
+		return created_at if created_at.tzinfo else created_at.replace(tzinfo=UTC)
 
 	def delete_post(self, post_id: int) -> bool:
 		"""Delete a post"""
-		for i, post in enumerate(self.posts):
-			if post.get("id") == post_id:
-				del self.posts[i]
-				self._save_data()
-				return True
+		with self._lock:
+			for i, post in enumerate(self.posts):
+				if post.get("id") == post_id:
+					del self.posts[i]
+					if self._ingested is not None:
+						self._ingested.pop(post.get("ingest_key"), None)
+					self._release_image(post)
+					self._save_data()
+					event_bus.publish(POST_DELETED, self._event_post(post, full=False))
+					return True
 		return False
 
 
@@ -0,0 +1,151 @@
+"""
+Live post events (created, updated, deleted, vote deltas) fanned out to SSE/WebSocket clients.
+
+DataService publishes from whichever thread made the change; events are handed to the
+event loop with call_soon_threadsafe and copied into each matching subscriber's bounded
+queue. A subscriber that falls a full queue behind has its backlog dropped and gets a
+single "resync" event, telling it to refetch /short-post instead of replaying history.
+"""
+
+import asyncio
+import itertools
+from collections import Counter
+
+from app.backend.core.config import settings
+
+POST_CREATED = "post-created"
+POST_UPDATED = "post-updated"
+POST_DELETED = "post-deleted"
+VOTE_DELTA = "vote-delta"
+ALERT = "alert"  # Addressed to one user (event["user_id"]), see AlertService
+RESYNC = "resync"
+
+
+class Subscription:
+	"""One live client: its filters and bounded queue of pending events"""
+
+	def __init__(
+		self,
+		bbox: tuple[float, float, float, float] | None = None,
+		categories: set[str] | None = None,
+		max_queue: int = 256,
+		user_id: str | None = None,
+	):
+		self.bbox = bbox
+		self.categories = categories
+		self.user_id = user_id
+		self.queue: asyncio.Queue[dict] = asyncio.Queue(max_queue)
+		self.dropped = 0
+
+	def matches(self, event: dict) -> bool:
+		"""Whether the event's post falls inside the bounding box and shares a category"""
+		if "user_id" in event:
+			# Addressed events (alerts) go to that user regardless of the map filters
+			return event["user_id"] == self.user_id
+
+		post = event.get("post") or {}
+		if self.bbox is not None and not in_bbox(post.get("Geolocation"), self.bbox):
+			return False
+		return not self.categories or bool(self.categories.intersection(post.get("category") or []))
+
+	def put(self, event: dict):
+		"""Queue an event; on overflow drop the backlog and ask the client to resync"""
+		try:
+			self.queue.put_nowait(event)
+		except asyncio.QueueFull:
+			self.dropped += self.queue.qsize() + 1
+			while not self.queue.empty():
+				self.queue.get_nowait()
+			self.queue.put_nowait({"type": RESYNC})
+
+
+class EventBus:
+	"""Broadcaster from DataService to live subscribers"""
+
+	def __init__(self, max_queue: int = 256, max_subscribers: int = 1000):
+		self.max_queue = max_queue
+		self.max_subscribers = max_subscribers
+		self.subscribers: set[Subscription] = set()
+		self.stats = Counter()
+		self._ids = itertools.count(1)
+		self._loop: asyncio.AbstractEventLoop | None = None
+		self._listeners: list = []
+
+	def add_listener(self, callback):
+		"""Also deliver every event to callback(event), on the event loop (e.g. alert fan-out)"""
+		self._listeners.append(callback)
+
+	def bind(self, loop: asyncio.AbstractEventLoop):
+		"""Deliver events on this loop (the server's); called at startup"""
+		self._loop = loop
+
+	def publish(self, event_type: str, post: dict, **fields):
+		"""Broadcast an event about post; safe to call from any thread, a no-op before bind()"""
+		if self._loop is None or self._loop.is_closed():
+			return
+
+		# Always via the loop's callback queue, even on the loop thread, so events keep publish order
+		self._loop.call_soon_threadsafe(self._dispatch, {"type": event_type, "post": post, **fields})
+
+	def _dispatch(self, event: dict):
+		event["id"] = next(self._ids)
+		self.stats[event["type"]] += 1
+		for subscription in self.subscribers:
+			if subscription.matches(event):
+				subscription.put(event)
+		for callback in self._listeners:
+			try:
+				callback(event)
+			except Exception as e:
+				print(f"❌ Error in event listener: {e}")
+
+	def subscribe(
+		self,
+		bbox: tuple[float, float, float, float] | None = None,
+		categories: set[str] | None = None,
+		user_id: str | None = None,
+	) -> Subscription | None:
+		"""Register a client (user_id receives that user's alerts), or None when max_subscribers are connected"""
+		if len(self.subscribers) >= self.max_subscribers:
+			self.stats["rejected_subscribers"] += 1
+			return None
+		subscription = Subscription(bbox, categories, self.max_queue, user_id)
+		self.subscribers.add(subscription)
+		return subscription
+
+	def unsubscribe(self, subscription: Subscription):
+		"""Forget a disconnected client"""
+		self.subscribers.discard(subscription)
+		self.stats["dropped_events"] += subscription.dropped
+
+	def get_stats(self) -> dict:
+		"""Subscriber count and per-type event counters"""
+		return {"subscribers": len(self.subscribers), **self.stats}
+
+
+def in_bbox(location: list[float] | None, bbox: tuple[float, float, float, float]) -> bool:
+	"""Whether a [lat, lng] location lies inside (min_lat, min_lng, max_lat, max_lng)"""
+	if not location or len(location) < 2:
+		return False
+	min_lat, min_lng, max_lat, max_lng = bbox
+	return min_lat <= location[0] <= max_lat and min_lng <= location[1] <= max_lng
+
+
+def parse_filters(bbox: str | None, category: str | None) -> tuple[tuple[float, float, float, float] | None, set[str] | None]:
+	"""
+	Parse "min_lat,min_lng,max_lat,max_lng" and "a,b" query values into subscription filters.
+	Raises ValueError for a malformed bounding box.
+	"""
+	box = None
+	if bbox:
+		parts = [float(part) for part in bbox.split(",")]
+		if len(parts) != 4 or parts[0] > parts[2] or parts[1] > parts[3]:
+			raise ValueError("bbox must be min_lat,min_lng,max_lat,max_lng")
+		box = tuple(parts)
+
+	categories = {cat.strip() for cat in category.split(",") if cat.strip()} if category else None
+	return box, categories or None
+
+
+# Global event bus instance
+event_bus = EventBus(settings.LIVE_QUEUE_SIZE, settings.LIVE_MAX_SUBSCRIBERS)
@@ -0,0 +1,134 @@
+"""
+Reverse spatial index of alert subscriptions: which saved areas cover a point?
+
+Subscriptions (a point with a radius, or a polygon such as a buffered commute route)
+are registered in every cell of a fixed lat/lng grid that their bounding box touches.
+A lookup reads the one cell containing the point and runs the exact geometry test on
+those candidates only, so its cost depends on local subscription density rather than
+on the total number of subscriptions.
+"""
+
+import math
+import threading
+from collections import defaultdict
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.32
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+	"""Great-circle distance between two points in kilometres"""
+	phi1, phi2 = math.radians(lat1), math.radians(lat2)
+	d_phi = phi2 - phi1
+	d_lambda = math.radians(lng2 - lng1)
+	a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+	return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def point_in_polygon(lat: float, lng: float, polygon: list[list[float]]) -> bool:
+	"""Ray casting test; polygon is a list of [lat, lng] vertices (closing edge implied)"""
+	inside = False
+	j = len(polygon) - 1
+	for i in range(len(polygon)):
+		lat_i, lng_i = polygon[i]
+		lat_j, lng_j = polygon[j]
+		if (lng_i > lng) != (lng_j > lng) and lat < (lat_j - lat_i) * (lng - lng_i) / (lng_j - lng_i) + lat_i:
+			inside = not inside
+		j = i
+	return inside
+
+
+class GeoShape:
+	"""A subscription area: a circle (center + radius_km) or a polygon"""
+
+	def __init__(self, center: list[float] | None = None, radius_km: float | None = None, polygon: list[list[float]] | None = None):
+		if polygon is not None:
+			if len(polygon) < 3:
+				raise ValueError("A polygon needs at least 3 points")
+			self.polygon = [[float(lat), float(lng)] for lat, lng in polygon]
+			self.center = None
+			self.radius_km = None
+		elif center is not None and radius_km is not None:
+			if radius_km <= 0:
+				raise ValueError("radius_km must be positive")
+			self.polygon = None
+			self.center = [float(center[0]), float(center[1])]
+			self.radius_km = float(radius_km)
+		else:
+			raise ValueError("Provide either center and radius_km, or polygon")
+
+	def bounds(self) -> tuple[float, float, float, float]:
+		"""(min_lat, min_lng, max_lat, max_lng) enclosing the shape"""
+		if self.polygon is not None:
+			lats = [lat for lat, _ in self.polygon]
+			lngs = [lng for _, lng in self.polygon]
+			return min(lats), min(lngs), max(lats), max(lngs)
+
+		lat, lng = self.center
+		d_lat = self.radius_km / KM_PER_DEGREE_LAT
+		# Longitude degrees shrink towards the poles; clamp so the box stays finite
+		d_lng = self.radius_km / (KM_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 0.01))
+		return lat - d_lat, lng - d_lng, lat + d_lat, lng + d_lng
+
+	def contains(self, lat: float, lng: float) -> bool:
+		"""Exact test, run only on candidates from the grid"""
+		if self.polygon is not None:
+			return point_in_polygon(lat, lng, self.polygon)
+		return haversine_km(self.center[0], self.center[1], lat, lng) <= self.radius_km
+
+
+class GeoIndex:
+	"""Grid spatial hash from cell -> subscription ids, plus the shapes for exact tests"""
+
+	def __init__(self, cell_degrees: float = 0.05, max_cells_per_shape: int = 2500):
+		self.cell_degrees = cell_degrees
+		self.max_cells_per_shape = max_cells_per_shape
+		self._cells: dict[tuple[int, int], set[str]] = defaultdict(set)
+		self._shapes: dict[str, tuple[GeoShape, list[tuple[int, int]]]] = {}
+		self._lock = threading.Lock()
+
+	def _cell(self, lat: float, lng: float) -> tuple[int, int]:
+		return math.floor(lat / self.cell_degrees), math.floor(lng / self.cell_degrees)
+
+	def _cells_for(self, shape: GeoShape) -> list[tuple[int, int]]:
+		min_lat, min_lng, max_lat, max_lng = shape.bounds()
+		(row_min, col_min), (row_max, col_max) = self._cell(min_lat, min_lng), self._cell(max_lat, max_lng)
+		if (row_max - row_min + 1) * (col_max - col_min + 1) > self.max_cells_per_shape:
+			raise ValueError("Subscription area is too large")
+		return [(row, col) for row in range(row_min, row_max + 1) for col in range(col_min, col_max + 1)]
+
+	def add(self, key: str, shape: GeoShape):
+		"""Index (or re-index) a subscription's area; raises ValueError if it is too large"""
+		cells = self._cells_for(shape)
+		with self._lock:
+			self._remove(key)
+			self._shapes[key] = (shape, cells)
+			for cell in cells:
+				self._cells[cell].add(key)
+
+	def remove(self, key: str):
+		"""Drop a subscription from the index"""
+		with self._lock:
+			self._remove(key)
+
+	def _remove(self, key: str):
+		shape_cells = self._shapes.pop(key, None)
+		if shape_cells is None:
+			return
+		for cell in shape_cells[1]:
+			keys = self._cells.get(cell)
+			if keys is not None:
+				keys.discard(key)
+				if not keys:
+					del self._cells[cell]
+
+	def query(self, lat: float, lng: float) -> list[str]:
+		"""Ids of subscriptions whose area contains the point"""
+		with self._lock:
+			candidates = [(key, self._shapes[key][0]) for key in self._cells.get(self._cell(lat, lng), ())]
+		return [key for key, shape in candidates if shape.contains(lat, lng)]
+
+	def stats(self) -> dict[str, int]:
+		"""Index size"""
+		with self._lock:
+			return {"subscriptions": len(self._shapes), "cells": len(self._cells)}
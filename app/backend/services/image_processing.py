@@ -0,0 +1,295 @@
+"""
+CPU-bound image work, run inside the storage service's process pool.
+
+Everything here is a plain module-level function over bytes so it can be pickled
+to worker processes; keep imports light, since every worker imports this module.
+"""
+
+import io
+import math
+import os
+
+from PIL import Image
+
+# Bounding boxes for each stored rendition, largest first so each one is resized from the previous
+RENDITIONS = {
+	"full": (1920, 1920),
+	"card": (640, 640),
+	"thumbnail": (320, 320),
+}
+
+# EXIF Orientation tag values -> transpose that displays the image upright (as in ImageOps.exif_transpose)
+EXIF_ORIENTATION_TAG = 0x0112
+ORIENTATION_TRANSPOSE = {
+	2: Image.Transpose.FLIP_LEFT_RIGHT,
+	3: Image.Transpose.ROTATE_180,
+	4: Image.Transpose.FLIP_TOP_BOTTOM,
+	5: Image.Transpose.TRANSPOSE,
+	6: Image.Transpose.ROTATE_270,
+	7: Image.Transpose.TRANSVERSE,
+	8: Image.Transpose.ROTATE_90,
+}
+
+WEBP_CONTENT_TYPE = "image/webp"
+# Renditions that also get a WebP variant. Feeds serve card/thumbnail, so that is where WebP pays off;
+# a second copy of full would nearly double what every post stores for the odd detail view
+WEBP_VARIANT_RENDITIONS = ("card", "thumbnail")
+ENCODABLE_CONTENT_TYPES = ("image/jpeg", "image/png", "image/gif", WEBP_CONTENT_TYPE)
+
+# PIL format name -> content type, for matching an upload's real format against its declared one
+FORMAT_CONTENT_TYPES = {"JPEG": "image/jpeg", "PNG": "image/png", "GIF": "image/gif", "WEBP": WEBP_CONTENT_TYPE}
+
+# What an upload may carry besides pixels and still be stored byte for byte. Anything else
+# (EXIF, XMP, comments, IPTC/Photoshop blocks, ICC profiles, PNG text chunks) may hold GPS
+# or other personal data, so the upload is re-encoded, which drops it
+HARMLESS_INFO_KEYS = {"jfif", "jfif_version", "jfif_unit", "jfif_density", "dpi", "progressive", "progression", "adobe", "adobe_transform", "gamma", "aspect", "srgb", "chromaticity"}
+HARMLESS_JPEG_SEGMENTS = {"APP0", "APP14"}  # JFIF header, Adobe color transform
+HARMLESS_PNG_CHUNKS = {b"IHDR", b"PLTE", b"IDAT", b"IEND", b"gAMA", b"cHRM", b"sRGB", b"pHYs", b"sBIT"}
+
+
+def output_content_type(content_type: str | None) -> str:
+	"""Format a rendition is stored in: the upload's own format when we can encode it, JPEG otherwise"""
+	return content_type if content_type in ENCODABLE_CONTENT_TYPES else "image/jpeg"
+
+
+def _flatten(image: Image.Image) -> Image.Image:
+	"""Convert to RGB on a white background if necessary"""
+	if image.mode in ("RGBA", "LA", "P"):
+		# Create white background
+		background = Image.new("RGB", image.size, (255, 255, 255))
+		if image.mode == "P":
+			image = image.convert("RGBA")
+		background.paste(image, mask=image.split()[-1] if image.mode == "RGBA" else None)
+		return background
+	return image
+
+
+def _draft_for(image: Image.Image, max_size: tuple[int, int]):
+	"""
+	Let libjpeg decode a JPEG at 1/2, 1/4 or 1/8 scale when the result still covers
+	the size thumbnail() would produce for max_size. Must be called before the pixels
+	are loaded; does nothing for other formats or images already within max_size.
+	"""
+	if image.format != "JPEG":
+		return
+
+	ratio = min(max_size[0] / image.size[0], max_size[1] / image.size[1])
+	if ratio >= 1:
+		return
+
+	# max_size is square, so the requested size holds whatever the EXIF orientation is
+	image.draft(image.mode, (math.ceil(image.size[0] * ratio), math.ceil(image.size[1] * ratio)))
+
+
+def _png_chunk_types(data: bytes) -> set[bytes]:
+	"""Types of every chunk in a PNG file, including those after the image data"""
+	types = set()
+	offset = 8  # Signature
+	while offset + 8 <= len(data):
+		length = int.from_bytes(data[offset : offset + 4], "big")
+		types.add(data[offset + 4 : offset + 8])
+		offset += 12 + length  # Length, type, data, CRC
+	return types
+
+
+def _metadata_free(image: Image.Image, data: bytes) -> bool:
+	"""Whether the file holds nothing but pixels and the harmless fields above"""
+	if not set(image.info) <= HARMLESS_INFO_KEYS:
+		return False
+	if image.format == "JPEG":
+		# Segments Pillow does not surface in info count too, and so do bytes appended after the image
+		return all(marker in HARMLESS_JPEG_SEGMENTS for marker, _ in image.applist) and data.endswith(b"\xff\xd9")
+	if image.format == "PNG":
+		return _png_chunk_types(data) <= HARMLESS_PNG_CHUNKS
+	return True
+
+
+def _reusable_renditions(image: Image.Image, content_type: str, data: bytes | None, max_bytes: int) -> set[str]:
+	"""
+	Renditions the upload (data, or None when it is too big to have been read) can be
+	stored as byte for byte, judged without decoding the pixels: same format as declared,
+	small enough, no transparency to flatten, no metadata to strip (see _metadata_free),
+	and already within the rendition's box.
+	"""
+	if (
+		data is None
+		or len(data) > max_bytes
+		or FORMAT_CONTENT_TYPES.get(image.format) != content_type
+		or image.mode not in ("RGB", "L")
+		or getattr(image, "n_frames", 1) > 1
+		or not _metadata_free(image, data)
+	):
+		return set()
+
+	return {name for name, max_size in RENDITIONS.items() if image.size[0] <= max_size[0] and image.size[1] <= max_size[1]}
+
+
+def _encode(image: Image.Image, content_type: str) -> bytes:
+	"""Encode image in the format matching content_type"""
+	output = io.BytesIO()
+
+	if content_type == "image/png":
+		image.save(output, format="PNG", optimize=True)
+	elif content_type == "image/gif":
+		image.save(output, format="GIF", optimize=True)
+	elif content_type == WEBP_CONTENT_TYPE:
+		# method=4 is Pillow's default speed/size trade-off; higher values cost a lot more CPU for little gain
+		image.save(output, format="WEBP", quality=80, method=4)
+	else:
+		# Default to JPEG
+		image.save(output, format="JPEG", quality=85, optimize=True)
+
+	return output.getvalue()
+
+
+def perceptual_hash(image: Image.Image) -> int:
+	"""64-bit difference hash (dHash): one bit per horizontally adjacent pixel pair of a 9x8 grayscale thumbnail"""
+	pixels = list(image.convert("L").resize((9, 8), Image.Resampling.BILINEAR).getdata())
+	bits = 0
+	for row in range(8):
+		for col in range(8):
+			bits = (bits << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+	return bits
+
+
+BASE83_ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~"
+
+# BlurHash components (x, y) and the size the image is sampled down to first; 4x3 is about 28 characters
+BLURHASH_COMPONENTS = (4, 3)
+BLURHASH_SAMPLE_SIZE = (32, 32)
+
+
+def _base83(value: int, length: int) -> str:
+	"""Fixed-width base83 digits of value, as used by BlurHash"""
+	return "".join(BASE83_ALPHABET[(value // 83 ** (length - i - 1)) % 83] for i in range(length))
+
+
+def _srgb_to_linear(value: int) -> float:
+	v = value / 255
+	return v / 12.92 if v <= 0.04045 else ((v + 0.055) / 1.055) ** 2.4
+
+
+def _linear_to_srgb(value: float) -> int:
+	v = max(0.0, min(1.0, value))
+	return int(v * 12.92 * 255 + 0.5) if v <= 0.0031308 else int((1.055 * v ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+
+def blurhash(image: Image.Image, components: tuple[int, int] = BLURHASH_COMPONENTS) -> str:
+	"""
+	BlurHash (https://blurha.sh) of image: a few dozen characters the feed can paint
+	as a blurred placeholder before the real image loads. Pure Python over a 32px sample,
+	so it costs a few milliseconds in the worker.
+	"""
+	sample = image.convert("RGB")
+	sample.thumbnail(BLURHASH_SAMPLE_SIZE, Image.Resampling.BILINEAR)
+	width, height = sample.size
+	linear = [tuple(_srgb_to_linear(c) for c in pixel) for pixel in sample.getdata()]
+
+	x_components, y_components = components
+	cos_x = [[math.cos(math.pi * i * x / width) for x in range(width)] for i in range(x_components)]
+	cos_y = [[math.cos(math.pi * j * y / height) for y in range(height)] for j in range(y_components)]
+
+	factors = []
+	for j in range(y_components):
+		for i in range(x_components):
+			scale = (1 if i == j == 0 else 2) / (width * height)
+			r = g = b = 0.0
+			for y in range(height):
+				row = y * width
+				for x in range(width):
+					basis = cos_x[i][x] * cos_y[j][y]
+					pixel = linear[row + x]
+					r += basis * pixel[0]
+					g += basis * pixel[1]
+					b += basis * pixel[2]
+			factors.append((r * scale, g * scale, b * scale))
+
+	dc, ac = factors[0], factors[1:]
+	result = _base83((x_components - 1) + (y_components - 1) * 9, 1)
+
+	if ac:
+		quantised_max = max(0, min(82, int(max(abs(c) for factor in ac for c in factor) * 166 - 0.5)))
+		maximum = (quantised_max + 1) / 166
+		result += _base83(quantised_max, 1)
+	else:
+		maximum = 1
+		result += _base83(0, 1)
+
+	result += _base83((_linear_to_srgb(dc[0]) << 16) + (_linear_to_srgb(dc[1]) << 8) + _linear_to_srgb(dc[2]), 4)
+
+	for factor in ac:
+		r, g, b = (max(0, min(18, int(math.copysign(abs(c / maximum) ** 0.5, c) * 9 + 9.5))) for c in factor)
+		result += _base83(r * 19 * 19 + g * 19 + b, 2)
+
+	return result
+
+
+def process_image(
+	source: str | bytes, content_type: str, webp: bool = True, draft: bool = True, reuse_max_bytes: int = 0
+) -> dict:
+	"""
+	Worker entry point: decode once and produce every rendition in RENDITIONS.
+	source is a file path (streamed uploads) or the raw image bytes.
+	Large JPEGs are decoded at reduced resolution (see _draft_for) unless draft is off.
+	Uploads of at most reuse_max_bytes that already meet a rendition's policy are
+	stored as-is for it instead of being re-encoded (see _reusable_renditions); the
+	upload's bytes are returned once, as the full rendition, and smaller reused
+	renditions are left out (clients fall back to the full image for them).
+	Returns {"renditions": {rendition: {content_type: bytes}}, "phash": hex dHash,
+	"placeholder": BlurHash, "reused": [renditions stored as-is]}, with a WebP variant alongside the original
+	format for every re-encoded rendition in WEBP_VARIANT_RENDITIONS when webp is set.
+	"""
+	content_type = output_content_type(content_type)
+
+	# Only uploads small enough to be reused are read whole; the metadata check needs their bytes
+	data = None
+	if isinstance(source, bytes):
+		data = source
+	elif os.path.getsize(source) <= reuse_max_bytes:
+		with open(source, "rb") as f:
+			data = f.read()
+
+	with Image.open(io.BytesIO(data) if data is not None else source) as original:
+		reused = _reusable_renditions(original, content_type, data, reuse_max_bytes)
+		if reused:
+			source = data
+		# Only the largest rendition that is actually re-encoded needs the pixels
+		encoded = [name for name in RENDITIONS if name not in reused]
+		if draft:
+			_draft_for(original, RENDITIONS[encoded[0]] if encoded else RENDITIONS["thumbnail"])
+		orientation = original.getexif().get(EXIF_ORIENTATION_TAG)
+		image = _flatten(original)
+		# Encoders copy some metadata from info (Pillow's JPEG writer keeps comments); leave only the pixels and color profile
+		for key in ("comment", "exif", "xmp"):
+			image.info.pop(key, None)
+
+		renditions = {}
+		for name, max_size in RENDITIONS.items():
+			if name in reused:
+				# Reuse goes largest first, so full is always among the reused renditions
+				if name == "full":
+					renditions[name] = {content_type: source}
+				continue
+
+			# Resize if too large
+			# (in place: the larger rendition has already been encoded)
+			if image.size[0] > max_size[0] or image.size[1] > max_size[1]:
+				image.thumbnail(max_size, Image.Resampling.LANCZOS)
+
+			# Rotate once, on the first (already downsized) rendition rather than the full decode
+			if orientation in ORIENTATION_TRANSPOSE:
+				image = image.transpose(ORIENTATION_TRANSPOSE[orientation])
+				orientation = None
+
+			variants = {content_type: _encode(image, content_type)}
+			if webp and name in WEBP_VARIANT_RENDITIONS and content_type != WEBP_CONTENT_TYPE:
+				variants[WEBP_CONTENT_TYPE] = _encode(image, WEBP_CONTENT_TYPE)
+			renditions[name] = variants
+
+		# Hash the smallest rendition: cheap, and already upright
+		return {
+			"renditions": renditions,
+			"phash": f"{perceptual_hash(image):016x}",
+			"placeholder": blurhash(image),
+			"reused": sorted(reused),
+		}
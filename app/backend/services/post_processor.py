@@ -0,0 +1,94 @@
+import asyncio
+from collections import Counter
+
+from fastapi import HTTPException, status
+
+from app.backend.core.config import settings
+from app.backend.core.metrics import metrics
+from app.backend.services.data_service import data_service
+from app.backend.services.storage_service import storage_service
+
+# Post lifecycle for async creation: created "pending" with a placeholder image,
+# then "ready" once renditions and categories are in, or "failed"
+PENDING = "pending"
+READY = "ready"
+FAILED = "failed"
+
+
+def categorize() -> list[str]:
+	"""Categories for a new post (fixed until agent categorization of the description is re-enabled)"""
+	with metrics.span("llm_categorize"):
+		# Temporarily disable agent categorization
+		# location, condition = agent.categorize(description)
+		location, condition = "general", "information"
+	return [location, condition]
+
+
+class PostProcessor:
+	"""
+	Finishes posts created in async mode: image renditions and categorization run in
+	background tasks, at most max_concurrent at a time, and update the stored post.
+	"""
+
+	def __init__(self, max_concurrent: int = 4, max_backlog: int = 64):
+		self.max_concurrent = max_concurrent
+		self.max_backlog = max_backlog
+		self._semaphore = asyncio.Semaphore(max_concurrent)
+		self._tasks: set[asyncio.Task] = set()
+		self.stats = Counter()
+
+	def check_capacity(self):
+		"""Raise 503 when too many posts are already waiting to be processed"""
+		if len(self._tasks) >= self.max_backlog:
+			self.stats["rejected"] += 1
+			raise HTTPException(
+				status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+				detail="Too many posts are being processed, please retry shortly",
+				headers={"Retry-After": str(settings.IMAGE_RETRY_AFTER_SECONDS)},
+			)
+
+	def submit(self, post_id: int, spooled: tuple[str, str | None, str]):
+		"""Process a pending post's spooled upload (from storage_service.spool_*) in the background"""
+		task = asyncio.create_task(self._process(post_id, spooled))
+		# The event loop only keeps weak references to tasks
+		self._tasks.add(task)
+		task.add_done_callback(self._tasks.discard)
+		self.stats["submitted"] += 1
+
+	async def _process(self, post_id: int, spooled: tuple[str, str | None, str]):
+		"""Build renditions and categories, then mark the post ready (or failed)"""
+		path, content_type, digest = spooled
+		try:
+			async with self._semaphore:
+				image_fields = await storage_service.process_spooled(path, content_type, digest)
+				fields = {**image_fields, "category": categorize(), "status": READY}
+			self.stats["ready"] += 1
+		except asyncio.CancelledError:
+			# Server shutting down: don't leave the post pending forever
+			data_service.update_post(post_id, {"status": FAILED, "status_detail": "Processing was interrupted"})
+			raise
+		except Exception as e:
+			print(f"❌ Error processing post {post_id}: {e}")
+			detail = e.detail if isinstance(e, HTTPException) else "Image could not be processed"
+			fields = {"status": FAILED, "status_detail": detail}
+			self.stats["failed"] += 1
+		finally:
+			storage_service.remove_spooled(path)
+
+		# Writing the data file blocks; keep it off the event loop
+		await asyncio.to_thread(data_service.update_post, post_id, fields)
+
+	def get_stats(self) -> dict:
+		"""Backlog size and outcome counters"""
+		return {"in_progress": len(self._tasks), "max_concurrent": self.max_concurrent, "max_backlog": self.max_backlog, **self.stats}
+
+	async def shutdown(self):
+		"""Cancel outstanding work and wait for it to unwind; affected posts are marked failed"""
+		tasks = list(self._tasks)
+		for task in tasks:
+			task.cancel()
+		await asyncio.gather(*tasks, return_exceptions=True)
+
+
+# Global post processor instance
+post_processor = PostProcessor(settings.POST_PROCESSING_CONCURRENCY, settings.POST_PROCESSING_BACKLOG)
@@ -1,8 +1,10 @@
 import math
-from datetime import datetime
+from datetime import UTC, datetime
 
 from geopy.distance import geodesic
 
+from app.backend.core.metrics import metrics
+
 
 class RerankingService:
 	"""
@@ -24,14 +26,15 @@ class RerankingService:
 		if not posts:
 			return posts
 
-		# Calculate scores for each post
-		scored_posts = []
-		for post in posts:
-			score = self._calculate_post_score_json(post, user_lat, user_lng)
-			scored_posts.append((post, score))
+		with metrics.span("rerank"):
+			# Calculate scores for each post
+			scored_posts = []
+			for post in posts:
+				score = self._calculate_post_score_json(post, user_lat, user_lng)
+				scored_posts.append((post, score))
 
-		# Sort by score (descending)
-		scored_posts.sort(key=lambda x: x[1], reverse=True)
+			# Sort by score (descending)
+			scored_posts.sort(key=lambda x: x[1], reverse=True)
 
 		# Return sorted posts
 		return [post for post, score in scored_posts]
@@ -93,13 +96,20 @@ class RerankingService:
 		Calculate recency score (JSON version)
 		"""
 		try:
-			created_at = datetime.fromisoformat(post["created_at"].replace("Z", "+00:00"))
-			now = datetime.utcnow()
-			age_hours = (now - created_at).total_seconds() / 3600
+			created_at = post["created_at"]
+			if isinstance(created_at, str):
+				created_at = datetime.fromisoformat(created_at.replace("Z", "+00:00"))
+			if created_at.tzinfo is None:
+				created_at = created_at.replace(tzinfo=UTC)  # Stored timestamps are UTC
+			age_hours = (datetime.now(UTC) - created_at).total_seconds() / 3600
+		except (KeyError, TypeError, ValueError, AttributeError):
+			return 0.5  # Default score if date parsing fails
 
-			# Exponential decay: newer posts get higher scores
-			score = math.exp(-age_hours / 24)  # 24-hour half-life
+		# Exponential decay: newer posts get higher scores
+		score = math.exp(-age_hours / 24)  # 24-hour half-life
 
-			return min(1.0, max(0.0, score))
-		except:
-			return 0.5  # Default score if date parsing fails
+		return min(1.0, max(0.0, score))
+
+
+# Global reranking service instance
+reranking_service = RerankingService()
@@ -1,16 +1,95 @@
+import asyncio
 import base64
-import io
+import contextlib
+import hashlib
+import multiprocessing
+import os
+import tempfile
+from collections import Counter, OrderedDict
+from collections.abc import AsyncIterator
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
 from fastapi import HTTPException, UploadFile, status
-from PIL import Image
 
+from app.backend.core.cache import LRUCache
 from app.backend.core.config import settings
+from app.backend.core.metrics import metrics
+from app.backend.services.image_processing import RENDITIONS, output_content_type, process_image
+
+
+class ImageProcessingPool:
+	"""
+	Bounded process pool for CPU-bound image work.
+	Keeps PIL decode/resize/encode off the event loop and rejects new work with a 503
+	once max_pending jobs are queued or running in this process.
+	"""
+
+	def __init__(self, max_workers: int | None = None, max_pending: int = 16):
+		self.max_workers = max_workers or os.cpu_count() or 1
+		self.max_pending = max_pending
+		self.pending = 0
+		self.rejected = 0
+		self._executor = None
+
+	def _get_executor(self) -> ProcessPoolExecutor:
+		"""Create the worker processes on first use"""
+		if self._executor is None:
+			# spawn rather than fork: the server process has threads (uvicorn, threadpool) that fork would copy mid-flight
+			self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+		return self._executor
+
+	async def run(self, func, *args):
+		"""Run func(*args) in a worker process, or raise 503 when saturated"""
+		if self.pending >= self.max_pending:
+			self.rejected += 1
+			raise HTTPException(
+				status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+				detail="Image processing is at capacity, please retry shortly",
+				headers={"Retry-After": str(settings.IMAGE_RETRY_AFTER_SECONDS)},
+			)
+
+		self.pending += 1
+		try:
+			loop = asyncio.get_running_loop()
+			try:
+				return await loop.run_in_executor(self._get_executor(), func, *args)
+			except BrokenProcessPool:
+				# A worker died (e.g. OOM on a hostile image); start a fresh pool for the next job
+				self._executor = None
+				raise
+		finally:
+			self.pending -= 1
+
+	def stats(self) -> dict[str, int]:
+		"""Queue depth and rejection counters"""
+		return {"workers": self.max_workers, "pending": self.pending, "max_pending": self.max_pending, "rejected": self.rejected}
+
+	def shutdown(self):
+		"""Stop the worker processes"""
+		if self._executor is not None:
+			self._executor.shutdown(wait=False, cancel_futures=True)
+			self._executor = None
+
+
+# Longest "data:image/...;base64," prefix accepted before the comma
+MAX_DATA_URL_HEADER = 256
+
+# 1x1 image returned when an upload cannot be processed
+PLACEHOLDER_BITMAP = "data:image/jpeg;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=="
 
 
 class LocalStorageService:
 	"""Local Storage Service for image uploads"""
 
 	def __init__(self):
+		self.image_pool = ImageProcessingPool(settings.IMAGE_WORKERS or None, settings.IMAGE_QUEUE_LIMIT)
+		# sha256 of uploads whose image fields are already stored on a post (see remember_image).
+		# Only the digest is kept, never the renditions: a duplicate post references the stored ones
+		self.processed_images = LRUCache(settings.IMAGE_DEDUP_MAX_ENTRIES, settings.IMAGE_DEDUP_TTL_SECONDS)
+		# perceptual hash -> sha256 of recent uploads, for near-duplicate flagging
+		self._phash_index: OrderedDict[int, str] = OrderedDict()
+		self.stats = Counter()
 		self._initialize_storage()
 
 	def _initialize_storage(self):
@@ -27,19 +106,84 @@ class LocalStorageService:
 		"""Check if storage is connected"""
 		return True  # Local storage is always available
 
-	async def upload_image(self, image_file: UploadFile, folder: str = "posts") -> str | None:
+	async def upload_image(self, image_file: UploadFile, folder: str = "posts") -> dict:
+		"""
+		Convert uploaded image to bitmap renditions
+		Returns the image fields for a post (see _process_image)
+		"""
+		path = None
+		try:
+			path, content_type, digest = await self.spool_image(image_file)
+			return await self._process_image(path, content_type, digest)
+		except HTTPException:
+			raise
+		except Exception as e:
+			print(f"Error converting image to bitmap: {e}")
+			# Return a placeholder image as fallback
+			return {"image_bitmap": PLACEHOLDER_BITMAP, "image_renditions": {}}
+		finally:
+			self.remove_spooled(path)
+
+	async def upload_base64_stream(self, image_file: UploadFile, folder: str = "posts") -> dict:
+		"""
+		Convert an uploaded base64 data URL (sent as a text part) to bitmap renditions,
+		decoding it incrementally instead of holding the whole body in memory
+		"""
+		path = None
+		try:
+			path, content_type, digest = await self.spool_base64_stream(image_file)
+			return await self._process_image(path, content_type, digest)
+		except HTTPException:
+			raise
+		except Exception as e:
+			print(f"Error converting base64 to bitmap: {e}")
+			# Return a placeholder image as fallback
+			return {"image_bitmap": PLACEHOLDER_BITMAP, "image_renditions": {}}
+		finally:
+			self.remove_spooled(path)
+
+	async def upload_base64_image(self, base64_data: str, folder: str = "posts") -> dict:
+		"""
+		Convert base64 encoded image to bitmap renditions
+		Returns the image fields for a post (see _process_image)
+		"""
+		path = None
+		try:
+			path, content_type, digest = await self._spool_base64(self._iter_string(base64_data))
+			return await self._process_image(path, content_type, digest)
+		except HTTPException:
+			raise
+		except Exception as e:
+			print(f"Error converting base64 to bitmap: {e}")
+			# Return the original base64 data as fallback
+			return {"image_bitmap": base64_data, "image_renditions": {}}
+		finally:
+			self.remove_spooled(path)
+
+	async def spool_image(self, image_file: UploadFile) -> tuple[str, str | None, str]:
+		"""
+		First half of upload_image: copy the upload to a temporary file.
+		Returns (path, content_type, sha256) for process_spooled.
+		"""
+		path, digest = await self._spool_file(self._read_chunks(image_file))
+		return path, image_file.content_type, digest
+
+	async def spool_base64_stream(self, image_file: UploadFile) -> tuple[str, str, str]:
 		"""
-		Convert uploaded image to bitmap format
-		Returns the base64 encoded bitmap string
+		First half of upload_base64_stream: decode the data URL into a temporary file.
+		Returns (path, content_type, sha256) for process_spooled.
 		"""
-		return await self._convert_to_bitmap(image_file)
+		return await self._spool_base64(self._read_chunks(image_file), require_data_url=True)
 
-	async def upload_base64_image(self, base64_data: str, folder: str = "posts") -> str | None:
+	async def process_spooled(self, path: str, content_type: str | None, digest: str) -> dict:
 		"""
-		Convert base64 encoded image to bitmap format
-		Returns the base64 encoded bitmap string
+		Second half of an upload: build the image fields from a spooled file, then delete it.
+		Unlike the upload_* methods, failures raise instead of falling back to a placeholder.
 		"""
-		return await self._convert_base64_to_bitmap(base64_data)
+		try:
+			return await self._process_image(path, content_type, digest)
+		finally:
+			self.remove_spooled(path)
 
 	async def delete_image(self, image_url: str) -> bool:
 		"""
@@ -48,98 +192,199 @@ class LocalStorageService:
 		# Since images are stored as base64 strings, there's nothing to delete
 		return True
 
-	async def _optimize_image(self, image_data: bytes, content_type: str) -> bytes:
+	async def _read_chunks(self, image_file: UploadFile) -> AsyncIterator[bytes]:
+		"""Read an upload in UPLOAD_CHUNK_SIZE pieces"""
+		while chunk := await image_file.read(settings.UPLOAD_CHUNK_SIZE):
+			yield chunk
+
+	async def _iter_string(self, data: str) -> AsyncIterator[bytes]:
+		"""Feed an in-memory string through the same chunked path as uploads"""
+		for start in range(0, len(data), settings.UPLOAD_CHUNK_SIZE):
+			yield data[start : start + settings.UPLOAD_CHUNK_SIZE].encode("ascii")
+
+	def _too_large(self) -> HTTPException:
+		"""413 for uploads past MAX_FILE_SIZE"""
+		return HTTPException(
+			status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+			detail=f"Image exceeds the maximum size of {settings.MAX_FILE_SIZE} bytes",
+		)
+
+	async def _spool_file(self, chunks: AsyncIterator[bytes]) -> tuple[str, str]:
 		"""
-		Optimize image for storage
+		Copy an upload to a temporary file chunk by chunk, rejecting it as soon as it
+		passes MAX_FILE_SIZE. Returns (path, sha256 of the bytes); the caller removes the file.
 		"""
-		try:
-			# Open image
-			image = Image.open(io.BytesIO(image_data))
-
-			# Convert to RGB if necessary
-			if image.mode in ("RGBA", "LA", "P"):
-				# Create white background
-				background = Image.new("RGB", image.size, (255, 255, 255))
-				if image.mode == "P":
-					image = image.convert("RGBA")
-				background.paste(image, mask=image.split()[-1] if image.mode == "RGBA" else None)
-				image = background
-
-			# Resize if too large
-			max_size = (1920, 1920)
-			if image.size[0] > max_size[0] or image.size[1] > max_size[1]:
-				image.thumbnail(max_size, Image.Resampling.LANCZOS)
-
-			# Save optimized image
-			output = io.BytesIO()
-
-			if content_type == "image/png":
-				image.save(output, format="PNG", optimize=True)
-			elif content_type == "image/gif":
-				image.save(output, format="GIF", optimize=True)
-			else:
-				# Default to JPEG
-				image.save(output, format="JPEG", quality=85, optimize=True)
-
-			return output.getvalue()
+		size = 0
+		sha256 = hashlib.sha256()
+		with tempfile.NamedTemporaryFile(prefix="upload-", delete=False) as spooled:
+			try:
+				async for chunk in chunks:
+					size += len(chunk)
+					if size > settings.MAX_FILE_SIZE:
+						raise self._too_large()
+					sha256.update(chunk)
+					spooled.write(chunk)
+			except BaseException:
+				self.remove_spooled(spooled.name)
+				raise
+		return spooled.name, sha256.hexdigest()
 
-		except Exception as e:
-			print(f"Error optimizing image: {e}")
-			# Return original data if optimization fails
-			return image_data
+	async def _spool_base64(self, chunks: AsyncIterator[bytes], require_data_url: bool = False) -> tuple[str, str, str]:
+		"""
+		Decode a base64 stream (optionally a data:image/...;base64, URL) into a temporary
+		file, 4-character groups at a time. Returns (path, content_type, sha256 of the decoded bytes).
+		"""
+		state = {"content_type": None}
 
+		async def decoded_chunks():
+			header = b""
+			pending = b""
+			async for chunk in chunks:
+				body = chunk  # What is left of the chunk once the data URL header is stripped
+				if state["content_type"] is None:
+					header += chunk
+					if header.startswith(b"data:"):
+						if b"," not in header:
+							if len(header) > MAX_DATA_URL_HEADER:
+								raise self._invalid_data_url()
+							continue
+						prefix, body = header.split(b",", 1)
+						if not prefix.startswith(b"data:image/"):
+							raise self._invalid_data_url()
+						state["content_type"] = prefix[5:].split(b";")[0].decode("ascii")
+					elif require_data_url and len(header) >= len(b"data:"):
+						raise self._invalid_data_url()
+					elif require_data_url:
+						continue
+					else:
+						state["content_type"] = "image/jpeg"
+						body = header
 
+				data = pending + body.translate(None, b" \t\r\n")
+				usable = len(data) - len(data) % 4
+				pending = data[usable:]
+				if usable:
+					yield base64.b64decode(data[:usable], validate=True)
 
+			if state["content_type"] is None and require_data_url:
+				raise self._invalid_data_url()
+			if pending:
+				raise ValueError("Truncated base64 data")
 
+		path, digest = await self._spool_file(decoded_chunks())
+		return path, state["content_type"] or "image/jpeg", digest
 
-	async def _convert_to_bitmap(self, image_file: UploadFile) -> str:
-		"""Convert uploaded image to bitmap format (base64 encoded)"""
-		try:
-			# Read image data
-			image_data = await image_file.read()
-			
-			# Optimize image
-			optimized_image_data = await self._optimize_image(image_data, image_file.content_type)
-			
-			# Convert to base64
-			base64_encoded = base64.b64encode(optimized_image_data).decode('utf-8')
-			
-			# Return as data URL
-			content_type = image_file.content_type or "image/jpeg"
-			return f"data:{content_type};base64,{base64_encoded}"
+	def _invalid_data_url(self) -> HTTPException:
+		"""400 for base64 bodies that are not image data URLs"""
+		return HTTPException(
+			status_code=status.HTTP_400_BAD_REQUEST,
+			detail="Invalid bitmap format. Must start with 'data:image/'",
+		)
 
-		except Exception as e:
-			print(f"Error converting image to bitmap: {e}")
-			# Return a placeholder image as fallback
-			return "data:image/jpeg;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=="
+	def remove_spooled(self, path: str | None):
+		"""Delete a spooled upload, if any"""
+		if path:
+			with contextlib.suppress(FileNotFoundError):
+				os.remove(path)
 
-	async def _convert_base64_to_bitmap(self, base64_data: str) -> str:
-		"""Convert base64 encoded image to optimized bitmap format"""
-		try:
-			# Parse base64 data
-			if base64_data.startswith("data:image/"):
-				header, encoded = base64_data.split(",", 1)
-				content_type = header.split(":")[1].split(";")[0]
-			else:
-				encoded = base64_data
-				content_type = "image/jpeg"
-
-			# Decode base64
-			image_data = base64.b64decode(encoded)
-			
-			# Optimize image
-			optimized_image_data = await self._optimize_image(image_data, content_type)
-			
-			# Convert back to base64
-			base64_encoded = base64.b64encode(optimized_image_data).decode('utf-8')
-			
-			# Return as data URL
-			return f"data:{content_type};base64,{base64_encoded}"
+	async def _process_image(self, source: str | bytes, content_type: str | None, digest: str) -> dict:
+		"""
+		Build every rendition in the process pool and return the image fields for a post:
+		image_bitmap holds the full rendition in the upload's own format (what older
+		clients read), image_renditions maps rendition -> {content_type: data URL}
+		for the remaining variants (renditions stored as uploaded are left out, so
+		select_rendition serves image_bitmap for them), image_placeholder is a BlurHash to paint while they
+		load, image_sha256/image_phash identify the upload and near_duplicate_of is
+		the sha256 of a visually similar earlier upload, if any.
+		A byte-identical upload of an image already stored on a post is not reprocessed;
+		it gets just {"image_of": sha256}, a reference to that post's images.
+		"""
+		if self.processed_images.get(digest) is not None:
+			self.stats["duplicate_uploads"] += 1
+			return {"image_of": digest}
 
-		except Exception as e:
-			print(f"Error converting base64 to bitmap: {e}")
-			# Return the original base64 data as fallback
-			return base64_data
+		content_type = output_content_type(content_type)
+		with metrics.span("image_process"):
+			processed = await self.image_pool.run(process_image, source, content_type, settings.IMAGE_WEBP_RENDITIONS, True, settings.IMAGE_REUSE_MAX_BYTES)
+		self._count_reuse(processed["reused"])
+
+		image_renditions = {name: {variant_type: self._to_data_url(variant, variant_type) for variant_type, variant in variants.items()} for name, variants in processed["renditions"].items()}
+		image_bitmap = image_renditions["full"].pop(content_type)
+		image_fields = {
+			"image_bitmap": image_bitmap,
+			"image_renditions": {name: variants for name, variants in image_renditions.items() if variants},
+			"image_sha256": digest,
+			"image_phash": processed["phash"],
+			"image_placeholder": processed["placeholder"],
+			"near_duplicate_of": self._find_near_duplicate(int(processed["phash"], 16), digest),
+		}
+		if image_fields["near_duplicate_of"]:
+			self.stats["near_duplicate_uploads"] += 1
+
+		return image_fields
+
+	def remember_image(self, digest: str):
+		"""Record that a post now stores the images of this upload, so duplicates can reference them"""
+		self.processed_images.set(digest, digest)
+
+	def forget_image(self, digest: str):
+		"""The last post storing this upload's images is gone; duplicates must be processed again"""
+		self.processed_images.invalidate(digest)
+
+	def _count_reuse(self, reused: list[str]):
+		"""Record which renditions were stored as uploaded and which had to be re-encoded"""
+		self.stats["renditions_reused"] += len(reused)
+		self.stats["renditions_encoded"] += len(RENDITIONS) - len(reused)
+		if len(reused) == len(RENDITIONS):
+			self.stats["images_reencode_skipped"] += 1
+		else:
+			self.stats["images_reencoded"] += 1
+
+	def _find_near_duplicate(self, phash: int, digest: str) -> str | None:
+		"""
+		Return the sha256 of a recent upload within IMAGE_NEAR_DUPLICATE_DISTANCE bits of
+		phash, and remember this one. A linear scan of the bounded index: XOR + popcount
+		over a few thousand ints is well under a millisecond.
+		"""
+		match = None
+		for seen_phash, seen_digest in reversed(self._phash_index.items()):
+			if seen_digest != digest and (seen_phash ^ phash).bit_count() <= settings.IMAGE_NEAR_DUPLICATE_DISTANCE:
+				match = seen_digest
+				break
+
+		self._phash_index[phash] = digest
+		self._phash_index.move_to_end(phash)
+		while len(self._phash_index) > settings.IMAGE_DEDUP_MAX_ENTRIES:
+			self._phash_index.popitem(last=False)
+
+		return match
+
+	def get_stats(self) -> dict:
+		"""Image pipeline counters: pool queue depth, dedup cache, duplicate uploads and re-encode skips"""
+		return {
+			"pool": self.image_pool.stats(),
+			"processed_images": self.processed_images.stats(),
+			**self.stats,
+		}
+
+	def _to_data_url(self, image_data: bytes, content_type: str) -> str:
+		"""Encode image bytes as a data URL"""
+		base64_encoded = base64.b64encode(image_data).decode("utf-8")
+		return f"data:{content_type};base64,{base64_encoded}"
+
+
+def select_rendition(post: dict, rendition: str, accept_webp: bool = False) -> str | None:
+	"""
+	Pick the image URL to serve for a post: the requested rendition, as WebP when
+	the client accepts it, falling back to image_bitmap (the full-size original).
+	"""
+	variants = (post.get("image_renditions") or {}).get(rendition) or {}
+	if accept_webp and "image/webp" in variants:
+		return variants["image/webp"]
+	for content_type, url in variants.items():
+		if content_type != "image/webp":
+			return url
+	return post.get("image_bitmap")
 
 
 # Global storage service instance
@@ -0,0 +1,105 @@
+"""
+Compare full-resolution vs draft-mode (reduced DCT scale) JPEG decoding in the upload pipeline.
+
+Generates a corpus of phone-photo-sized JPEGs, then runs process_image on each
+in a fresh interpreter (so peak RSS is not polluted by earlier cases) with and
+without draft decoding:
+
+	python -m benchmarks.image_decode --repeat 5
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from PIL import Image
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# (label, width, height, EXIF orientation)
+CORPUS = [
+	("2MP landscape", 1600, 1200, 1),
+	("8MP landscape", 3264, 2448, 1),
+	("12MP landscape", 4032, 3024, 1),
+	("12MP portrait (EXIF 6)", 4032, 3024, 6),
+	("48MP landscape", 8000, 6000, 1),
+]
+
+# Executed in the child interpreter; prints wall times and peak RSS growth as JSON
+# (VmHWM rather than ru_maxrss: on Linux a child inherits the parent's ru_maxrss across fork/exec)
+CHILD = """
+import json, resource, sys, time
+from app.backend.services.image_processing import process_image
+
+def peak_rss_kb():
+	try:
+		with open("/proc/self/status") as status:
+			for line in status:
+				if line.startswith("VmHWM:"):
+					return int(line.split()[1])
+	except OSError:
+		pass
+	return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+path, draft, repeat = sys.argv[1], sys.argv[2] == "1", int(sys.argv[3])
+baseline_kb = peak_rss_kb()
+times = []
+for _ in range(repeat):
+	started = time.perf_counter()
+	process_image(path, "image/jpeg", webp=False, draft=draft)
+	times.append(time.perf_counter() - started)
+print(json.dumps({"times": times, "peak_rss_delta_mb": (peak_rss_kb() - baseline_kb) / 1024}))
+"""
+
+
+def make_photo(path: Path, width: int, height: int, orientation: int):
+	"""Write a noisy JPEG (noise defeats the trivially compressible flat-colour case) at phone quality"""
+	image = Image.merge(
+		"RGB",
+		(
+			Image.effect_noise((width, height), 40),
+			Image.linear_gradient("L").resize((width, height)),
+			Image.radial_gradient("L").resize((width, height)),
+		),
+	)
+	exif = Image.Exif()
+	exif[0x0112] = orientation
+	image.save(path, format="JPEG", quality=90, exif=exif)
+
+
+def run_case(path: Path, draft: bool, repeat: int) -> dict:
+	"""Run one corpus image through process_image in a fresh interpreter"""
+	completed = subprocess.run(
+		[sys.executable, "-c", CHILD, str(path), "1" if draft else "0", str(repeat)],
+		cwd=ROOT,
+		env={"SECRET_KEY": "benchmark"},
+		capture_output=True,
+		text=True,
+		check=True,
+	)
+	return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Benchmark draft-mode JPEG decoding")
+	parser.add_argument("--repeat", type=int, default=3, help="Decodes per image and mode")
+	args = parser.parse_args()
+
+	print(f"{'image':<24} {'mode':<6} {'median ms':>10} {'peak RSS +MB':>13}")
+	with tempfile.TemporaryDirectory() as corpus_dir:
+		for label, width, height, orientation in CORPUS:
+			path = Path(corpus_dir) / f"{width}x{height}-{orientation}.jpg"
+			make_photo(path, width, height, orientation)
+
+			for draft in (False, True):
+				result = run_case(path, draft, args.repeat)
+				median_ms = sorted(result["times"])[len(result["times"]) // 2] * 1000
+				mode = "draft" if draft else "full"
+				print(f"{label:<24} {mode:<6} {median_ms:>10.1f} {result['peak_rss_delta_mb']:>13.1f}")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,252 @@
+"""
+Throughput and latency benchmark for the image upload pipeline (storage_service).
+
+Pushes a generated corpus of JPEG/PNG/GIF/RGBA images of several sizes through
+upload_image (multipart files) and upload_base64_image (data URLs), and reports
+images/sec, p50/p99 latency, output bytes per input byte and peak RSS of the API
+process and the image workers. The corpus is seeded, so runs on different
+revisions see identical inputs:
+
+	python -m benchmarks.image_pipeline --iterations 10 --output before.json
+	python -m benchmarks.image_pipeline --iterations 10 --compare before.json
+
+--compare exits non-zero when any case lost more than --tolerance of its throughput
+or grew its p99 by more than that, so it can gate CI.
+"""
+
+import argparse
+import asyncio
+import base64
+import io
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+import PIL
+from PIL import Image
+from starlette.datastructures import Headers, UploadFile
+
+from app.backend.services.storage_service import storage_service
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# (case, content type, PIL format, size): phone photos as JPEG, screenshots/graphics as PNG and GIF
+CORPUS = [
+	("jpeg-small", "image/jpeg", "JPEG", (640, 480)),
+	("jpeg-medium", "image/jpeg", "JPEG", (1920, 1080)),
+	("jpeg-large", "image/jpeg", "JPEG", (4032, 3024)),
+	("png-small", "image/png", "PNG", (640, 480)),
+	("png-medium", "image/png", "PNG", (1920, 1080)),
+	("gif-small", "image/gif", "GIF", (640, 480)),
+	("rgba-small", "image/png", "PNG", (640, 480)),
+	("rgba-medium", "image/png", "PNG", (1920, 1080)),
+]
+
+PATHS = ("upload_image", "upload_base64_image")
+
+
+def make_image(case: str, size: tuple[int, int], seed: int) -> Image.Image:
+	"""Photo-like content: gradients plus seeded noise, so encoders cannot cheat on flat colour"""
+	# Image.effect_noise is not seedable; a seeded byte stream keeps the corpus identical between runs
+	noise = Image.frombytes("L", size, random.Random(seed).randbytes(size[0] * size[1])).point(lambda v: 96 + v // 4)
+	image = Image.merge(
+		"RGB",
+		(
+			noise,
+			Image.linear_gradient("L").resize(size),
+			Image.radial_gradient("L").resize(size),
+		),
+	)
+	if case.startswith("gif"):
+		return image.convert("P", palette=Image.Palette.ADAPTIVE)
+	if case.startswith("rgba"):
+		image.putalpha(Image.linear_gradient("L").rotate(90).resize(size))
+	return image
+
+
+def build_corpus(seed: int, cases: list[str] | None = None) -> list[dict]:
+	"""Encode each selected CORPUS entry once; returns [{"case", "content_type", "data"}]"""
+	corpus = []
+	for case, content_type, pil_format, size in CORPUS:
+		if cases and case not in cases:
+			continue
+		output = io.BytesIO()
+		options = {"quality": 90} if pil_format == "JPEG" else {}
+		make_image(case, size, seed).save(output, format=pil_format, **options)
+		corpus.append({"case": case, "content_type": content_type, "data": output.getvalue()})
+	return corpus
+
+
+def stored_bytes(image_fields: dict) -> int:
+	"""Decoded size of every data URL the upload produced"""
+	urls = [image_fields["image_bitmap"]]
+	for variants in (image_fields.get("image_renditions") or {}).values():
+		urls.extend(variants.values())
+	return sum(len(base64.b64decode(url.split(",", 1)[1])) for url in urls)
+
+
+async def upload(path: str, item: dict) -> dict:
+	"""Run one corpus image through the given storage_service entry point"""
+	if path == "upload_image":
+		upload_file = UploadFile(
+			file=io.BytesIO(item["data"]),
+			filename=f"{item['case']}.bin",
+			headers=Headers({"content-type": item["content_type"]}),
+		)
+		return await storage_service.upload_image(upload_file)
+
+	data_url = f"data:{item['content_type']};base64,{base64.b64encode(item['data']).decode('ascii')}"
+	return await storage_service.upload_base64_image(data_url)
+
+
+async def run_case(path: str, item: dict, iterations: int, concurrency: int) -> dict:
+	"""Upload one image iterations times, concurrency at a time, bypassing the dedup cache"""
+	latencies = []
+	output_bytes = 0
+	semaphore = asyncio.Semaphore(concurrency)
+
+	async def one():
+		nonlocal output_bytes
+		async with semaphore:
+			# Identical bytes would otherwise be served from the dedup cache after the first upload
+			storage_service.processed_images.clear()
+			started = time.perf_counter()
+			image_fields = await upload(path, item)
+			latencies.append(time.perf_counter() - started)
+			output_bytes += stored_bytes(image_fields)
+
+	started = time.perf_counter()
+	await asyncio.gather(*(one() for _ in range(iterations)))
+	elapsed = time.perf_counter() - started
+
+	latencies.sort()
+	return {
+		"case": item["case"],
+		"path": path,
+		"iterations": iterations,
+		"images_per_sec": iterations / elapsed,
+		"p50_ms": statistics.median(latencies) * 1000,
+		"p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+		"input_bytes": len(item["data"]),
+		"output_per_input_byte": output_bytes / (len(item["data"]) * iterations),
+	}
+
+
+def peak_rss_mb(pid: int | str = "self") -> float | None:
+	"""Peak RSS of a process (VmHWM: ru_maxrss is inherited across fork/exec on Linux)"""
+	try:
+		with open(f"/proc/{pid}/status") as status:
+			for line in status:
+				if line.startswith("VmHWM:"):
+					return int(line.split()[1]) / 1024
+	except OSError:
+		pass
+	return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 if pid == "self" else None
+
+
+def worker_peak_rss_mb() -> float | None:
+	"""Largest peak RSS among the live image worker processes"""
+	executor = storage_service.image_pool._executor
+	peaks = [peak_rss_mb(pid) for pid in (executor._processes if executor is not None else {})]
+	return max((peak for peak in peaks if peak is not None), default=None)
+
+
+def git_revision() -> str | None:
+	"""Commit the benchmark ran against, for labelling results"""
+	try:
+		return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+	except (OSError, subprocess.CalledProcessError):
+		return None
+
+
+async def run(args) -> dict:
+	"""Warm the worker pool, then run every case and path"""
+	corpus = build_corpus(args.seed, args.cases)
+
+	# Worker start-up (spawn + imports) is a one-off cost, not per image
+	await upload("upload_image", corpus[0])
+
+	results = []
+	for item in corpus:
+		for path in args.paths:
+			result = await run_case(path, item, args.iterations, args.concurrency)
+			results.append(result)
+			print(
+				f"{result['case']:<14} {path:<20} {result['images_per_sec']:>8.1f} {result['p50_ms']:>9.1f} {result['p99_ms']:>9.1f} {result['output_per_input_byte']:>9.2f}",
+				file=sys.stderr,
+			)
+
+	pool_stats = storage_service.image_pool.stats()
+	worker_peak = worker_peak_rss_mb()
+	storage_service.image_pool.shutdown()
+	return {
+		"revision": git_revision(),
+		"python": platform.python_version(),
+		"pillow": PIL.__version__,
+		"cpu_count": os.cpu_count(),
+		"workers": pool_stats["workers"],
+		"iterations": args.iterations,
+		"concurrency": args.concurrency,
+		"peak_rss_mb": peak_rss_mb(),
+		"worker_peak_rss_mb": worker_peak,
+		"storage_stats": {key: value for key, value in storage_service.get_stats().items() if isinstance(value, int)},
+		"results": results,
+	}
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list[str]:
+	"""Cases that got slower than baseline by more than tolerance (a fraction)"""
+	previous = {(result["case"], result["path"]): result for result in baseline["results"]}
+	regressions = []
+	for result in current["results"]:
+		before = previous.get((result["case"], result["path"]))
+		if before is None:
+			continue
+		if result["images_per_sec"] < before["images_per_sec"] * (1 - tolerance):
+			regressions.append(f"{result['case']} {result['path']}: {before['images_per_sec']:.1f} -> {result['images_per_sec']:.1f} images/sec")
+		if result["p99_ms"] > before["p99_ms"] * (1 + tolerance):
+			regressions.append(f"{result['case']} {result['path']}: p99 {before['p99_ms']:.1f} -> {result['p99_ms']:.1f} ms")
+	return regressions
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Benchmark the image upload pipeline")
+	parser.add_argument("--iterations", type=int, default=5, help="Uploads per case and path")
+	parser.add_argument("--concurrency", type=int, default=1, help="Uploads in flight at once")
+	parser.add_argument("--seed", type=int, default=1234)
+	parser.add_argument("--cases", nargs="*", choices=[case for case, *_ in CORPUS], help="Only run these cases")
+	parser.add_argument("--paths", nargs="*", default=list(PATHS), choices=PATHS)
+	parser.add_argument("--output", help="Write results as JSON to this file")
+	parser.add_argument("--compare", help="Baseline JSON from an earlier run")
+	parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed slowdown vs baseline (0.10 = 10%%)")
+	args = parser.parse_args()
+
+	print(f"{'case':<14} {'path':<20} {'img/s':>8} {'p50 ms':>9} {'p99 ms':>9} {'out/in':>9}", file=sys.stderr)
+	report = asyncio.run(run(args))
+	print(f"peak RSS: api {report['peak_rss_mb']:.1f} MB, worker {report['worker_peak_rss_mb'] or 0:.1f} MB", file=sys.stderr)
+
+	if args.output:
+		Path(args.output).write_text(json.dumps(report, indent=2))
+	else:
+		print(json.dumps(report, indent=2))
+
+	if args.compare:
+		regressions = compare(report, json.loads(Path(args.compare).read_text()), args.tolerance)
+		for regression in regressions:
+			print(f"❌ {regression}", file=sys.stderr)
+		if regressions:
+			sys.exit(1)
+		print("✅ No regressions against baseline", file=sys.stderr)
+
+
+if __name__ == "__main__":
+	main()
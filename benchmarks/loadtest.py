@@ -0,0 +1,379 @@
+"""
+Open-loop HTTP load test for the posts API, for capacity planning and CI performance gates.
+
+Requests arrive as a Poisson process at --rate per second whatever the server's speed
+(open loop), each picking an operation from the --mix weights. Latency is counted from
+the scheduled arrival time, so a stalled server shows up in the percentiles instead of
+quietly slowing the generator down. Throttled responses (429/503 from admission control)
+are reported apart from errors.
+
+By default the app runs in-process (httpx ASGITransport, startup/shutdown hooks run)
+on a temporary copy of the data file, so creates and votes leave the sample data alone.
+Client and server then share one CPU; for capacity numbers start uvicorn separately
+and pass --url:
+
+	python -m benchmarks.loadtest --rate 20 --duration 30
+	python -m benchmarks.loadtest --url http://127.0.0.1:8000 --rate 200 --duration 60 --mix feed=80,vote=20
+	python -m benchmarks.loadtest --rate 20 --duration 30 --max-p99-ms 500 --max-error-rate 0.01 --compare before.json
+
+Exits non-zero when a --max-*/--min-* gate fails, or when --compare finds an operation
+that lost more than --tolerance of its throughput or grew its p99 by more than that.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+import httpx
+from PIL import Image
+
+ROOT = Path(__file__).resolve().parent.parent
+API = "/api/v1/posts"
+
+DEFAULT_MIX = "feed=60,long=5,ranked=15,vote=15,create=5"
+# Around Bangalore, where the sample posts are
+CENTER = (12.97, 77.59)
+
+
+def make_jpeg(seed: int, size: tuple[int, int] = (1280, 960)) -> bytes:
+	"""A phone-photo-sized JPEG of seeded noise and gradients"""
+	rng = random.Random(seed)
+	noise = Image.frombytes("L", size, rng.randbytes(size[0] * size[1])).point(lambda v: 96 + v // 4)
+	image = Image.merge("RGB", (noise, Image.linear_gradient("L").resize(size), Image.radial_gradient("L").resize(size)))
+	output = io.BytesIO()
+	image.save(output, format="JPEG", quality=85)
+	return output.getvalue()
+
+
+class Workload:
+	"""Shared state of the operations: known post ids, the upload image, a seeded RNG"""
+
+	def __init__(self, seed: int, users: int):
+		self.rng = random.Random(seed)
+		self.users = users
+		self.post_ids: list[int] = []
+		self.image = make_jpeg(seed)
+		self.uploads = 0
+
+	def location(self) -> tuple[float, float]:
+		return CENTER[0] + self.rng.uniform(-0.1, 0.1), CENTER[1] + self.rng.uniform(-0.1, 0.1)
+
+	def user_id(self) -> str:
+		return f"loadtest-{self.rng.randrange(self.users)}"
+
+	async def feed(self, client: httpx.AsyncClient) -> httpx.Response:
+		return await client.get(f"{API}/short-post")
+
+	async def long(self, client: httpx.AsyncClient) -> httpx.Response:
+		return await client.get(f"{API}/long-post")
+
+	async def ranked(self, client: httpx.AsyncClient) -> httpx.Response:
+		lat, lng = self.location()
+		return await client.get(f"{API}/ranked-feed", params={"lat": lat, "lng": lng})
+
+	async def vote(self, client: httpx.AsyncClient) -> httpx.Response:
+		post_id = self.rng.choice(self.post_ids)
+		vote_type = self.rng.choice(("upvote", "downvote"))
+		return await client.post(f"{API}/{post_id}/vote", json={"user_id": self.user_id(), "vote_type": vote_type})
+
+	async def create(self, client: httpx.AsyncClient, process_async: bool = False) -> httpx.Response:
+		lat, lng = self.location()
+		user_id = self.user_id()
+		self.uploads += 1
+		# Trailing bytes after the JPEG end marker are ignored by decoders but make every upload
+		# distinct, so the pipeline's dedup cache does not turn creates into cache hits
+		image = self.image + self.uploads.to_bytes(8, "big")
+		response = await client.post(
+			f"{API}/create-post",
+			params={"async": "true"} if process_async else None,
+			data={"title": f"Load test report {self.uploads}", "description": "Generated by benchmarks.loadtest", "username": user_id, "user_id": user_id, "latitude": lat, "longitude": lng},
+			files={"image": (f"loadtest-{self.uploads}.jpg", image, "image/jpeg")},
+		)
+		if response.status_code in (200, 201, 202):
+			self.post_ids.append(response.json()["id"])
+		return response
+
+	async def create_async(self, client: httpx.AsyncClient) -> httpx.Response:
+		return await self.create(client, process_async=True)
+
+
+OPERATIONS = ("feed", "long", "ranked", "vote", "create", "create_async")
+
+
+def parse_mix(mix: str) -> dict[str, float]:
+	"""'feed=70,vote=30' -> {"feed": 70.0, "vote": 30.0}"""
+	weights = {}
+	for part in mix.split(","):
+		name, _, weight = part.strip().partition("=")
+		if name not in OPERATIONS:
+			raise argparse.ArgumentTypeError(f"Unknown operation {name!r}; expected one of {', '.join(OPERATIONS)}")
+		try:
+			weights[name] = float(weight or 1)
+		except ValueError as e:
+			raise argparse.ArgumentTypeError(f"Invalid weight for {name}: {weight!r}") from e
+	if not any(weight > 0 for weight in weights.values()):
+		raise argparse.ArgumentTypeError("The mix needs at least one positive weight")
+	return {name: weight for name, weight in weights.items() if weight > 0}
+
+
+def percentile(ordered: list[float], fraction: float) -> float:
+	"""Nearest-rank percentile of an already sorted list"""
+	if not ordered:
+		return 0.0
+	return ordered[min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))]
+
+
+class Recorder:
+	"""Per-operation latencies (seconds from scheduled arrival) and outcomes"""
+
+	def __init__(self):
+		self.latencies: dict[str, list[float]] = {}
+		self.outcomes: dict[str, Counter] = {}
+		self.statuses: dict[str, Counter] = {}
+
+	def record(self, operation: str, latency: float, outcome: str, status: str):
+		self.latencies.setdefault(operation, []).append(latency)
+		self.outcomes.setdefault(operation, Counter())[outcome] += 1
+		self.statuses.setdefault(operation, Counter())[status] += 1
+
+	def drop(self, operation: str):
+		"""An arrival not sent because --max-in-flight requests were already outstanding"""
+		self.outcomes.setdefault(operation, Counter())["dropped"] += 1
+
+	def summary(self, operation: str, seconds: float) -> dict:
+		latencies = sorted(self.latencies.get(operation, []))
+		outcomes = self.outcomes.get(operation, Counter())
+		return {
+			"operation": operation,
+			"requests": len(latencies),
+			"ok": outcomes["ok"],
+			"rejected": outcomes["rejected"],
+			"errors": outcomes["error"],
+			"dropped": outcomes["dropped"],
+			"throughput": outcomes["ok"] / seconds if seconds else 0.0,
+			"p50_ms": percentile(latencies, 0.50) * 1000,
+			"p90_ms": percentile(latencies, 0.90) * 1000,
+			"p99_ms": percentile(latencies, 0.99) * 1000,
+			"max_ms": (latencies[-1] if latencies else 0.0) * 1000,
+			"statuses": dict(self.statuses.get(operation, Counter())),
+		}
+
+
+def classify(response: httpx.Response) -> str:
+	if response.status_code < 400:
+		return "ok"
+	if response.status_code in (429, 503):
+		return "rejected"
+	return "error"
+
+
+async def fire(client: httpx.AsyncClient, workload: Workload, operation: str, scheduled: float, recorder: Recorder | None):
+	try:
+		response = await getattr(workload, operation)(client)
+		outcome, status = classify(response), str(response.status_code)
+	except Exception as e:
+		outcome, status = "error", type(e).__name__
+	if recorder is not None:
+		recorder.record(operation, time.perf_counter() - scheduled, outcome, status)
+
+
+async def generate(client: httpx.AsyncClient, workload: Workload, mix: dict[str, float], rate: float, seconds: float, max_in_flight: int, recorder: Recorder | None):
+	"""Open-loop arrivals for `seconds`; waits for the requests still in flight at the end"""
+	names, weights = list(mix), list(mix.values())
+	in_flight: set[asyncio.Task] = set()
+	started = time.perf_counter()
+	scheduled = started
+	while True:
+		scheduled += workload.rng.expovariate(rate)
+		if scheduled - started >= seconds:
+			break
+		delay = scheduled - time.perf_counter()
+		if delay > 0:
+			await asyncio.sleep(delay)
+		operation = workload.rng.choices(names, weights)[0]
+		if len(in_flight) >= max_in_flight:
+			if recorder is not None:
+				recorder.drop(operation)
+			continue
+		task = asyncio.create_task(fire(client, workload, operation, scheduled, recorder))
+		in_flight.add(task)
+		task.add_done_callback(in_flight.discard)
+	if in_flight:
+		await asyncio.wait(in_flight)
+	return time.perf_counter() - started
+
+
+@contextlib.asynccontextmanager
+async def in_process_client(timeout: float):
+	"""A client for the app in this process, with its lifespan running, on a scratch copy of the data file"""
+	from app.backend.backend import app
+	from app.backend.services.data_service import data_service
+
+	scratch = tempfile.mkdtemp(prefix="loadtest-")
+	original_data_file = data_service.data_file
+	data_service.data_file = os.path.join(scratch, "sample_data.json")
+	data_service._save_data()
+	try:
+		async with app.router.lifespan_context(app):
+			transport = httpx.ASGITransport(app=app)
+			async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=timeout) as client:
+				yield client
+	finally:
+		data_service.data_file = original_data_file
+		shutil.rmtree(scratch, ignore_errors=True)
+
+
+def git_revision() -> str | None:
+	"""Commit the load test ran against, for labelling results"""
+	try:
+		return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+	except (OSError, subprocess.CalledProcessError):
+		return None
+
+
+async def run(args) -> dict:
+	"""Warm up, then measure the mix at the requested rate"""
+	workload = Workload(args.seed, args.users)
+	if args.url:
+		limits = httpx.Limits(max_connections=args.max_in_flight, max_keepalive_connections=args.max_in_flight)
+		client_context = httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits)
+	else:
+		client_context = in_process_client(args.timeout)
+
+	async with client_context as client:
+		response = await client.get(f"{API}/short-post", params={"fields": "id"})
+		response.raise_for_status()
+		workload.post_ids = [post["id"] for post in response.json()]
+		if not workload.post_ids and "vote" in args.mix:
+			raise SystemExit("❌ No posts to vote on; create some first or drop vote from --mix")
+
+		if args.warmup > 0:
+			await generate(client, workload, args.mix, args.rate, args.warmup, args.max_in_flight, None)
+		recorder = Recorder()
+		elapsed = await generate(client, workload, args.mix, args.rate, args.duration, args.max_in_flight, recorder)
+
+	results = [recorder.summary(operation, elapsed) for operation in args.mix]
+	total = Recorder()
+	for operation in args.mix:
+		total.latencies.setdefault("total", []).extend(recorder.latencies.get(operation, []))
+		total.outcomes.setdefault("total", Counter()).update(recorder.outcomes.get(operation, Counter()))
+		total.statuses.setdefault("total", Counter()).update(recorder.statuses.get(operation, Counter()))
+	results.append(total.summary("total", elapsed))
+	return {
+		"revision": git_revision(),
+		"python": platform.python_version(),
+		"cpu_count": os.cpu_count(),
+		"target": args.url or "in-process",
+		"mix": args.mix,
+		"rate": args.rate,
+		"duration": elapsed,
+		"max_in_flight": args.max_in_flight,
+		"results": results,
+	}
+
+
+def print_report(report: dict):
+	print(f"{report['target']}, {report['rate']:g} req/s offered for {report['duration']:.1f}s", file=sys.stderr)
+	print(f"{'operation':<13} {'requests':>9} {'ok/s':>8} {'rejected':>9} {'errors':>7} {'dropped':>8} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}", file=sys.stderr)
+	for result in report["results"]:
+		print(
+			f"{result['operation']:<13} {result['requests']:>9} {result['throughput']:>8.1f} {result['rejected']:>9} {result['errors']:>7} {result['dropped']:>8} "
+			f"{result['p50_ms']:>9.1f} {result['p90_ms']:>9.1f} {result['p99_ms']:>9.1f} {result['max_ms']:>9.1f}",
+			file=sys.stderr,
+		)
+
+
+def check_gates(report: dict, args) -> list[str]:
+	"""Absolute limits on the overall result (errors and dropped arrivals count as failures)"""
+	total = report["results"][-1]
+	offered = total["requests"] + total["dropped"]
+	failures = []
+	if args.max_p99_ms is not None and total["p99_ms"] > args.max_p99_ms:
+		failures.append(f"p99 {total['p99_ms']:.1f} ms > {args.max_p99_ms:g} ms")
+	error_rate = (total["errors"] + total["dropped"]) / offered if offered else 0.0
+	if args.max_error_rate is not None and error_rate > args.max_error_rate:
+		failures.append(f"error rate {error_rate:.2%} > {args.max_error_rate:.2%}")
+	rejected_rate = total["rejected"] / offered if offered else 0.0
+	if args.max_rejected_rate is not None and rejected_rate > args.max_rejected_rate:
+		failures.append(f"rejected rate {rejected_rate:.2%} > {args.max_rejected_rate:.2%}")
+	if args.min_throughput is not None and total["throughput"] < args.min_throughput:
+		failures.append(f"throughput {total['throughput']:.1f} req/s < {args.min_throughput:g} req/s")
+	return failures
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list[str]:
+	"""Operations that got slower than baseline by more than tolerance (a fraction)"""
+	previous = {result["operation"]: result for result in baseline["results"]}
+	regressions = []
+	for result in current["results"]:
+		before = previous.get(result["operation"])
+		if before is None:
+			continue
+		if result["throughput"] < before["throughput"] * (1 - tolerance):
+			regressions.append(f"{result['operation']}: {before['throughput']:.1f} -> {result['throughput']:.1f} req/s")
+		if result["p99_ms"] > before["p99_ms"] * (1 + tolerance):
+			regressions.append(f"{result['operation']}: p99 {before['p99_ms']:.1f} -> {result['p99_ms']:.1f} ms")
+	return regressions
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Open-loop load test of the posts API")
+	parser.add_argument("--url", help="Base URL of a running server (default: the app in-process)")
+	parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help=f"Weighted operations out of {', '.join(OPERATIONS)} (default {DEFAULT_MIX})")
+	parser.add_argument("--rate", type=float, default=20, help="Arrivals per second")
+	parser.add_argument("--duration", type=float, default=30, help="Measured seconds")
+	parser.add_argument("--warmup", type=float, default=5, help="Seconds at the same rate before measuring")
+	parser.add_argument("--max-in-flight", type=int, default=256, help="Arrivals beyond this many outstanding requests are dropped (and counted)")
+	parser.add_argument("--timeout", type=float, default=30, help="Per-request timeout in seconds")
+	parser.add_argument("--users", type=int, default=1000, help="Distinct user ids voting and posting")
+	parser.add_argument("--seed", type=int, default=1234)
+	parser.add_argument("--output", help="Write results as JSON to this file")
+	parser.add_argument("--compare", help="Baseline JSON from an earlier run")
+	parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed slowdown vs baseline (0.10 = 10%%)")
+	parser.add_argument("--max-p99-ms", type=float, help="Fail if the overall p99 exceeds this")
+	parser.add_argument("--max-error-rate", type=float, help="Fail if more than this fraction of arrivals errored or were dropped")
+	parser.add_argument("--max-rejected-rate", type=float, help="Fail if more than this fraction of arrivals were throttled (429/503)")
+	parser.add_argument("--min-throughput", type=float, help="Fail if fewer successful requests per second than this")
+	args = parser.parse_args()
+	if isinstance(args.mix, str):
+		args.mix = parse_mix(args.mix)
+	if args.rate <= 0 or args.duration <= 0 or args.max_in_flight < 1:
+		parser.error("--rate, --duration and --max-in-flight must be positive")
+
+	report = asyncio.run(run(args))
+	print_report(report)
+
+	if args.output:
+		Path(args.output).write_text(json.dumps(report, indent=2))
+	else:
+		print(json.dumps(report, indent=2))
+
+	failures = check_gates(report, args)
+	if args.compare:
+		failures += compare(report, json.loads(Path(args.compare).read_text()), args.tolerance)
+	for failure in failures:
+		print(f"❌ {failure}", file=sys.stderr)
+	if failures:
+		sys.exit(1)
+	gated = any(limit is not None for limit in (args.max_p99_ms, args.max_error_rate, args.max_rejected_rate, args.min_throughput))
+	if gated or args.compare:
+		print("✅ Within limits" + (" and no regressions against baseline" if args.compare else ""), file=sys.stderr)
+
+
+if __name__ == "__main__":
+	main()
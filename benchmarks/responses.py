@@ -0,0 +1,133 @@
+"""
+Bytes on the wire and server CPU per feed request: default FastAPI responses vs the
+fast path (FastJSONResponse, no response_model re-validation) with and without
+gzip/brotli compression.
+
+Serves a synthetic /short-post feed of --posts posts with inline card-sized images
+from an in-process app (httpx ASGITransport, raw bytes read without decoding), so
+the CPU time measured is the server's work plus a constant client overhead:
+
+	python -m benchmarks.responses --posts 200 --requests 20
+"""
+
+import argparse
+import asyncio
+import base64
+import io
+import os
+import random
+import statistics
+import time
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+import httpx
+from fastapi import FastAPI
+from PIL import Image
+
+from app.backend.core import compression, responses
+from app.backend.core.compression import CompressionMiddleware
+from app.backend.core.config import settings
+from app.backend.core.responses import FastJSONResponse
+from app.backend.schemas.post import PostShortResponse
+
+# (label, path, Accept-Encoding)
+VARIANTS = [
+	("default", "/default", "identity"),
+	("fast", "/fast", "identity"),
+	("fast+gzip", "/fast", "gzip"),
+	("fast+br", "/fast", "br"),
+]
+
+
+def make_feed(count: int, seed: int) -> list[dict]:
+	"""Posts shaped like DataService.get_posts_short() output, each with its own 640px JPEG"""
+	rng = random.Random(seed)
+	posts = []
+	for post_id in range(1, count + 1):
+		noise = Image.frombytes("L", (640, 480), rng.randbytes(640 * 480)).point(lambda v: 96 + v // 4)
+		image = Image.merge("RGB", (noise, Image.linear_gradient("L").resize((640, 480)), Image.radial_gradient("L").resize((640, 480))))
+		output = io.BytesIO()
+		image.save(output, format="JPEG", quality=80)
+		posts.append(
+			{
+				"id": post_id,
+				"username": f"user_{post_id}",
+				"title": f"Report {post_id} near MG Road",
+				"image_bitmap": "data:image/jpeg;base64," + base64.b64encode(output.getvalue()).decode("ascii"),
+				"image_placeholder": "LyHV9woffQof00WBfQWBxuj[fQj[",
+				"upvote_count": rng.randint(0, 100),
+				"downvote_count": rng.randint(0, 10),
+				"karma": rng.randint(0, 50) / 2,
+				"created_at": "2024-01-15T10:30:00Z",
+				"Geolocation": [12.9 + rng.random() / 10, 77.5 + rng.random() / 10],
+				"user_id": f"user_{post_id}",
+			},
+		)
+	return posts
+
+
+def build_app(posts: list[dict]) -> FastAPI:
+	"""The feed route both ways, behind the same compression middleware as the API"""
+	app = FastAPI()
+	app.add_middleware(
+		CompressionMiddleware,
+		minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+		gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+		brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+	)
+
+	@app.get("/default", response_model=list[PostShortResponse])
+	def default_feed():
+		return posts
+
+	@app.get("/fast", response_model=list[PostShortResponse])
+	def fast_feed():
+		return FastJSONResponse(posts)
+
+	return app
+
+
+async def measure(client: httpx.AsyncClient, path: str, accept_encoding: str, requests: int) -> dict:
+	"""Median CPU and wall time per request, and the bytes received"""
+	cpu, wall = [], []
+	size = 0
+	for _ in range(requests):
+		started_cpu, started_wall = time.process_time(), time.perf_counter()
+		async with client.stream("GET", path, headers={"Accept-Encoding": accept_encoding}) as response:
+			size = sum([len(chunk) async for chunk in response.aiter_raw()])
+			encoding = response.headers.get("content-encoding", "identity")
+		cpu.append(time.process_time() - started_cpu)
+		wall.append(time.perf_counter() - started_wall)
+	return {"bytes": size, "encoding": encoding, "cpu_ms": statistics.median(cpu) * 1000, "wall_ms": statistics.median(wall) * 1000}
+
+
+async def run(args):
+	posts = make_feed(args.posts, args.seed)
+	transport = httpx.ASGITransport(app=build_app(posts))
+	async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+		# Warm up imports and caches once per variant
+		for _, path, accept_encoding in VARIANTS:
+			await measure(client, path, accept_encoding, 1)
+
+		print(f"orjson: {'yes' if responses.orjson else 'no'}, brotli: {'yes' if compression.brotli else 'no'}, {args.posts} posts")
+		print(f"{'variant':<12} {'encoding':<9} {'bytes':>12} {'vs default':>11} {'cpu ms':>9} {'wall ms':>9}")
+		baseline = None
+		for label, path, accept_encoding in VARIANTS:
+			result = await measure(client, path, accept_encoding, args.requests)
+			baseline = baseline or result
+			print(
+				f"{label:<12} {result['encoding']:<9} {result['bytes']:>12,} {result['bytes'] / baseline['bytes']:>10.0%} {result['cpu_ms']:>9.1f} {result['wall_ms']:>9.1f}",
+			)
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Benchmark feed response serialization and compression")
+	parser.add_argument("--posts", type=int, default=200, help="Posts in the feed")
+	parser.add_argument("--requests", type=int, default=20, help="Requests per variant")
+	parser.add_argument("--seed", type=int, default=1234)
+	asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+	main()
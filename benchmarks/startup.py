@@ -0,0 +1,75 @@
+"""
+Cold-start benchmark: time from interpreter start to the first HTTP response.
+
+Each run spawns a fresh interpreter that imports app.backend.backend and serves one
+request in-process, so import cost, module-level initialization and first-request
+work are all included. Run it on two revisions to compare before/after:
+
+	python -m benchmarks.startup --runs 10 --path /health
+	python -m benchmarks.startup --runs 10 --path /_ah/warmup
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Executed in the child interpreter; prints a JSON line with its timings in milliseconds
+CHILD = """
+import json, time
+started = time.perf_counter()
+import app.backend.backend as backend
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+client = TestClient(backend.app)
+response = client.get({path!r})
+responded = time.perf_counter()
+print(json.dumps({{
+	"status": response.status_code,
+	"import_ms": (imported - started) * 1000,
+	"first_response_ms": (responded - imported) * 1000,
+	"total_ms": (responded - started) * 1000,
+}}))
+"""
+
+
+def run_once(path: str) -> dict:
+	"""Start a fresh interpreter and return its timings"""
+	env = {"SECRET_KEY": "benchmark", **os.environ}
+	completed = subprocess.run(
+		[sys.executable, "-c", CHILD.format(path=path)],
+		cwd=ROOT,
+		env=env,
+		capture_output=True,
+		text=True,
+		check=True,
+	)
+	return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Measure import-to-first-response latency")
+	parser.add_argument("--runs", type=int, default=10)
+	parser.add_argument("--path", default="/health", help="Route requested as the first response")
+	parser.add_argument("--json", action="store_true", help="Print raw results as JSON")
+	args = parser.parse_args()
+
+	results = [run_once(args.path) for _ in range(args.runs)]
+
+	if args.json:
+		print(json.dumps(results, indent=2))
+		return
+
+	print(f"Cold start for GET {args.path} over {args.runs} runs (status {results[-1]['status']})")
+	for key in ("import_ms", "first_response_ms", "total_ms"):
+		values = [result[key] for result in results]
+		print(f"   {key:<18} median {statistics.median(values):8.1f}   min {min(values):8.1f}   max {max(values):8.1f}")
+
+
+if __name__ == "__main__":
+	main()
@@ -1,6 +1,7 @@
 import json
 import time
 import yaml
+import requests
 import google.generativeai as genai
 import os
 from sources.twitter import fetch_twitter
@@ -84,6 +85,41 @@ If any field is missing or not found, use null.
         structured = {"type": None, "location": None, "severity": None, "advice": None}
     return structured
 
+# Extracted locations are resolved within Bangalore (lon1,lat1,lon2,lat2), one lookup per second per Nominatim's usage policy
+BANGALORE_VIEWBOX = "77.35,13.20,77.85,12.75"
+_geocode_cache = {}
+_last_geocode = 0.0
+
+def geocode_location(location):
+    """[lat, lng] of an extracted location via OpenStreetMap Nominatim (geocoding.url in config.yaml), or None"""
+    global _last_geocode
+    if not location:
+        return None
+    if location in _geocode_cache:
+        return _geocode_cache[location]
+
+    geocoding = (config or {}).get('geocoding') or {}
+    coordinates = None
+    try:
+        time.sleep(max(0.0, _last_geocode + 1.0 - time.time()))
+        response = requests.get(
+            geocoding.get('url', 'https://nominatim.openstreetmap.org/search'),
+            params={'q': f"{location}, Bengaluru", 'format': 'json', 'limit': 1, 'viewbox': BANGALORE_VIEWBOX, 'bounded': 1},
+            headers={'User-Agent': geocoding.get('user_agent', 'livegrid-ingestor')},
+            timeout=10,
+        )
+        _last_geocode = time.time()
+        response.raise_for_status()
+        results = response.json()
+        if results:
+            coordinates = [float(results[0]['lat']), float(results[0]['lon'])]
+    except Exception as e:
+        print(f"⚠️ Could not geocode {location!r}: {e}")
+        return None
+
+    _geocode_cache[location] = coordinates
+    return coordinates
+
 def process_post(post):
     """Process a post through Gemini LLM and print if relevant"""
     # Handle both old 'text' field and new 'text_short'/'text_long' fields
@@ -103,10 +139,34 @@ def process_post(post):
             "timestamp": time.time(),
             "processed": True
         }
+        # The API only creates posts it can place on the map
+        coordinates = geocode_location(structured_data.get('location'))
+        if coordinates:
+            enriched_post["Geolocation"] = coordinates
+        else:
+            print(f"⚠️ No coordinates for {structured_data.get('location')!r}; the API will report it as unlocated")
         print(f"✅ Civic event detected: {structured_data['type']} in {structured_data.get('location', 'Unknown')}")
         print(json.dumps(enriched_post, indent=2)) # Print instead of publish_event
+        return enriched_post
     else:
         print(f"ℹ️ No civic event detected in post")
+        return None
+
+def send_events(events, batch_size=100):
+    """Create posts for detected events via the API's bulk ingestion endpoint (api.base_url in config.yaml)"""
+    base_url = ((config or {}).get('api') or {}).get('base_url')
+    if not base_url:
+        print("⚠️ No api.base_url in config.yaml, events were only printed")
+        return
+
+    for start in range(0, len(events), batch_size):
+        batch = events[start:start + batch_size]
+        try:
+            response = requests.post(f"{base_url.rstrip('/')}/api/v1/posts:batch", json={"items": batch}, timeout=30)
+            response.raise_for_status()
+            print(f"📤 Sent {len(batch)} events: {response.json()['created']} new posts")
+        except Exception as e:
+            print(f"❌ Error sending events: {e}")
 
 def main():
     print("🚀 Starting LiveGrid-Om Data Ingestion with Gemini LLM Processing")
@@ -153,18 +213,20 @@ def main():
     print("🧠 Processing posts through Gemini LLM...")
     
     # Process each post through Gemini
-    civic_events_count = 0
+    civic_events = []
     for i, item in enumerate(all_data, 1):
         print(f"\nProcessing {i}/{len(all_data)}: {item.get('text', '')[:50]}...")
-        process_post(item)
+        enriched_post = process_post(item)
         
-        # Count civic events
-        if item.get('processed'):
-            civic_events_count += 1
+        # Collect civic events
+        if enriched_post:
+            civic_events.append(enriched_post)
     
     print(f"\n🎉 Processing complete!")
     print(f"📈 Total posts processed: {len(all_data)}")
-    print(f"🏙️ Civic events detected: {civic_events_count}")
+    print(f"🏙️ Civic events detected: {len(civic_events)}")
+
+    send_events(civic_events)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
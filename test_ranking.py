@@ -0,0 +1,31 @@
+from datetime import UTC, datetime, timedelta
+
+from app.backend.services.ranking import reranking_service
+
+
+def post_created(hours_ago: float, timestamp_format: str = "iso_z") -> dict:
+	created_at = datetime.now(UTC) - timedelta(hours=hours_ago)
+	if timestamp_format == "iso_z":
+		created_at = created_at.replace(tzinfo=None).isoformat() + "Z"
+	elif timestamp_format == "naive":
+		created_at = created_at.replace(tzinfo=None)
+	return {"created_at": created_at, "Geolocation": [12.97, 77.59], "upvote_count": 0, "downvote_count": 0}
+
+
+def test_newer_posts_score_higher():
+	"""Recency must actually vary with age (it used to fall back to 0.5 for every post)"""
+	for timestamp_format in ("iso_z", "aware", "naive"):
+		scores = [reranking_service._calculate_recency_score_json(post_created(hours, timestamp_format)) for hours in (1, 24, 24 * 30)]
+		assert scores[0] > scores[1] > scores[2], (timestamp_format, scores)
+
+
+def test_ranked_feed_prefers_newer_post():
+	"""Two posts identical except for age: the newer one ranks first"""
+	old, new = post_created(24 * 365), post_created(1)
+	assert reranking_service.rerank_posts_json([old, new], 12.97, 77.59) == [new, old]
+
+
+if __name__ == "__main__":
+	test_newer_posts_score_higher()
+	test_ranked_feed_prefers_newer_post()
+	print("✅ Ranking tests passed")